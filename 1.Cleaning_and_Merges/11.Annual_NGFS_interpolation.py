@@ -0,0 +1,24 @@
+import pandas as pd
+from pathlib import Path
+from annual_interp import interpolate_annual
+from storage import checkpoint
+#CREATES ngfs_final_merge_annual.csv (annual projection inputs for 3.Projection)
+
+stage_dir = Path(__file__).resolve().parent
+
+
+def annualize_ngfs(ngfs_final_merge=None, methods=None, save_to=None):
+    """ngfs_final_merge on annual steps: GDP PPP log-linear, the rest linear (see annual_interp)."""
+    if ngfs_final_merge is None:
+        ngfs_final_merge = pd.read_csv(stage_dir / "ngfs_final_merge.csv")
+
+    annual = interpolate_annual(ngfs_final_merge.astype({'Year': int}), methods=methods)
+
+    print(annual.head())
+    print("✅ Annual panel:", annual['Year'].min(), "-", annual['Year'].max(), "| Rows:", len(annual))
+    return checkpoint(annual, save_to)
+
+
+if __name__ == "__main__":
+    #save
+    annualize_ngfs(save_to="ngfs_final_merge_annual.csv")
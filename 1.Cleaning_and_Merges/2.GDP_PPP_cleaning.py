@@ -1,45 +1,50 @@
 import pandas as pd
+from pathlib import Path
+from region_filter import is_aggregate
+from storage import checkpoint
 
 #CLEANING GDP-PPP LATEST RAW DATA
 # Load the data
-gdp_ppp_df = pd.read_csv('/Users/valentinadlc/Library/Caches/JetBrains/PyCharm2025.1/demo/PyCharmLearningProject/data/gdp_ppp.csv')
+gdp_ppp_path = Path(__file__).resolve().parents[1] / "Data/data_projection_df/gdp_ppp.csv"
 
-# Delete the first and 5th column
-gdp_ppp_df = gdp_ppp_df.drop(columns=["Model", "Unit"])
+def clean_gdp_ppp(file_path=gdp_ppp_path, save_to=None):
+    """NGFS GDP PPP with short scenario names and aggregates removed."""
+    gdp_ppp_df = pd.read_csv(file_path)
 
+    # Delete the first and 5th column
+    gdp_ppp_df = gdp_ppp_df.drop(columns=["Model", "Unit"])
 
-# Print columns before renaming (for debugging)
-print("Columns before renaming:", gdp_ppp_df.columns)
 
-# Rename the region column to ISO
-gdp_ppp_df = gdp_ppp_df.rename(columns={'Region': 'ISO'})  # Adjust to your actual column name!
+    # Print columns before renaming (for debugging)
+    print("Columns before renaming:", gdp_ppp_df.columns)
 
-# Print columns after renaming (for debugging)
-print("Columns after renaming:", gdp_ppp_df.columns)
+    # Rename the region column to ISO
+    gdp_ppp_df = gdp_ppp_df.rename(columns={'Region': 'ISO'})  # Adjust to your actual column name!
 
-# Map scenario names
-scenario_name_map = {
-    "Below 2?C": "Below2",
-    "Nationally Determined Contributions (NDCs)": "NDC",
-    "Net Zero 2050": "Netzero"
-}
-gdp_ppp_df['Scenario'] = gdp_ppp_df['Scenario'].replace(scenario_name_map)
+    # Print columns after renaming (for debugging)
+    print("Columns after renaming:", gdp_ppp_df.columns)
 
-# List of regions to exclude
-regions_to_exclude = [
-    "Africa", "Asia", "Central America", "Europe", "Middle East", "North America",
-    "South America", "World", "Rest of the World", "European Union", "Pacific Island States"
-]
-gdp_ppp_df = gdp_ppp_df[~gdp_ppp_df['ISO'].isin(regions_to_exclude)]
+    # Map scenario names
+    scenario_name_map = {
+        "Below 2?C": "Below2",
+        "Nationally Determined Contributions (NDCs)": "NDC",
+        "Net Zero 2050": "Netzero"
+    }
+    gdp_ppp_df['Scenario'] = gdp_ppp_df['Scenario'].replace(scenario_name_map)
 
-# Change variable name
-gdp_ppp_df['Variable'] = gdp_ppp_df['Variable'].replace(
-    "GDP|PPP|including medium chronic physical risk damage estimate",
-    "gdp_ppp"
-)
+    # Drop aggregate regions (list in region_filter.AGGREGATE_REGIONS)
+    gdp_ppp_df = gdp_ppp_df[~is_aggregate(gdp_ppp_df['ISO'])]
 
-# Print the result to check
-print(gdp_ppp_df.head())
+    # Change variable name
+    gdp_ppp_df['Variable'] = gdp_ppp_df['Variable'].replace(
+        "GDP|PPP|including medium chronic physical risk damage estimate",
+        "gdp_ppp"
+    )
 
-#To csv
-gdp_ppp_df.to_csv('/Users/valentinadlc/Library/Caches/JetBrains/PyCharm2025.1/demo/PyCharmLearningProject/data/gdp_ppp_cleaned.csv', index=False)
\ No newline at end of file
+    # Print the result to check
+    print(gdp_ppp_df.head())
+    return checkpoint(gdp_ppp_df, save_to)
+
+if __name__ == "__main__":
+    #To csv
+    clean_gdp_ppp(save_to=gdp_ppp_path.with_name("gdp_ppp_cleaned.csv"))
@@ -1,13 +1,12 @@
 #Cleans the NIGEM model variables from "macrofinal" raw dataset
 import pandas as pd
 import re
+from pathlib import Path
+from ngfs_reconstruct import by_scenario, reconstruct
+from region_filter import strip_prefix
 
 # Load your local CSV
-file_path = "/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/Data/data1_old/NGFS RAW/macrofinal.csv"
-df = pd.read_csv(file_path)
-
-# Drop rows where Scenario is missing
-df = df[df["Scenario"].notna()].copy()
+file_path = Path(__file__).resolve().parents[1] / "Data/data1_old/NGFS RAW/macrofinal.csv"
 
 # Clean variable names (remove things like "(combined)")
 def clean_variable_name(var):
@@ -15,71 +14,67 @@ def clean_variable_name(var):
         return ""
     return re.sub(r"\s*\(.*?\)", "", var).strip()
 
-df["Variable"] = df["Variable"].apply(clean_variable_name)
+def clean_ngfs(file_path=file_path):
+    """Baseline frame plus one reconstructed (baseline + delta) frame per scenario."""
+    df = pd.read_csv(file_path)
+
+    # Drop rows where Scenario is missing
+    df = df[df["Scenario"].notna()].copy()
+
+    df["Variable"] = df["Variable"].apply(clean_variable_name)
+
+    # Clean and rename columns
+    df.rename(columns={"Region": "Country"}, inplace=True)
+    df["Country"] = strip_prefix(df["Country"])
+    df.drop(columns=["Model"], inplace=True, errors="ignore")
 
-# Clean and rename columns
-df.rename(columns={"Region": "Country"}, inplace=True)
-df["Country"] = df["Country"].str.replace(r"^NiGEM NGFS v1\.24\.2\|\s*", "", regex=True)
-df.drop(columns=["Model"], inplace=True, errors="ignore")
+    # Rename variable names for simplicity
+    variable_renaming = {
+        "Gross Domestic Product": "GDP",
+        "Unemployment rate ; %": "unemployment",
+        "Inflation rate ; %": "inflation"
+    }
+    df["Variable"] = df["Variable"].replace(variable_renaming)
 
-# Rename variable names for simplicity
-variable_renaming = {
-    "Gross Domestic Product": "GDP",
-    "Unemployment rate ; %": "unemployment",
-    "Inflation rate ; %": "inflation"
-}
-df["Variable"] = df["Variable"].replace(variable_renaming)
+    # Separate baseline, then compute scenario values (baseline + delta) for all
+    # scenarios in one pass
+    baseline_df = df[df["Scenario"] == "Baseline"].copy()
+    years = [str(y) for y in range(2022, 2051)]
 
-# Separate baseline and scenarios
-baseline_df = df[df["Scenario"] == "Baseline"].copy()
-non_baseline_scenarios = df["Scenario"].unique()
-non_baseline_scenarios = [s for s in non_baseline_scenarios if s != "Baseline"]
-years = [str(y) for y in range(2022, 2051)]
+    scenario_dfs = by_scenario(reconstruct(df, keys=["Country", "Variable"], values=years))
 
-# Compute scenario values
-scenario_dfs = {}
+    return baseline_df, scenario_dfs
 
-for scenario in non_baseline_scenarios:
-    scenario_df = df[df["Scenario"] == scenario].copy()
-    merged = pd.merge(
-        scenario_df,
-        baseline_df,
-        on=["Country", "Variable"],
-        suffixes=("_diff", "_base")
-    )
-    for year in years:
-        merged[year] = merged[f"{year}_base"] + merged[f"{year}_diff"]
-    final_cols = ["Scenario_diff", "Country", "Variable"] + years
-    result = merged[final_cols].rename(columns={"Scenario_diff": "Scenario"})
-    scenario_dfs[scenario] = result
+if __name__ == "__main__":
+    baseline_df, scenario_dfs = clean_ngfs()
 
-# OPTIONAL: Verify scenario calculation
-check = []
+    # OPTIONAL: Verify scenario calculation
+    check = []
 
-for i in range(5):  # Check first 5 entries
-    row = baseline_df.iloc[i]
-    match = scenario_dfs["Below 2?C"][
-        (scenario_dfs["Below 2?C"]["Country"] == row["Country"]) &
-        (scenario_dfs["Below 2?C"]["Variable"] == row["Variable"])
-    ]
-    if not match.empty:
-        year = "2023"
-        baseline_val = row[year]
-        scenario_val = match[year].values[0]
-        computed_diff = scenario_val - baseline_val
-        check.append({
-            "Country": row["Country"],
-            "Variable": row["Variable"],
-            "Baseline_2023": baseline_val,
-            "Scenario_2023": scenario_val,
-            "Computed_Diff": computed_diff
-        })
+    for i in range(5):  # Check first 5 entries
+        row = baseline_df.iloc[i]
+        match = scenario_dfs["Below 2?C"][
+            (scenario_dfs["Below 2?C"]["Country"] == row["Country"]) &
+            (scenario_dfs["Below 2?C"]["Variable"] == row["Variable"])
+        ]
+        if not match.empty:
+            year = "2023"
+            baseline_val = row[year]
+            scenario_val = match[year].values[0]
+            computed_diff = scenario_val - baseline_val
+            check.append({
+                "Country": row["Country"],
+                "Variable": row["Variable"],
+                "Baseline_2023": baseline_val,
+                "Scenario_2023": scenario_val,
+                "Computed_Diff": computed_diff
+            })
 
-# Print verification check
-check_df = pd.DataFrame(check)
-print(check_df)
+    # Print verification check
+    check_df = pd.DataFrame(check)
+    print(check_df)
 
-# Loop through and print the first few rows of each scenario DataFrame
-for scenario_name, df in scenario_dfs.items():
-    print(f"\n===== Scenario: {scenario_name} =====")
-    print(df.head())  # You can use df.to_string(index=False) for full formatting
\ No newline at end of file
+    # Loop through and print the first few rows of each scenario DataFrame
+    for scenario_name, df in scenario_dfs.items():
+        print(f"\n===== Scenario: {scenario_name} =====")
+        print(df.head())  # You can use df.to_string(index=False) for full formatting
@@ -1,140 +1,102 @@
 #DATA CLEANING WB GDP PPP CONSTANT 2021 TRANSFORMED TO BILLIONS TO MATCH WITH PROJECTED GDP PPP FROM NFGS
 #CREATES FINAL DATASET CALLED "wacc_with_gdpppp2021.csv"
 import pandas as pd
-import pycountry
-import re
-import csv
-
-path = "/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/Data/data1_old/GDP/gdp_ppp_2021constant.csv"  # <-- set full path
-
-
-# 1) Read file line-by-line, skipping metadata rows
-# ------------------------------------------------------------------
-rows = []
-with open(path, encoding="utf-8") as f:
-    reader = csv.reader(f)
-    for row in reader:
-        # Skip the first 4 metadata lines
-        if row and row[0].startswith("Country Name"):
-            header = row
-            break
-    # Read the remaining rows
-    for row in reader:
-        if row:                       # ignore blank lines
-            rows.append(row)
-
-# ------------------------------------------------------------------
-# 2) Clean header: strip " [YRxxxx]" from year columns
-# ------------------------------------------------------------------
-new_header = []
-for col in header:
-    # e.g. "2021 [YR2021]" -> "2021"
-    m = re.match(r"(\d{4})\s+\[YR\d{4}\]", col)
-    new_header.append(m.group(1) if m else col.strip())
-
-# ------------------------------------------------------------------
-# 3) Build DataFrame
-# ------------------------------------------------------------------
-df = pd.DataFrame(rows, columns=new_header)
-
-# ------------------------------------------------------------------
-# 4) Basic column housekeeping
-# ------------------------------------------------------------------
-df = df.rename(columns={
-    "Country Code": "ISO",
-    "Indicator Name": "gdp_ppp_2021"
-}).drop(columns=["Indicator Code"], errors="ignore")
-
-# ------------------------------------------------------------------
-# 5) Ensure valid ISO – patch special cases
-# ------------------------------------------------------------------
-manual_iso = {"Taiwan, China": "TWN", "Kosovo": "XKX"}
-def iso_or_lookup(row):
-    iso = row["ISO"]
-    if iso and re.fullmatch(r"[A-Z]{3}", iso):
-        return iso
-    name = row["Country Name"].split(",")[0]  # strip suffix like ", China"
-    return manual_iso.get(row["Country Name"]) or manual_iso.get(name) \
-        or (lambda n: pycountry.countries.lookup(n).alpha_3
-                     if pycountry.countries.get(name=n) else None)(name)
-
-df["ISO"] = df.apply(iso_or_lookup, axis=1)
-df = df[df["ISO"].notna()].copy()
-
-# ------------------------------------------------------------------
-# 6) Drop early-year columns (<2001)
-# ------------------------------------------------------------------
-cols_to_drop = [c for c in df.columns if c.isdigit() and int(c) < 2001]
-df = df.drop(columns=cols_to_drop)
-
-# ------------------------------------------------------------------
-# 7) Drop rows with ANY NaN from 2008+
-# ------------------------------------------------------------------
-cols_2008_plus = [c for c in df.columns if c.isdigit() and int(c) >= 2008]
-df = df.dropna(subset=cols_2008_plus, how="any")
-
-# ------------------------------------------------------------------
-# 8) Remove region / aggregate rows
-# ------------------------------------------------------------------
-region_pattern = re.compile(
-    r"World|Europe|Asia|Africa|America|Caribbean|OECD|income|Middle East|"
-    r"Euro area|Arab World|Least developed|IDA|IBRD|LDC|Small states|"
-    r"Sub-Saharan|Pacific|G20|G7", re.IGNORECASE)
-df = df[~df["Country Name"].str.contains(region_pattern, na=False)]
-
-# ------------------------------------------------------------------
-# 9) Melt to long format & convert to billions
-gdp_ppp_long = df.melt(
-    id_vars=["Country Name", "ISO", "gdp_ppp_2021"],
-    var_name="Year",
-    value_name="GDP_PPP"
-).reset_index(drop=True)
-
-# --- safe numeric conversion of Year -----------------------------------
-gdp_ppp_long["Year"] = pd.to_numeric(gdp_ppp_long["Year"], errors="coerce")
-gdp_ppp_long = gdp_ppp_long.dropna(subset=["Year"])
-gdp_ppp_long["Year"] = gdp_ppp_long["Year"].astype(int)
-
-
-gdp_ppp_long = gdp_ppp_long.dropna(subset=["GDP_PPP"])
-
-# quick check
-print(gdp_ppp_long.head())
-print("Rows after cleaning:", len(gdp_ppp_long))
-print("Distinct countries:", gdp_ppp_long["ISO"].nunique())
-gdp_ppp_long.to_csv("gdp_ppp_2021_long.csv", index=False)
+from pathlib import Path
+from iso_resolver import resolve_iso
+from region_filter import is_wdi_aggregate
+from storage import checkpoint
+from wdi_loader import read_wdi
+
+ROOT = Path(__file__).resolve().parents[1]
+path = ROOT / "Data/data1_old/GDP/gdp_ppp_2021constant.csv"  # <-- set full path
+wacc_path = ROOT / "WACC_Thesis_old/merged_with_wacc_updated.csv"
+
+
+def clean_gdp_ppp_2021(path=path, save_to=None):
+    """WDI GDP PPP (constant 2021 $) in long format, aggregates removed."""
+    # 1) Read the WDI file (metadata rows, "[YRxxxx]" headers and ".." cells
+    #    are handled by the shared loader), long format from the start
+    # ------------------------------------------------------------------
+    gdp_ppp_long = read_wdi(path)
+
+    # ------------------------------------------------------------------
+    # 2) Basic column housekeeping
+    # ------------------------------------------------------------------
+    gdp_ppp_long = gdp_ppp_long.rename(columns={
+        "Indicator Name": "gdp_ppp_2021",
+        "Value": "GDP_PPP"
+    }).drop(columns=["Indicator Code"], errors="ignore")
+
+    # ------------------------------------------------------------------
+    # 3) Ensure valid ISO – patch special cases
+    # ------------------------------------------------------------------
+    # WDI codes are kept as-is, only malformed codes are resolved from the name
+    valid_iso = gdp_ppp_long["ISO"].str.fullmatch(r"[A-Z]{3}", na=False)
+    gdp_ppp_long.loc[~valid_iso, "ISO"] = resolve_iso(gdp_ppp_long.loc[~valid_iso, "Country Name"])
+    gdp_ppp_long = gdp_ppp_long[gdp_ppp_long["ISO"].notna()]
+
+    # ------------------------------------------------------------------
+    # 4) Drop early years (<2001)
+    # ------------------------------------------------------------------
+    gdp_ppp_long = gdp_ppp_long[gdp_ppp_long["Year"] >= 2001]
+
+    # ------------------------------------------------------------------
+    # 5) Remove region / aggregate rows
+    # ------------------------------------------------------------------
+    # (pattern in region_filter.WDI_AGGREGATES, matched once per country name)
+    gdp_ppp_long = gdp_ppp_long[~is_wdi_aggregate(gdp_ppp_long["Country Name"])]
+
+    # ------------------------------------------------------------------
+    # 6) Missing values stay as NaN rows (as in the csv-reader version, where
+    #    empty / ".." cells were text and never dropped); the WACC merge below
+    #    is a left join, so they only mark the gaps
+    # ------------------------------------------------------------------
+    gdp_ppp_long = gdp_ppp_long.reset_index(drop=True)
+
+    # quick check
+    print(gdp_ppp_long.head())
+    print("Rows after cleaning:", len(gdp_ppp_long))
+    print("Distinct countries:", gdp_ppp_long["ISO"].nunique())
+    return checkpoint(gdp_ppp_long, save_to)
 
 #NEW MERGE WITH WACC
 
-# 1️⃣  Load the cleaned GDP-PPP long file you just created
-#     (if it's still in memory, skip this read and reuse the DataFrame)
-gdp_ppp_long = pd.read_csv("../Data/data1_old/GDP/gdp_ppp_2021_long.csv")   # update path if saved elsewhere
-
-# 2️⃣  Load the WACC dataset
-wacc_path = "/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/WACC_Thesis_old/merged_with_wacc_updated.csv"
-wacc_df = pd.read_csv(wacc_path)
-
-# 3️⃣  Align the Year column type
-gdp_ppp_long["Year"] = gdp_ppp_long["Year"].astype(int)
-wacc_df["year"] = wacc_df["year"].astype(int)          # ensure correct column name
-wacc_df = wacc_df.rename(columns={"year": "Year"})     # rename to match
-
-# 4️⃣  Merge WACC (left) with GDP-PPP (right)
-wacc_gdp_merged = pd.merge(
-    wacc_df,
-    gdp_ppp_long[["ISO", "Year", "GDP_PPP"]],
-    on=["ISO", "Year"],
-    how="left"
-)
-
-# 5️⃣  Quick summary
-print("Merged rows:", len(wacc_gdp_merged))
-print("Rows missing GDP_PPP:", wacc_gdp_merged['GDP_PPP'].isna().sum())
-print(wacc_gdp_merged.head())
-
-# 6️⃣  Save if desired
-wacc_gdp_merged.to_csv("wacc_with_gdpppp2021.csv", index=False)
-print("✅ Saved merged file: wacc_with_gdpppp2021.csv")
-
-print("All columns in merged DF:")
-print(wacc_gdp_merged.columns.tolist())
\ No newline at end of file
+def merge_wacc_gdp_ppp(gdp_ppp_long, wacc_df=None, save_to=None):
+    """Left-join GDP PPP onto the WACC rows by ISO / Year."""
+    # 1️⃣  The cleaned GDP-PPP long frame comes straight from clean_gdp_ppp_2021
+
+    # 2️⃣  Load the WACC dataset
+    if wacc_df is None:
+        wacc_df = pd.read_csv(wacc_path)
+
+    # 3️⃣  Align the Year column type
+    gdp_ppp_long["Year"] = gdp_ppp_long["Year"].astype(int)
+    wacc_df["year"] = wacc_df["year"].astype(int)          # ensure correct column name
+    wacc_df = wacc_df.rename(columns={"year": "Year"})     # rename to match
+
+    # 4️⃣  Merge WACC (left) with GDP-PPP (right)
+    wacc_gdp_merged = pd.merge(
+        wacc_df,
+        gdp_ppp_long[["ISO", "Year", "GDP_PPP"]],
+        on=["ISO", "Year"],
+        how="left"
+    )
+
+    # 5️⃣  Quick summary
+    print("Merged rows:", len(wacc_gdp_merged))
+    print("Rows missing GDP_PPP:", wacc_gdp_merged['GDP_PPP'].isna().sum())
+    print(wacc_gdp_merged.head())
+
+    print("All columns in merged DF:")
+    print(wacc_gdp_merged.columns.tolist())
+    return checkpoint(wacc_gdp_merged, save_to)
+
+
+def run(save=True):
+    gdp_ppp_long = clean_gdp_ppp_2021(save_to="gdp_ppp_2021_long.csv" if save else None)
+    # 6️⃣  Save if desired
+    return merge_wacc_gdp_ppp(gdp_ppp_long, save_to="wacc_with_gdpppp2021.csv" if save else None)
+
+
+if __name__ == "__main__":
+    run()
@@ -1,50 +1,48 @@
 import pandas as pd
+from pathlib import Path
+from storage import checkpoint
+from wdi_loader import load_wdi
 #CREATES THE FINAL DATASET FOR THE REGRESSION WITH WACC
 # File paths (adjust if needed)
-pop_path = "/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/Data/data1_old/Population/Population.csv"
-wacc_path = "/1.Cleaning_and_Merges/wacc_with_gdpppp2021.csv"
+pop_path = Path(__file__).resolve().parents[1] / "Data/data1_old/Population/Population.csv"
+wacc_path = Path(__file__).resolve().parent / "wacc_with_gdpppp2021.csv"
 
-# Load the Population file, skipping the first 4 rows
-pop_df_raw = pd.read_csv(pop_path, skiprows=4)
 
-# Load the WACC dataframe
-wacc_df = pd.read_csv(wacc_path)
+def merge_population(wacc_df=None, pop_path=pop_path, save_to=None, pop_long=None):
+    """Historical regression frame: WACC + macro + WDI population + gdp_ppp (billions).
 
-# Step 1: Keep only "Country Code" and years from 2008 to 2023
-years = [str(year) for year in range(2008, 2024)]
-pop_df_filtered = pop_df_raw[['Country Code'] + years]
+    `pop_long` (ISO, Year, Population) can be handed over when the population
+    indicator was already loaded, e.g. by stage 1; otherwise it is read here.
+    """
+    # Load the Population file, years 2008 to 2023, long format keyed by ISO / Year
+    if pop_long is None:
+        pop_long = load_wdi({'Population': pop_path}, years=range(2008, 2024))
 
-# Step 2: Reshape from wide to long format
-pop_long = pop_df_filtered.melt(
-    id_vars='Country Code',
-    var_name='Year',
-    value_name='Population'
-)
+    # Load the WACC dataframe (only when stage 5 did not hand it over)
+    if wacc_df is None:
+        wacc_df = pd.read_csv(wacc_path)
 
-# Step 3: Rename column for merging
-pop_long.rename(columns={'Country Code': 'ISO'}, inplace=True)
+    # Step 5: Merge WACC with Population using ISO and Year
+    merged_df = pd.merge(wacc_df, pop_long, on=['ISO', 'Year'], how='left')
 
-# Step 4: Convert "Year" column to integers
-pop_long['Year'] = pop_long['Year'].astype(int)
+    # (Optional) Show or export the merged DataFrame
+    print(merged_df.head())
 
-# Step 5: Merge WACC with Population using ISO and Year
-merged_df = pd.merge(wacc_df, pop_long, on=['ISO', 'Year'], how='left')
+    #Convert GDP_PPP from trillions to billions
+    # Create a new column for GDP_PPP in billions
+    merged_df['gdp_ppp'] = merged_df['GDP_PPP'] / 1_000_000_000
 
-# (Optional) Show or export the merged DataFrame
-print(merged_df.head())
+    # Optional: view the result
+    print(merged_df[['ISO', 'Year', 'GDP_PPP', 'gdp_ppp']].head())
 
-#Convert GDP_PPP from trillions to billions
-# Create a new column for GDP_PPP in billions
-merged_df['gdp_ppp'] = merged_df['GDP_PPP'] / 1_000_000_000
+    # Drop the GDP_PPP column
+    merged_df.drop(columns=['GDP_PPP'], inplace=True)
 
-# Optional: view the result
-print(merged_df[['ISO', 'Year', 'GDP_PPP', 'gdp_ppp']].head())
+    # Optional: view the result
+    print(merged_df.head())
+    return checkpoint(merged_df, save_to)
 
-# Drop the GDP_PPP column
-merged_df.drop(columns=['GDP_PPP'], inplace=True)
 
-# Optional: view the result
-print(merged_df.head())
-
-# Save the final DataFrame to CSV
-merged_df.to_csv("final_wacc_macro_historical.csv", index=False)
\ No newline at end of file
+if __name__ == "__main__":
+    # Save the final DataFrame to CSV
+    merge_population(save_to="final_wacc_macro_historical.csv")
@@ -1,14 +1,20 @@
 #Creates macro_gdp_merged.csv
 # 1. GDP PPP CLEANING
 import pandas as pd
-import pycountry
+from pathlib import Path
+from excel_cache import read_excel_cached
+from iamc_stream import stream_iamc
+from iso_resolver import resolve_iso
+from ngfs_reconstruct import reconstruct
+from region_filter import is_aggregate, strip_prefix
+from storage import checkpoint
 
-# === Load the raw GDP PPP data ===
-gdp_path = "/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/Data/data_projection_df/gdp_ppp.csv"  # Update this with your actual path
-gdp_df = pd.read_csv(gdp_path)
+ROOT = Path(__file__).resolve().parents[1]
 
-# === Drop unnecessary columns ===
-gdp_df = gdp_df.drop(columns=["Model", "Unit"])
+# === Load the raw GDP PPP data ===
+gdp_path = ROOT / "Data/data_projection_df/gdp_ppp.csv"  # Update this with your actual path
+wacc_xlsx = ROOT / "Data/data_projection_df/WACC.xlsx"
+macro_path = ROOT / "Data/data1_old/NGFS RAW/macrofinal.csv"
 
 # === Rename scenarios ===
 scenario_name_map = {
@@ -16,279 +22,243 @@ scenario_name_map = {
     "Nationally Determined Contributions (NDCs)": "NDC",
     "Net Zero 2050": "Netzero"
 }
-gdp_df["Scenario"] = gdp_df["Scenario"].replace(scenario_name_map)
-
-# === Remove "Current Policies" scenario ===
-gdp_df = gdp_df[gdp_df["Scenario"] != "Current Policies"]
-
-# === Standardize Variable column ===
-gdp_df["Variable"] = "gdp_ppp"
-
-# === Rename Region to ISO ===
-gdp_df = gdp_df.rename(columns={"Region": "ISO"})
-
-# === Add Country column based on ISO ===
-def iso_to_country(iso_code):
-    try:
-        return pycountry.countries.get(alpha_3=iso_code).name
-    except:
-        return None
-
-gdp_df["Country"] = gdp_df["ISO"].apply(iso_to_country)
-
-# === Reorder columns to place Country next to ISO ===
-cols = gdp_df.columns.tolist()
-if "ISO" in cols and "Country" in cols:
-    iso_index = cols.index("ISO")
-    cols.insert(iso_index + 1, cols.pop(cols.index("Country")))
-    gdp_df = gdp_df[cols]
-
-# === Convert to long format: one row per year ===
-id_vars = ["Scenario", "ISO", "Country", "Variable"]
-value_vars = [col for col in gdp_df.columns if col not in id_vars]
 
-gdp_ppp_long = gdp_df.melt(
-    id_vars=id_vars,
-    value_vars=value_vars,
-    var_name="Year",
-    value_name="gdp_ppp"
-)
+# Define forecast years (every 5 years from 2025 to 2050)
+forecast_years = [str(y) for y in range(2025, 2051, 5)]
 
-# Preview
-print(gdp_ppp_long.head())
 
-#CLEAN WACC FILE
-# === Load the WACC file ===
-wacc_raw = pd.read_excel("/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/Data/data_projection_df/WACC.xlsx")
+def clean_gdp_ppp(gdp_path=gdp_path):
+    """NGFS GDP PPP in long format (Scenario, ISO, Country, Variable, Year, gdp_ppp)."""
+    gdp_df = pd.read_csv(gdp_path)
 
-# === Manual ISO patch for unrecognized countries ===
-manual_iso_map = {
-    "Taiwan, China": "TWN"
-}
+    # === Drop unnecessary columns ===
+    gdp_df = gdp_df.drop(columns=["Model", "Unit"])
 
-def get_iso_alpha3_patched(country):
-    if country in manual_iso_map:
-        return manual_iso_map[country]
-    try:
-        return pycountry.countries.lookup(country).alpha_3
-    except:
-        return None
-
-# === Step 1: Keep only necessary columns ===
-wacc_cleaned = wacc_raw[['Country name', 'Technology', 'Financing year', 'WACC (nominal, after-tax)']].copy()
-wacc_cleaned = wacc_cleaned.rename(columns={
-     'Country name': 'Country',
-    'Technology': 'technology',
-    'Financing year': 'Year',
-    'WACC (nominal, after-tax)': 'wacc'
-})
-
-# === Step 2: Add technology dummy variables ===
-wacc_cleaned["is_solar"] = (wacc_cleaned["technology"] == "Solar PV").astype(int)
-wacc_cleaned["is_wind_onshore"] = (wacc_cleaned["technology"] == "Wind onshore").astype(int)
-wacc_cleaned["is_wind_offshore"] = (wacc_cleaned["technology"] == "Wind offshore").astype(int)
-
-# === Step 3: Add ISO codes from Country (patched) ===
-wacc_cleaned["ISO"] = wacc_cleaned["Country"].apply(get_iso_alpha3_patched)
-wacc_cleaned = wacc_cleaned[wacc_cleaned["ISO"].notna()]
-
-# === Step 4: Add 'Scenario' and 'Variable' columns to match GDP PPP format ===
-wacc_cleaned["Scenario"] = None
-wacc_cleaned["Variable"] = "wacc"
-
-# === Step 5: Reorder columns (no 'Scenario') ===
-wacc_cleaned = wacc_cleaned[[
-    "ISO", "Country", "Variable", "Year", "wacc",
-    "is_solar", "is_wind_onshore", "is_wind_offshore"
-]]
-
-# === Step 6: Save or preview ===
-# wacc_cleaned.to_csv("wacc_cleaned.csv", index=False)
-print(wacc_cleaned.head())
-print("✅ WACC cleaned. Total unique countries:", wacc_cleaned['ISO'].nunique())
-
-wacc_cleaned.to_csv("wacc_cleaned.csv", index=False)
+    # === Rename scenarios ===
+    gdp_df["Scenario"] = gdp_df["Scenario"].replace(scenario_name_map)
 
-#MACROFINAL CLEANING
-# === Load macrofinal ===
-macro_raw = pd.read_csv("/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/Data/data1_old/NGFS RAW/macrofinal.csv")  # Update with your path
+    # === Remove "Current Policies" scenario ===
+    gdp_df = gdp_df[gdp_df["Scenario"] != "Current Policies"]
 
-# 1. Remove 'Model' column
-if 'Model' in macro_raw.columns:
-    macro_raw = macro_raw.drop(columns=["Model"])
+    # === Standardize Variable column ===
+    gdp_df["Variable"] = "gdp_ppp"
 
-# 2. Extract country names from 'Region'
-macro_raw["Country"] = macro_raw["Region"].str.replace(r"^NiGEM NGFS v[\d\.]+\|\s*", "", regex=True)
+    # === Rename Region to ISO ===
+    gdp_df = gdp_df.rename(columns={"Region": "ISO"})
 
-# 3. Remove aggregate regions
-regions_to_exclude = [
-    "Africa", "Asia", "Central America", "Europe", "Middle East", "North America",
-    "South America", "World", "Rest of the World", "European Union", "Pacific Island States"
-]
-macro_raw = macro_raw[~macro_raw["Country"].isin(regions_to_exclude)]
+    # === Add Country column based on ISO ===
+    gdp_df["Country"] = resolve_iso(gdp_df["ISO"], to="name")
 
-# 4. Rename scenarios
-scenario_name_map = {
-    "Below 2?C": "Below2",
-    "Nationally Determined Contributions (NDCs)": "NDC",
-    "Net Zero 2050": "Netzero"
-}
-macro_raw["Scenario"] = macro_raw["Scenario"].replace(scenario_name_map)
-
-# 5. Keep only inflation and unemployment
-keep_vars = [
-    "Unemployment rate ; %",
-    "Inflation rate ; %",
-    "Unemployment rate ; %(combined)",
-    "Inflation rate ; %(combined)"
-]
-macro_raw = macro_raw[macro_raw["Variable"].isin(keep_vars)]
-
-# 6. Normalize variable names
-variable_rename_map = {
-    "Unemployment rate ; %": "unemployment",
-    "Unemployment rate ; %(combined)": "unemployment",
-    "Inflation rate ; %": "inflation",
-    "Inflation rate ; %(combined)": "inflation"
-}
-macro_raw["Variable"] = macro_raw["Variable"].map(variable_rename_map)
+    # === Reorder columns to place Country next to ISO ===
+    cols = gdp_df.columns.tolist()
+    if "ISO" in cols and "Country" in cols:
+        iso_index = cols.index("ISO")
+        cols.insert(iso_index + 1, cols.pop(cols.index("Country")))
+        gdp_df = gdp_df[cols]
 
-# 7. Add ISO codes
-def get_iso(name):
-    try:
-        return pycountry.countries.lookup(name).alpha_3
-    except:
-        return None
+    # === Convert to long format: one row per year ===
+    id_vars = ["Scenario", "ISO", "Country", "Variable"]
+    value_vars = [col for col in gdp_df.columns if col not in id_vars]
 
-macro_raw["ISO"] = macro_raw["Country"].apply(get_iso)
+    gdp_ppp_long = gdp_df.melt(
+        id_vars=id_vars,
+        value_vars=value_vars,
+        var_name="Year",
+        value_name="gdp_ppp"
+    )
 
-# Manually patch ISO if needed
-manual_iso_map = {
-    "Russia": "RUS",
-    "South Korea": "KOR"
-}
-macro_raw["ISO"] = macro_raw.apply(lambda row: manual_iso_map.get(row["Country"], row["ISO"]), axis=1)
-macro_raw = macro_raw[macro_raw["ISO"].notna()]
-
-# 8. Reorder columns
-year_cols = [col for col in macro_raw.columns if col.isdigit()]
-macro_cleaned = macro_raw[["Scenario", "ISO", "Country", "Variable"] + year_cols]
-
-# 9. Melt to long format
-macro_cleaned = macro_cleaned.melt(
-    id_vars=["Scenario", "ISO", "Country", "Variable"],
-    var_name="Year",
-    value_name="Value"
-)
-
-# Rename after melting (optional)
-# If this is the first time you're melting:
-macro_long = pd.melt(
-    macro_cleaned,
-    id_vars=["Scenario", "ISO", "Country", "Variable"],
-    var_name="Year",
-    value_name="MacroValue"
-)
-
-#Rename to 'Value' if needed later
-macro_long = macro_long.rename(columns={"MacroValue": "Value"})
-
-# Ensure Year is string
-macro_long["Year"] = macro_long["Year"].astype(str)
-
-print(macro_long.head())
-
-# 10. Preview
-print(macro_long.head())
-print("✅ Macro cleaned. Rows:", len(macro_long), " | Countries:", macro_long['ISO'].nunique())
-print("🔍 Columns in macro_cleaned:", macro_cleaned.columns.tolist())
+    # Preview
+    print(gdp_ppp_long.head())
+    return gdp_ppp_long
 
-#CALCULATING SCENARIO VALUES FROM BASELINE IN MACRO_LONG
-# 1. Separate baseline and non-baseline data
-baseline_df = macro_cleaned[macro_cleaned["Scenario"] == "Baseline"]
-scenarios = macro_cleaned["Scenario"].unique().tolist()
-scenarios = [s for s in scenarios if s != "Baseline"]
 
+#CLEAN WACC FILE
+def clean_wacc(wacc_xlsx=wacc_xlsx, save_to=None):
+    """WACC rows with ISO codes and technology dummies (wacc_cleaned.csv)."""
+    # === Load the WACC file ===
+    wacc_raw = read_excel_cached(wacc_xlsx, engine="openpyxl")
+
+    # === Step 1: Keep only necessary columns ===
+    wacc_cleaned = wacc_raw[['Country name', 'Technology', 'Financing year', 'WACC (nominal, after-tax)']].copy()
+    wacc_cleaned = wacc_cleaned.rename(columns={
+         'Country name': 'Country',
+        'Technology': 'technology',
+        'Financing year': 'Year',
+        'WACC (nominal, after-tax)': 'wacc'
+    })
+
+    # === Step 2: Add technology dummy variables ===
+    wacc_cleaned["is_solar"] = (wacc_cleaned["technology"] == "Solar PV").astype(int)
+    wacc_cleaned["is_wind_onshore"] = (wacc_cleaned["technology"] == "Wind onshore").astype(int)
+    wacc_cleaned["is_wind_offshore"] = (wacc_cleaned["technology"] == "Wind offshore").astype(int)
+
+    # === Step 3: Add ISO codes from Country (manual patches live in iso_resolver) ===
+    wacc_cleaned["ISO"] = resolve_iso(wacc_cleaned["Country"])
+    wacc_cleaned = wacc_cleaned[wacc_cleaned["ISO"].notna()]
+
+    # === Step 4: Add 'Scenario' and 'Variable' columns to match GDP PPP format ===
+    wacc_cleaned["Scenario"] = None
+    wacc_cleaned["Variable"] = "wacc"
+
+    # === Step 5: Reorder columns (no 'Scenario') ===
+    wacc_cleaned = wacc_cleaned[[
+        "ISO", "Country", "Variable", "Year", "wacc",
+        "is_solar", "is_wind_onshore", "is_wind_offshore"
+    ]]
+
+    # === Step 6: Save or preview ===
+    print(wacc_cleaned.head())
+    print("✅ WACC cleaned. Total unique countries:", wacc_cleaned['ISO'].nunique())
+    return checkpoint(wacc_cleaned, save_to)
 
 
-# 2. Merge baseline with each scenario by ISO, Variable, and Year
-reconstructed_frames = []
+#MACROFINAL CLEANING
+def clean_macro(macro_path=macro_path, save_to=None):
+    """NiGEM inflation / unemployment deltas, long format.
+
+    Returns (macro_cleaned, macro_long); `save_to` persists macro_long.
+    """
+    keep_vars = [
+        "Unemployment rate ; %",
+        "Inflation rate ; %",
+        "Unemployment rate ; %(combined)",
+        "Inflation rate ; %(combined)"
+    ]
+
+    # === Load macrofinal === streamed in chunks; keeps only inflation and
+    # unemployment (step 5) and drops aggregate regions (step 3) while reading
+    macro_raw = stream_iamc(
+        macro_path,
+        filters={"Variable": keep_vars},
+        exclude={"Region": is_aggregate},
+        melt=False,
+    )
 
-for scenario in scenarios:
-    scenario_df = macro_cleaned[macro_cleaned["Scenario"] == scenario]
+    # 1. Remove 'Model' column
+    if 'Model' in macro_raw.columns:
+        macro_raw = macro_raw.drop(columns=["Model"])
+
+    # 2. Extract country names from 'Region'
+    macro_raw["Country"] = strip_prefix(macro_raw["Region"])
+
+    # 4. Rename scenarios
+    macro_raw["Scenario"] = macro_raw["Scenario"].replace(scenario_name_map)
+
+    # 6. Normalize variable names
+    variable_rename_map = {
+        "Unemployment rate ; %": "unemployment",
+        "Unemployment rate ; %(combined)": "unemployment",
+        "Inflation rate ; %": "inflation",
+        "Inflation rate ; %(combined)": "inflation"
+    }
+    macro_raw["Variable"] = macro_raw["Variable"].map(variable_rename_map)
+
+    # 7. Add ISO codes (Russia / South Korea patches live in iso_resolver)
+    macro_raw["ISO"] = resolve_iso(macro_raw["Country"])
+    macro_raw = macro_raw[macro_raw["ISO"].notna()]
+
+    # 8. Reorder columns
+    year_cols = [col for col in macro_raw.columns if col.isdigit()]
+    macro_cleaned = macro_raw[["Scenario", "ISO", "Country", "Variable"] + year_cols]
+
+    # 9. Melt to long format
+    macro_cleaned = macro_cleaned.melt(
+        id_vars=["Scenario", "ISO", "Country", "Variable"],
+        var_name="Year",
+        value_name="Value"
+    )
 
-    merged = pd.merge(
-        scenario_df,
-        baseline_df,
-        on=["ISO", "Variable", "Year"],
-        suffixes=("_scenario", "_baseline"),
-        how="inner"
+    # Rename after melting (optional)
+    # If this is the first time you're melting:
+    macro_long = pd.melt(
+        macro_cleaned,
+        id_vars=["Scenario", "ISO", "Country", "Variable"],
+        var_name="Year",
+        value_name="MacroValue"
     )
 
-    # 3. Reconstruct actual values by adding delta to baseline
-    merged["Value"] = merged["Value_baseline"] + merged["Value_scenario"]
+    #Rename to 'Value' if needed later
+    macro_long = macro_long.rename(columns={"MacroValue": "Value"})
 
-    # 4. Build cleaned output
-    merged_cleaned = merged[["Scenario_scenario", "ISO", "Variable", "Year", "Value"]].rename(
-        columns={"Scenario_scenario": "Scenario"}
-    )
+    # Ensure Year is string
+    macro_long["Year"] = macro_long["Year"].astype(str)
 
-    # Append to results
-    reconstructed_frames.append(merged_cleaned)
+    # 10. Preview
+    print(macro_long.head())
+    print("✅ Macro cleaned. Rows:", len(macro_long), " | Countries:", macro_long['ISO'].nunique())
+    print("🔍 Columns in macro_cleaned:", macro_cleaned.columns.tolist())
+    checkpoint(macro_long, save_to)
+    return macro_cleaned, macro_long
 
-# 5. Add original baseline data back in
-baseline_cleaned = baseline_df[["Scenario", "ISO", "Variable", "Year", "Value"]]
 
-# 6. Concatenate all into macro_reconstructed
-macro_reconstructed = pd.concat([baseline_cleaned] + reconstructed_frames, ignore_index=True)
+#CALCULATING SCENARIO VALUES FROM BASELINE IN MACRO_LONG
+def reconstruct_scenarios(macro_cleaned):
+    """Scenario levels = baseline + NiGEM delta; baseline rows kept as-is."""
+    # Baseline rows are kept, every other scenario is matched to the baseline on
+    # ISO, Variable and Year and rebuilt in one aligned add; Country comes along
+    macro_reconstructed = reconstruct(
+        macro_cleaned,
+        keys=["ISO", "Variable", "Year"],
+        values=["Value"],
+        carry=["Country"],
+        include_baseline=True,
+    )
 
-# Optional: Add back country info if you need it
-macro_reconstructed = pd.merge(
-    macro_reconstructed,
-    macro_cleaned[["ISO", "Country"]].drop_duplicates(),
-    on="ISO",
-    how="left"
-)
+    # ✅ Preview result
+    print(macro_reconstructed.head())
+    return macro_reconstructed
 
-# ✅ Preview result
-print(macro_reconstructed.head())
 
 #MERGE GDP_PPP AND MACRO CLEANED
-# Step 1: Pivot macro_reconstructed to wide format
-macro_reconstructed_wide = macro_reconstructed.pivot_table(
-    index=["Scenario", "ISO", "Country", "Year"],
-    columns="Variable",
-    values="Value"
-).reset_index()
-
-# Define forecast years (every 5 years from 2025 to 2050)
-forecast_years = [str(y) for y in range(2025, 2051, 5)]
+def merge_macro_gdp(macro_reconstructed, gdp_ppp_long, save_to=None):
+    """Wide macro panel joined with GDP PPP on the 5-year forecast grid."""
+    # Step 1: Pivot macro_reconstructed to wide format
+    macro_reconstructed_wide = macro_reconstructed.pivot_table(
+        index=["Scenario", "ISO", "Country", "Year"],
+        columns="Variable",
+        values="Value"
+    ).reset_index()
+
+    # Step 2:Filter GDP PPP for forecast years
+    gdp_forecast = gdp_ppp_long[
+        gdp_ppp_long["Year"].isin(forecast_years)
+    ][["ISO", "Scenario", "Year", "gdp_ppp"]]
+
+    # Step 3: Merge with gdp_forecast
+    macro_gdp_merged = pd.merge(
+        macro_reconstructed_wide,
+        gdp_forecast,
+        on=["ISO", "Scenario", "Year"],
+        how="inner"
+    )
 
-# Step 2:Filter GDP PPP for forecast years
-gdp_forecast = gdp_ppp_long[
-    gdp_ppp_long["Year"].isin(forecast_years)
-][["ISO", "Scenario", "Year", "gdp_ppp"]]
+    # ✅ Preview result
+    print(macro_gdp_merged.head())
 
-# Step 3: Merge with gdp_forecast
-macro_gdp_merged = pd.merge(
-    macro_reconstructed_wide,
-    gdp_forecast,
-    on=["ISO", "Scenario", "Year"],
-    how="inner"
-)
+    #HOW MANY COUNTRIES PER SCENARIO AFTER MERGE = IN ALL 48 COUNTRIES
+    country_counts = macro_gdp_merged.groupby("Scenario")["ISO"].nunique().reset_index()
+    country_counts.columns = ["Scenario", "Num_Countries"]
 
-# ✅ Preview result
-print(macro_gdp_merged.head())
+    print(country_counts)
+    return checkpoint(macro_gdp_merged, save_to)
 
-# Save reshaped macro data to file
-macro_long.to_csv("macro_long_cleaned.csv", index=False)
 
-# Save merged macro + GDP PPP data
-macro_gdp_merged.to_csv("macro_gdp_merged.csv", index=False)
-print("✅ Saved: macro_gdp_merged.csv")
+def run(save=True):
+    """Returns {"wacc_cleaned": ..., "macro_long": ..., "macro_gdp_merged": ...}."""
+    gdp_ppp_long = clean_gdp_ppp()
+    wacc_cleaned = clean_wacc(save_to="wacc_cleaned.csv" if save else None)
+    # Save reshaped macro data to file
+    macro_cleaned, macro_long = clean_macro(save_to="macro_long_cleaned.csv" if save else None)
+    macro_reconstructed = reconstruct_scenarios(macro_cleaned)
+    # Save merged macro + GDP PPP data
+    macro_gdp_merged = merge_macro_gdp(macro_reconstructed, gdp_ppp_long,
+                                       save_to="macro_gdp_merged.csv" if save else None)
+    return {
+        "wacc_cleaned": wacc_cleaned,
+        "macro_long": macro_long,
+        "macro_gdp_merged": macro_gdp_merged,
+    }
 
-#HOW MANY COUNTRIES PER SCENARIO AFTER MERGE = IN ALL 48 COUNTRIES
-country_counts = macro_gdp_merged.groupby("Scenario")["ISO"].nunique().reset_index()
-country_counts.columns = ["Scenario", "Num_Countries"]
 
-print(country_counts)
\ No newline at end of file
+if __name__ == "__main__":
+    run()
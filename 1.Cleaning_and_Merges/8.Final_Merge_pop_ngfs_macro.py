@@ -1,44 +1,61 @@
 import pandas as pd
+from pathlib import Path
+from storage import checkpoint
 #CREATES ngfs_final_merge.csv for 3.Projection
 
-# Load the files
-macro_gdp_merged = pd.read_csv("/1.Cleaning_and_Merges/macro_gdp_merged.csv")
-popgdp_cleaned = pd.read_csv("/1.Cleaning_and_Merges/popgdp_cleaned.csv")
-
-# Step 1: Rename scenarios
-popgdp_cleaned['Scenario'] = popgdp_cleaned['Scenario'].replace({
-    'Below 2C': 'Below2',
-    'Nationally Determined Contributions (NDCs)': 'NDC',
-    'Net Zero 2050': 'Netzero'
-})
-
-# Step 2: Filter only Population values from Remind-Magpie model
-pop_filtered = popgdp_cleaned[
-    (popgdp_cleaned['Model'] == 'Remind-Magpie') &
-    (popgdp_cleaned['Variable'].str.contains('Population', case=False, na=False))
-]
-
-# Step 3: Pivot to extract Population as its own column
-pop_pivoted = pop_filtered.pivot_table(
-    index=['Scenario', 'ISO', 'Year'],
-    columns='Variable',
-    values='Value'
-).reset_index()
-
-# Step 4: Keep only the Population column and rename it to lowercase
-pop_pivoted = pop_pivoted[['Scenario', 'ISO', 'Year', 'Population']]
-pop_pivoted.rename(columns={'Population': 'population'}, inplace=True)
-
-# Step 5: Merge with macro_gdp_merged
-merged_df_with_population = pd.merge(
-    macro_gdp_merged,
-    pop_pivoted,
-    on=['Scenario', 'ISO', 'Year'],
-    how='left'
-)
-
-# Optional: Save or preview
-# merged_df_with_population.to_csv("macro_gdp_with_population.csv", index=False)
-print(merged_df_with_population.head())
-#save
-merged_df_with_population.to_csv("ngfs_final_merge.csv", index=False)
\ No newline at end of file
+stage_dir = Path(__file__).resolve().parent
+
+
+def merge_ngfs_population(macro_gdp_merged=None, popgdp_cleaned=None, save_to=None):
+    """Adds REMIND-MAgPIE population to the NGFS macro + GDP PPP panel."""
+    # Load the files (only the ones the upstream stages did not hand over)
+    if macro_gdp_merged is None:
+        macro_gdp_merged = pd.read_csv(stage_dir / "macro_gdp_merged.csv")
+    if popgdp_cleaned is None:
+        popgdp_cleaned = pd.read_csv(stage_dir / "popgdp_cleaned.csv")
+
+    # Step 1: Rename scenarios
+    popgdp_cleaned['Scenario'] = popgdp_cleaned['Scenario'].replace({
+        'Below 2C': 'Below2',
+        'Nationally Determined Contributions (NDCs)': 'NDC',
+        'Net Zero 2050': 'Netzero'
+    })
+
+    # Step 2: Filter only Population values from Remind-Magpie model
+    pop_filtered = popgdp_cleaned[
+        (popgdp_cleaned['Model'] == 'Remind-Magpie') &
+        (popgdp_cleaned['Variable'].str.contains('Population', case=False, na=False))
+    ]
+
+    # Step 3: Pivot to extract Population as its own column
+    pop_pivoted = pop_filtered.pivot_table(
+        index=['Scenario', 'ISO', 'Year'],
+        columns='Variable',
+        values='Value'
+    ).reset_index()
+
+    # Step 4: Keep only the Population column and rename it to lowercase
+    pop_pivoted = pop_pivoted[['Scenario', 'ISO', 'Year', 'Population']]
+    pop_pivoted = pop_pivoted.rename(columns={'Population': 'population'})
+
+    # Both frames carry Year as text when handed over in memory (melted column
+    # names) and as int when re-read from CSV, align before merging
+    macro_gdp_merged = macro_gdp_merged.astype({'Year': int})
+    pop_pivoted = pop_pivoted.astype({'Year': int})
+
+    # Step 5: Merge with macro_gdp_merged
+    merged_df_with_population = pd.merge(
+        macro_gdp_merged,
+        pop_pivoted,
+        on=['Scenario', 'ISO', 'Year'],
+        how='left'
+    )
+
+    # Optional: Save or preview
+    print(merged_df_with_population.head())
+    return checkpoint(merged_df_with_population, save_to)
+
+
+if __name__ == "__main__":
+    #save
+    merge_ngfs_population(save_to="ngfs_final_merge.csv")
@@ -1,7 +1,9 @@
 #CLEANING AND CREATING SSPS DF FOR REGRESSION
 from pathlib import Path
 import pandas as pd
-import pycountry
+from excel_cache import read_excel_cached, read_excel_many
+from iso_resolver import resolve_iso
+from storage import checkpoint
 
 def tidy_governance_file(
     file_path: str | Path,
@@ -11,13 +13,20 @@ def tidy_governance_file(
     drop_empty_rows: bool = False,
     default_variable: str | None = None,
     default_scenario: str = "Baseline",
+    frame: pd.DataFrame | None = None,
 ) -> pd.DataFrame:
-    """Load → clean → reshape → return a fully de-NA’ed long DataFrame."""
-    # ── load
-    try:
-        df = pd.read_excel(file_path, sheet_name=sheet, engine="openpyxl")
-    except Exception as e:
-        raise ValueError(f"Failed to read file {file_path}: {e}")
+    """Load → clean → reshape → return a fully de-NA’ed long DataFrame.
+
+    `frame` is the already loaded sheet (see build_ssps); `file_path` is then
+    only used in messages.
+    """
+    # ── load (served from the Parquet cache after the first run)
+    if frame is None:
+        try:
+            frame = read_excel_cached(file_path, sheet_name=sheet, engine="openpyxl")
+        except Exception as e:
+            raise ValueError(f"Failed to read file {file_path}: {e}")
+    df = frame.copy()
 
     df.columns = (
         df.columns.astype(str)
@@ -49,13 +58,7 @@ def tidy_governance_file(
     if "Unit" in df.columns:
         df = df.drop(columns=["Unit"])
 
-    def to_iso(name: str) -> str | None:
-        try:
-            return pycountry.countries.lookup(name).alpha_3
-        except LookupError:
-            return None
-
-    df["ISO"] = df["Country"].apply(to_iso)
+    df["ISO"] = resolve_iso(df["Country"])
     df = df.dropna(subset=["ISO"])
 
     year_cols = [c for c in df.columns if c.isdigit()]
@@ -76,52 +79,64 @@ def tidy_governance_file(
 # Full paths (from you)
 # ───────────────────────────────────────────────────────────────────────────────
 
+ssps_dir = Path(__file__).resolve().parents[1] / "Data/data1_old/SSPS"
 paths = {
-    "governance":   "/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/Data/data1_old/SSPS/governance.xlsx",
-    "urbanization": "/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/Data/data1_old/SSPS/urbanization.xlsx",
-    "rule_law":     "/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/Data/data1_old/SSPS/rule_law.xlsx",
+    "governance":   ssps_dir / "governance.xlsx",
+    "urbanization": ssps_dir / "urbanization.xlsx",
+    "rule_law":     ssps_dir / "rule_law.xlsx",
 }
 
-# ───────────────────────────────────────────────────────────────────────────────
-# Build tidy data
-# ───────────────────────────────────────────────────────────────────────────────
 
-df_gov  = tidy_governance_file(paths["governance"], default_variable="Governance")
-df_urb  = tidy_governance_file(paths["urbanization"], drop_empty_cols=True, default_variable="Urbanization")
-df_rule = tidy_governance_file(paths["rule_law"], drop_empty_rows=True, default_variable="Rule of Law")
+def build_ssps(paths=paths, save=False):
+    """Tidy SSPS frames split by year range, keyed like the CSVs they used to be."""
+    # ───────────────────────────────────────────────────────────────────────────
+    # Build tidy data
+    # ───────────────────────────────────────────────────────────────────────────
 
-# 4.  Year-range splits
-# ───────────────────────────────────────────────────────────────────────────────
+    # the three workbooks are loaded concurrently (and cached) before tidying
+    names = ["governance", "urbanization", "rule_law"]
+    try:
+        raw = dict(zip(names, read_excel_many(
+            [(paths[n], "data") for n in names], engine="openpyxl")))
+    except Exception as e:
+        raise ValueError(f"Failed to read SSPS workbooks: {e}")
 
-# Governance splits (legacy request: 1996-2015 vs 2015-2099)
-df_gov_1996_2015 = df_gov[df_gov["Year"].between(1996, 2015)].copy()
-df_gov_2015_2099 = df_gov[df_gov["Year"].between(2015, 2099)].copy()
-df_gov_1996_2024 = df_gov[df_gov["Year"].between(1996, 2024)].copy()
+    df_gov  = tidy_governance_file(paths["governance"], default_variable="Governance",
+                                   frame=raw["governance"])
+    df_urb  = tidy_governance_file(paths["urbanization"], drop_empty_cols=True, default_variable="Urbanization",
+                                   frame=raw["urbanization"])
+    df_rule = tidy_governance_file(paths["rule_law"], drop_empty_rows=True, default_variable="Rule of Law",
+                                   frame=raw["rule_law"])
 
-# Urbanization & Rule-of-Law splits (≤2024 vs ≥2025)
-df_urb_pre2024   = df_urb[df_urb["Year"] <= 2024].copy()
-df_urb_2025plus  = df_urb[df_urb["Year"] >= 2025].copy()
+    # Quick confirmation prints (can delete)
+    print("Governance rows:",   len(df_gov))
+    print("Urbanization rows:", len(df_urb))
+    print("Rule-of-Law rows:",  len(df_rule))
 
-df_rule_pre2024  = df_rule[df_rule["Year"] <= 2024].copy()
-df_rule_2025plus = df_rule[df_rule["Year"] >= 2025].copy()
+    # 4.  Year-range splits
+    # ───────────────────────────────────────────────────────────────────────────
+    splits = {
+        # Governance splits (legacy request: 1996-2015 vs 2015-2099)
+        "governance_1996_2015": df_gov[df_gov["Year"].between(1996, 2015)].copy(),
+        "governance_2015_2099": df_gov[df_gov["Year"].between(2015, 2099)].copy(),
+        "governance_1996_2024": df_gov[df_gov["Year"].between(1996, 2024)].copy(),
+
+        # Urbanization & Rule-of-Law splits (≤2024 vs ≥2025)
+        "urbanization_pre2024":  df_urb[df_urb["Year"] <= 2024].copy(),
+        "urbanization_2025plus": df_urb[df_urb["Year"] >= 2025].copy(),
+
+        "rule_law_pre2024":  df_rule[df_rule["Year"] <= 2024].copy(),
+        "rule_law_2025plus": df_rule[df_rule["Year"] >= 2025].copy(),
+    }
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # 5.  (Optional) persist results as CSV
+    # ───────────────────────────────────────────────────────────────────────────
+    for name, frame in splits.items():
+        checkpoint(frame, f"{name}.csv" if save else None)
+
+    return splits
 
-# ───────────────────────────────────────────────────────────────────────────────
-# 5.  (Optional) persist results as CSV
-# ───────────────────────────────────────────────────────────────────────────────
 
-# Uncomment the block below if you want the files on disk
-df_gov_1996_2015.to_csv("governance_1996_2015.csv", index=False)
-df_gov_2015_2099.to_csv("governance_2015_2099.csv", index=False)
-df_gov_1996_2024.to_csv("governance_1996_2024.csv", index=False)
-#
-df_urb_pre2024.to_csv("urbanization_pre2024.csv", index=False)
-df_urb_2025plus.to_csv("urbanization_2025plus.csv", index=False)
-#
-df_rule_pre2024.to_csv("rule_law_pre2024.csv", index=False)
-df_rule_2025plus.to_csv("rule_law_2025plus.csv", index=False)
-
-# Quick confirmation prints (can delete)
 if __name__ == "__main__":
-    print("Governance rows:",   len(df_gov))
-    print("Urbanization rows:", len(df_urb))
-    print("Rule-of-Law rows:",  len(df_rule))
+    build_ssps(save=True)
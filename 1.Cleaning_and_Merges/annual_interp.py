@@ -0,0 +1,136 @@
+#ANNUAL INTERPOLATION OF THE 5-YEAR NGFS SCENARIO PANEL
+# The scenario panel (ngfs_final_merge) only has the forecast years 2025, 2030,
+# ..., 2050. Here every (Scenario, ISO) x variable series is upsampled to
+# annual steps with one of three kernels:
+#   - "linear"     straight lines between the knots
+#   - "loglinear"  constant growth rate between the knots (GDP); series with a
+#                  non-positive knot fall back to linear
+#   - "pchip"      monotone cubic (Fritsch-Carlson, as scipy's PchipInterpolator):
+#                  smooth, but no overshoot between the knots
+# No per-group apply: each variable is laid out as a groups x knot-years matrix
+# and all groups with the same available knots are interpolated in one array
+# operation. Years outside a group's first / last knot stay NaN.
+#
+#   annual = interpolate_annual(pd.read_csv("ngfs_final_merge.csv"))
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+METHODS = ("linear", "loglinear", "pchip")
+
+# per-variable kernel; variables not listed use `default`
+DEFAULT_METHODS = {"gdp_ppp": "loglinear"}
+
+
+def _linear(xk: np.ndarray, Y: np.ndarray, pos: np.ndarray, w: np.ndarray) -> np.ndarray:
+    return Y[:, pos] * (1 - w) + Y[:, pos + 1] * w
+
+
+def _pchip_slopes(xk: np.ndarray, Y: np.ndarray) -> np.ndarray:
+    """Fritsch-Carlson knot derivatives, groups x knots."""
+    h = np.diff(xk)
+    delta = np.diff(Y, axis=1) / h
+    if len(xk) == 2:
+        return np.repeat(delta, 2, axis=1)
+
+    d = np.zeros_like(Y)
+    w1, w2 = 2 * h[1:] + h[:-1], h[1:] + 2 * h[:-1]
+    same_sign = delta[:, :-1] * delta[:, 1:] > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        harmonic = (w1 + w2) / (w1 / delta[:, :-1] + w2 / delta[:, 1:])
+    d[:, 1:-1] = np.where(same_sign, harmonic, 0.0)
+
+    # one-sided three-point ends, shape-preserving
+    for end, (h0, h1, d0, d1) in ((0, (h[0], h[1], delta[:, 0], delta[:, 1])),
+                                  (-1, (h[-1], h[-2], delta[:, -1], delta[:, -2]))):
+        slope = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+        slope = np.where(np.sign(slope) != np.sign(d0), 0.0, slope)
+        slope = np.where((np.sign(d0) != np.sign(d1)) & (np.abs(slope) > 3 * np.abs(d0)), 3 * d0, slope)
+        d[:, end] = slope
+    return d
+
+
+def _kernel(xk: np.ndarray, Y: np.ndarray, targets: np.ndarray, method: str) -> np.ndarray:
+    """Interpolate the rows of Y (groups x knots at years xk) at `targets`."""
+    out = np.full((len(Y), len(targets)), np.nan)
+    inside = (targets >= xk[0]) & (targets <= xk[-1])
+    if len(xk) == 1:
+        out[:, inside] = Y[:, :1]
+        return out
+
+    t = targets[inside]
+    pos = np.clip(np.searchsorted(xk, t, side="right") - 1, 0, len(xk) - 2)
+    h = xk[pos + 1] - xk[pos]
+    w = (t - xk[pos]) / h
+
+    if method == "linear":
+        out[:, inside] = _linear(xk, Y, pos, w)
+    elif method == "loglinear":
+        positive = (Y > 0).all(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            logs = np.exp(_linear(xk, np.log(np.where(positive[:, None], Y, 1.0)), pos, w))
+        out[:, inside] = np.where(positive[:, None], logs, _linear(xk, Y, pos, w))
+    elif method == "pchip":
+        d = _pchip_slopes(xk, Y)
+        w2, w3 = w ** 2, w ** 3
+        out[:, inside] = ((2 * w3 - 3 * w2 + 1) * Y[:, pos] + (w3 - 2 * w2 + w) * h * d[:, pos]
+                          + (3 * w2 - 2 * w3) * Y[:, pos + 1] + (w3 - w2) * h * d[:, pos + 1])
+    else:
+        raise ValueError(f"unknown method {method!r}, use one of {METHODS}")
+    return out
+
+
+def interpolate(years: np.ndarray, Y: np.ndarray, targets: np.ndarray, method: str = "linear") -> np.ndarray:
+    """Interpolate every row of Y (groups x years, NaN = no knot) at `targets`.
+
+    Rows with the same available knots are interpolated together.
+    """
+    years = np.asarray(years, dtype="float64")
+    targets = np.asarray(targets, dtype="float64")
+    valid = ~np.isnan(Y)
+    out = np.full((len(Y), len(targets)), np.nan)
+    patterns, which = np.unique(valid, axis=0, return_inverse=True)
+    for p, pattern in enumerate(patterns):
+        if not pattern.any():
+            continue
+        rows = np.flatnonzero(which.reshape(-1) == p)
+        out[rows] = _kernel(years[pattern], Y[np.ix_(rows, np.flatnonzero(pattern))], targets, method)
+    return out
+
+
+def interpolate_annual(
+    panel: pd.DataFrame,
+    values=None,
+    *,
+    keys=("Scenario", "ISO"),
+    year: str = "Year",
+    carry=("Country",),
+    methods: dict | None = None,
+    default: str = "linear",
+) -> pd.DataFrame:
+    """`panel` (one row per `keys` x year, one column per variable) on annual steps.
+
+    `values` are the variable columns (default: all numeric columns but `year`);
+    `methods` maps a variable to its kernel (DEFAULT_METHODS otherwise).
+    `carry` columns are constant within a group and are copied. The result has
+    one row per group and year from the first to the last year of the panel,
+    groups in order of appearance.
+    """
+    keys, carry = list(keys), [c for c in carry if c in panel.columns]
+    methods = {**DEFAULT_METHODS, **(methods or {})}
+    if values is None:
+        values = [c for c in panel.select_dtypes("number").columns if c not in (year, *keys, *carry)]
+
+    group = panel.groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+    groups = panel[keys + carry].drop_duplicates(keys).reset_index(drop=True)
+    knot_years, knot = np.unique(panel[year].to_numpy(dtype="int64"), return_inverse=True)
+    targets = np.arange(knot_years[0], knot_years[-1] + 1)
+
+    out = {c: np.repeat(groups[c].to_numpy(), len(targets)) for c in keys + carry}
+    out[year] = np.tile(targets, len(groups))
+    for col in values:
+        Y = np.full((len(groups), len(knot_years)), np.nan)
+        Y[group, knot] = panel[col].to_numpy(dtype="float64")
+        out[col] = interpolate(knot_years, Y, targets, methods.get(col, default)).reshape(-1)
+    return pd.DataFrame(out)[[*keys, *carry, year, *values]]
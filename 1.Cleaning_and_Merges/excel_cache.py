@@ -0,0 +1,130 @@
+#ONE-TIME EXCEL -> COLUMNAR CACHE FOR THE SSPS AND WACC WORKBOOKS
+# openpyxl parsing is the slowest I/O in the pipeline. The first read of a
+# workbook sheet converts it to a Parquet file under .cache/excel/; later reads
+# are served from that file. An entry is reused while the workbook's mtime and
+# size are unchanged; if they changed, the content hash decides whether the
+# workbook really differs before it is parsed again.
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+CACHE_DIR = Path(__file__).resolve().parent / ".cache" / "excel"
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _entry(path: Path, sheet_name, cache_dir: Path) -> Path:
+    key = hashlib.sha1(f"{path}|{sheet_name!r}".encode()).hexdigest()[:16]
+    return cache_dir / f"{path.stem}__{key}"
+
+
+def _load(entry: Path, meta: dict) -> pd.DataFrame:
+    if meta["format"] == "parquet":
+        df = pd.read_parquet(entry.with_suffix(".parquet"))
+    else:
+        df = pd.read_pickle(entry.with_suffix(".pkl"))
+    # Parquet needs string headers, restore the original ones (e.g. int years)
+    df.columns = meta["columns"]
+    return df
+
+
+def _store(df: pd.DataFrame, entry: Path, meta: dict) -> None:
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    meta["columns"] = [c.item() if hasattr(c, "item") else c for c in df.columns]
+    out = df.copy()
+    out.columns = [str(c) for c in out.columns]
+    try:
+        out.to_parquet(entry.with_suffix(".parquet"), index=False)
+        meta["format"] = "parquet"
+    except (ValueError, TypeError, ImportError) as e:
+        # mixed-type object columns cannot be written to Parquet as-is
+        print(f"⚠️ {entry.name}: Parquet cache failed ({e}), using pickle")
+        out.to_pickle(entry.with_suffix(".pkl"))
+        meta["format"] = "pickle"
+    entry.with_suffix(".json").write_text(json.dumps(meta, default=str), encoding="utf-8")
+
+
+def read_excel_cached(
+    path: str | Path,
+    sheet_name: str | int = 0,
+    *,
+    cache_dir: str | Path = CACHE_DIR,
+    **read_kwargs,
+) -> pd.DataFrame:
+    """Drop-in for `pd.read_excel(path, sheet_name=...)` backed by a Parquet cache.
+
+    Extra keyword arguments are passed to `pd.read_excel` on a cache miss and are
+    part of the cache key, so different read options never share an entry.
+    """
+    path = Path(path).resolve()
+    cache_dir = Path(cache_dir)
+    entry = _entry(path, (sheet_name, sorted(read_kwargs.items())), cache_dir)
+    stat = os.stat(path)
+
+    meta = None
+    meta_path = entry.with_suffix(".json")
+    if meta_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except ValueError:
+            meta = None
+
+    if meta is not None:
+        if meta["mtime_ns"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+            return _load(entry, meta)
+        digest = _file_hash(path)
+        if meta["sha256"] == digest:
+            # touched but not modified: refresh the stamp, keep the converted data
+            meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            meta_path.write_text(json.dumps(meta, default=str), encoding="utf-8")
+            return _load(entry, meta)
+    else:
+        digest = _file_hash(path)
+
+    df = pd.read_excel(path, sheet_name=sheet_name, **read_kwargs)
+    _store(df, entry, {
+        "workbook": str(path), "sheet": sheet_name,
+        "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest,
+    })
+    return df
+
+
+def read_excel_many(
+    requests,
+    *,
+    max_workers: int | None = None,
+    cache_dir: str | Path = CACHE_DIR,
+    **read_kwargs,
+) -> list[pd.DataFrame]:
+    """Read several workbooks concurrently; `requests` holds paths or (path, sheet) pairs.
+
+    Results come back in the order of `requests`.
+    """
+    jobs = [r if isinstance(r, tuple) else (r, 0) for r in requests]
+    with ThreadPoolExecutor(max_workers=max_workers or len(jobs) or 1) as pool:
+        futures = [
+            pool.submit(read_excel_cached, path, sheet, cache_dir=cache_dir, **read_kwargs)
+            for path, sheet in jobs
+        ]
+        return [f.result() for f in futures]
+
+
+def clear_cache(cache_dir: str | Path = CACHE_DIR) -> int:
+    """Delete every cached sheet; returns the number of files removed."""
+    removed = 0
+    for f in Path(cache_dir).glob("*__*.*"):
+        f.unlink()
+        removed += 1
+    return removed
@@ -0,0 +1,141 @@
+#STREAMING INGEST FOR IAMC-FORMAT SCENARIO DUMPS (NGFS / IIASA)
+# IAMC files have one row per Model / Scenario / Region / Variable / Unit and one
+# column per year. Full NGFS Phase V downloads are several GB, so instead of
+# pd.read_csv on the whole file the dump is read in chunks. Each chunk is
+# filtered (model, scenario, variable, region) and melted to long format, then
+# appended to a Parquet sink. Peak memory is one chunk, whatever the file size.
+#
+#   stream_iamc("popgdp.csv", "popgdp_long.parquet",
+#               filters={"Model": ["Downscaling[REMIND-MAgPIE 3.3-4.8]"],
+#                        "Variable": lambda v: v.str.contains("Population")})
+#
+# Command line:  python iamc_stream.py dump.csv out.parquet [--variable ...] [--scenario ...]
+from __future__ import annotations
+
+import argparse
+import re
+from pathlib import Path
+
+import pandas as pd
+
+from region_filter import is_aggregate
+
+YEAR_COL = re.compile(r"^\d{4}$")
+
+
+def _mask(chunk: pd.DataFrame, filters: dict | None, exclude: dict | None) -> pd.Series:
+    """Rows kept by `filters` (value lists or callables) and not hit by `exclude`."""
+    mask = pd.Series(True, index=chunk.index)
+    for col, rule in (filters or {}).items():
+        mask &= rule(chunk[col]) if callable(rule) else chunk[col].isin(list(rule))
+    for col, rule in (exclude or {}).items():
+        mask &= ~(rule(chunk[col]) if callable(rule) else chunk[col].isin(list(rule)))
+    return mask
+
+
+def iter_iamc(
+    path: str | Path,
+    *,
+    filters: dict | None = None,
+    exclude: dict | None = None,
+    years=None,
+    drop=(),
+    melt: bool = True,
+    chunksize: int = 100_000,
+    value_name: str = "Value",
+):
+    """Yield filtered (and, with `melt=True`, long-format) chunks of an IAMC file.
+
+    `filters` / `exclude` map a column to a list of values or to a callable that
+    returns a boolean mask, e.g. `exclude={"Region": is_aggregate}`. `years`
+    limits the year columns that are parsed; `drop` removes id or year columns
+    (e.g. "Unit", "2020") before melting.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    year_cols = [c for c in header if YEAR_COL.match(c) and c not in drop]
+    if years is not None:
+        wanted = {str(y) for y in years}
+        year_cols = [c for c in year_cols if c in wanted]
+    id_cols = [c for c in header if not YEAR_COL.match(c)]
+    drop = [c for c in drop if c in id_cols]
+
+    reader = pd.read_csv(
+        path,
+        usecols=id_cols + year_cols,
+        dtype={c: str for c in id_cols} | {c: "float64" for c in year_cols},
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        chunk = chunk[_mask(chunk, filters, exclude)]
+        if chunk.empty:
+            continue
+        chunk = chunk.drop(columns=drop)
+        if melt:
+            keep = [c for c in chunk.columns if c not in year_cols]
+            chunk = chunk.melt(id_vars=keep, value_vars=year_cols,
+                               var_name="Year", value_name=value_name)
+            chunk["Year"] = chunk["Year"].astype("int16")
+        yield chunk
+
+
+def stream_iamc(
+    path: str | Path,
+    sink: str | Path | None = None,
+    **kwargs,
+) -> pd.DataFrame | Path:
+    """Stream an IAMC file through `iter_iamc`.
+
+    With a `sink` path the chunks are appended to that Parquet file and the path
+    is returned (read it back with storage.read_table). Without one the filtered
+    chunks are concatenated and returned as a DataFrame.
+    """
+    chunks = iter_iamc(path, **kwargs)
+    if sink is None:
+        frames = list(chunks)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = Path(sink)
+    sink.parent.mkdir(parents=True, exist_ok=True)
+    writer, rows = None, 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                # fixed from the first chunk; later chunks are cast to it
+                schema = table.schema
+                writer = pq.ParquetWriter(sink, schema)
+            writer.write_table(table.cast(schema))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError(f"{path}: no rows left after filtering, nothing written to {sink}")
+    print(f"💾 {rows} rows streamed to {sink}")
+    return sink
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Stream an IAMC scenario dump to long-format Parquet.")
+    parser.add_argument("source")
+    parser.add_argument("sink")
+    for col in ("model", "scenario", "variable", "region"):
+        parser.add_argument(f"--{col}", nargs="+", help=f"keep only these {col} values")
+    parser.add_argument("--drop-aggregates", action="store_true", help="drop NGFS aggregate regions")
+    parser.add_argument("--years", nargs="+", type=int)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    filters = {col.capitalize(): values
+               for col in ("model", "scenario", "variable", "region")
+               if (values := getattr(args, col))}
+    exclude = {"Region": is_aggregate} if args.drop_aggregates else None
+    stream_iamc(args.source, args.sink, filters=filters, exclude=exclude,
+                years=args.years, chunksize=args.chunksize)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#SHARED COUNTRY NAME -> ISO RESOLVER USED BY ALL CLEANING SCRIPTS
+# Resolves every distinct name once (exact hash index first, coco/pycountry
+# fuzzy fallback second) and maps the answers back onto the column with one take.
+# Resolved names are persisted to .cache/iso_lookup.json so repeated runs skip
+# the lookups entirely. The table is stamped with the manual patches, the
+# resolver version and the installed pycountry / country_converter versions,
+# and starts over when any of them changes.
+from __future__ import annotations
+
+import json
+import re
+from importlib import metadata
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pycountry
+
+# ── manual patches for names that neither coco nor pycountry resolve correctly
+MANUAL_ISO = {
+    "Taiwan, China": "TWN",
+    "Kosovo": "XKX",
+    "Russia": "RUS",
+    "South Korea": "KOR",
+}
+
+TARGETS = ("ISO3", "name", "name_short", "name_official")
+
+# IAM model regions such as "China (R9)" or "India+ (R10)" must not fuzzy-match
+# their namesake country
+IAM_REGION = re.compile(r"\(R\d+\)\s*$")
+
+CACHE_PATH = Path(__file__).resolve().parent / ".cache" / "iso_lookup.json"
+
+# bump when the lookup logic changes (index order, fuzzy fallback, patches handling)
+RESOLVER_VERSION = 1
+
+_indexes: dict[str, dict[str, str]] = {}
+_coco = None
+
+
+def _key(name) -> str:
+    return " ".join(str(name).split()).casefold()
+
+
+def _converter():
+    # country_converter loads its regex table on construction, only pay for it
+    # when a name actually misses the exact index
+    global _coco
+    if _coco is None:
+        import country_converter as coco
+        _coco = coco.CountryConverter()
+    return _coco
+
+
+def _build_index(to: str) -> dict[str, str]:
+    """Exact-match table: normalised name/code -> target value."""
+    index: dict[str, str] = {}
+    if to in ("ISO3", "name"):
+        for c in pycountry.countries:
+            value = c.alpha_3 if to == "ISO3" else c.name
+            for attr in ("alpha_2", "alpha_3", "name", "official_name", "common_name"):
+                label = getattr(c, attr, None)
+                if label:
+                    index.setdefault(_key(label), value)
+    if to != "name":
+        table = _converter().data
+        for col in ("ISO3", "ISO2", "name_short", "name_official"):
+            for label, value in zip(table[col], table[to]):
+                if isinstance(label, str) and isinstance(value, str):
+                    index.setdefault(_key(label), value)
+    if to == "ISO3":
+        index.update({_key(k): v for k, v in MANUAL_ISO.items()})
+    return index
+
+
+def _exact_index(to: str) -> dict[str, str]:
+    if to not in _indexes:
+        _indexes[to] = _build_index(to)
+    return _indexes[to]
+
+
+def _fuzzy(name: str, to: str) -> str | None:
+    if IAM_REGION.search(name):
+        return None
+    if to == "ISO3":
+        manual = MANUAL_ISO.get(name) or MANUAL_ISO.get(name.split(",")[0].strip())
+        if manual:
+            return manual
+    if to != "name":
+        hit = _converter().convert(name, to=to, not_found="not found")
+        if isinstance(hit, str) and hit != "not found":
+            return hit
+    try:
+        country = pycountry.countries.lookup(name.split(",")[0].strip())
+    except LookupError:
+        return None
+    return country.alpha_3 if to == "ISO3" else _exact_index(to).get(_key(country.alpha_3))
+
+
+def _package_version(name: str) -> str | None:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def _stamp() -> dict:
+    """What the cached resolutions depend on, besides the names themselves."""
+    return {
+        "manual": MANUAL_ISO,
+        "resolver": RESOLVER_VERSION,
+        "pycountry": _package_version("pycountry"),
+        "country_converter": _package_version("country_converter"),
+    }
+
+
+def _load_cache(cache_path: Path | None) -> dict[str, dict[str, str | None]]:
+    if cache_path is None or not cache_path.exists():
+        return {}
+    try:
+        cache = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    # patches, resolver or library versions changed since the table was written -> start over
+    if cache.pop("__stamp__", None) != _stamp():
+        return {}
+    return cache
+
+
+def _save_cache(cache: dict, cache_path: Path | None) -> None:
+    if cache_path is None:
+        return
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_path.write_text(
+        json.dumps({"__stamp__": _stamp(), **cache}, indent=1, sort_keys=True),
+        encoding="utf-8",
+    )
+
+
+def resolve_names(
+    names,
+    to: str = "ISO3",
+    *,
+    cache_path: str | Path | None = CACHE_PATH,
+) -> dict[str, str | None]:
+    """Resolve an iterable of distinct names/codes to `to`, one lookup per name."""
+    if to not in TARGETS:
+        raise ValueError(f"Unknown target {to!r}, expected one of {TARGETS}")
+    cache_path = Path(cache_path) if cache_path is not None else None
+
+    cache = _load_cache(cache_path)
+    known = cache.setdefault(to, {})
+    out: dict[str, str | None] = {}
+    dirty = False
+    for name in names:
+        key = _key(name)
+        if key in known:
+            out[name] = known[key]
+            continue
+        value = _exact_index(to).get(key)
+        if value is None:
+            value = _fuzzy(str(name).strip(), to)
+        known[key] = out[name] = value
+        dirty = True
+
+    if dirty:
+        _save_cache(cache, cache_path)
+    return out
+
+
+def resolve_iso(
+    values: pd.Series,
+    to: str = "ISO3",
+    *,
+    cache_path: str | Path | None = CACHE_PATH,
+) -> pd.Series:
+    """Vectorised replacement for `values.apply(lambda x: coco.convert(x, to=...))`.
+
+    Unresolved names (and missing values) come back as None.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    resolved = resolve_names(uniques, to, cache_path=cache_path)
+    # one extra slot at the end so the -1 (NaN) codes land on None
+    lookup = np.array([resolved[u] for u in uniques] + [None], dtype=object)
+    return pd.Series(lookup.take(codes), index=values.index, name=values.name)
@@ -0,0 +1,77 @@
+#SHARED NGFS BASELINE + DELTA RECONSTRUCTION
+# NiGEM reports the Baseline in levels and every other scenario as a deviation
+# from it. Scenario level = baseline level + delta, matched on the key columns
+# (e.g. ISO / Variable / Year in long format, Country / Variable in wide format).
+#
+# The baseline is factorized once and every scenario row is matched against it in
+# one pass, so the add runs as a single NumPy operation over all scenarios and
+# year columns. Inner-join semantics are the same as the per-scenario pd.merge
+# loops this replaces: unmatched rows are dropped and duplicate baseline keys
+# (e.g. GDP reported in two units) give one row per match.
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+def _match(base_keys: pd.DataFrame, scen_keys: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Row positions (scenario, baseline) of every inner-join match, in merge order."""
+    n_base = len(base_keys)
+    both = pd.concat([base_keys, scen_keys], ignore_index=True)
+    codes, uniques = pd.MultiIndex.from_frame(both).factorize()
+    base_codes, scen_codes = codes[:n_base], codes[n_base:]
+
+    n_codes = len(uniques) + 1                    # last slot collects missing keys (-1)
+    base_codes = np.where(base_codes < 0, n_codes - 1, base_codes)
+    counts = np.bincount(base_codes, minlength=n_codes)
+    counts[-1] = 0
+    starts = np.cumsum(counts) - counts
+    order = np.argsort(base_codes, kind="stable")
+
+    scen_codes = np.where(scen_codes < 0, n_codes - 1, scen_codes)
+    per_row = counts[scen_codes]
+    left = np.repeat(np.arange(len(scen_keys)), per_row)
+    offset = np.arange(per_row.sum()) - np.repeat(np.cumsum(per_row) - per_row, per_row)
+    right = order[np.repeat(starts[scen_codes], per_row) + offset]
+    return left, right
+
+
+def reconstruct(
+    df: pd.DataFrame,
+    keys,
+    values,
+    *,
+    scenario: str = "Scenario",
+    baseline: str = "Baseline",
+    carry=(),
+    include_baseline: bool = False,
+) -> pd.DataFrame:
+    """Scenario levels from baseline + delta for every non-baseline scenario at once.
+
+    `values` is the single value column of a long table (["Value"]) or the year
+    columns of a wide one. The result has columns [scenario, *keys, *values,
+    *carry]; `carry` columns are taken from the scenario rows. With
+    `include_baseline=True` the baseline rows are prepended unchanged.
+    """
+    keys, values, carry = list(keys), list(values), list(carry)
+    is_base = (df[scenario] == baseline).to_numpy()
+    base = df.loc[is_base]
+    scen = df.loc[~is_base & df[scenario].notna().to_numpy()]
+
+    left, right = _match(base[keys], scen[keys])
+    levels = (base[values].to_numpy(dtype="float64")[right]
+              + scen[values].to_numpy(dtype="float64")[left])
+
+    cols = [scenario] + keys + carry
+    out = scen[cols].iloc[left].reset_index(drop=True)
+    out = pd.concat([out, pd.DataFrame(levels, columns=values)], axis=1)
+    out = out[[scenario] + keys + values + carry]
+
+    if include_baseline:
+        out = pd.concat([base[[scenario] + keys + values + carry], out], ignore_index=True)
+    return out
+
+
+def by_scenario(df: pd.DataFrame, scenario: str = "Scenario") -> dict[str, pd.DataFrame]:
+    """Split a reconstructed table into {scenario: frame}, in order of appearance."""
+    return {name: g.reset_index(drop=True) for name, g in df.groupby(scenario, sort=False)}
@@ -0,0 +1,333 @@
+#RUNS THE NUMBERED CLEANING SCRIPTS AS A CACHED DEPENDENCY GRAPH
+# Each stage declares the files it reads and writes (relative to the repo root).
+# A stage is skipped when the hash of its script, helper modules and input files
+# matches the last successful run and all its outputs still exist. Stages whose
+# inputs are ready run in parallel processes, so the SSPS branch (9 -> 10) and
+# the NGFS/GDP branch (7 -> 8) no longer wait for each other.
+#
+# Usage:  python pipeline.py [--force] [--only 7 8] [--jobs 4] [--dry-run]
+#         python pipeline.py --in-process [--checkpoint-dir out --format parquet]
+#
+# --in-process chains the stage functions in one interpreter and passes the
+# DataFrames along directly; files are only written as optional checkpoints.
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import runpy
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+STAGE_DIR = Path(__file__).resolve().parent
+ROOT = STAGE_DIR.parent
+STATE_PATH = STAGE_DIR / ".cache" / "pipeline_state.json"
+
+RAW = "Data/data1_old"
+PROJ = "Data/data_projection_df"
+OUT = "1.Cleaning_and_Merges"
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    script: str
+    inputs: tuple[str, ...]
+    outputs: tuple[str, ...] = ()
+    code: tuple[str, ...] = field(default=())   # helper modules the script imports
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Stage declarations (paths mirror what each script reads / writes)
+# ───────────────────────────────────────────────────────────────────────────────
+
+STAGES = [
+    Stage("1", "1.Cleaning_Historicalmacro.py",
+          inputs=(f"{RAW}/Inflation/Inflation.csv", f"{RAW}/GDP/gdp_capita.csv",
+                  f"{RAW}/Interest_rate/Interest_rate.csv", f"{RAW}/Unemployment/Unemployment.csv",
+                  f"{RAW}/Population/Population.csv", f"{PROJ}/WACC.xlsx"),
+          outputs=(f"{OUT}/merged_macro_data.csv", f"{OUT}/merged_with_wacc.csv"),
+          code=("iso_resolver.py", "excel_cache.py", "wdi_loader.py")),
+    Stage("2", "2.GDP_PPP_cleaning.py",
+          inputs=(f"{PROJ}/gdp_ppp.csv",),
+          outputs=(f"{PROJ}/gdp_ppp_cleaned.csv",),
+          code=("region_filter.py",)),
+    Stage("3", "3.NGFS_cleaning.py",
+          inputs=(f"{RAW}/NGFS RAW/macrofinal.csv",),
+          code=("ngfs_reconstruct.py", "region_filter.py")),
+    Stage("4", "4.popgdp_cleaned.py",
+          inputs=(f"{RAW}/popgdp.csv",),
+          outputs=(f"{OUT}/popgdp_cleaned.csv",),
+          code=("iamc_stream.py", "region_filter.py")),
+    Stage("5", "5.New_GDP_2021_to_billions_WACC.py",
+          inputs=(f"{RAW}/GDP/gdp_ppp_2021constant.csv",
+                  "WACC_Thesis_old/merged_with_wacc_updated.csv"),
+          outputs=(f"{OUT}/gdp_ppp_2021_long.csv", f"{OUT}/wacc_with_gdpppp2021.csv"),
+          code=("iso_resolver.py", "wdi_loader.py", "region_filter.py")),
+    Stage("6", "6.Final_for_reg_Merge(pop_wacc).py",
+          inputs=(f"{RAW}/Population/Population.csv", f"{OUT}/wacc_with_gdpppp2021.csv"),
+          outputs=(f"{OUT}/final_wacc_macro_historical.csv",),
+          code=("wdi_loader.py",)),
+    Stage("7", "7.Final_GDPPP_Clean_plus_baselinecalc.py",
+          inputs=(f"{PROJ}/gdp_ppp.csv", f"{PROJ}/WACC.xlsx", f"{RAW}/NGFS RAW/macrofinal.csv"),
+          outputs=(f"{OUT}/wacc_cleaned.csv", f"{OUT}/macro_long_cleaned.csv",
+                   f"{OUT}/macro_gdp_merged.csv"),
+          code=("iso_resolver.py", "excel_cache.py", "ngfs_reconstruct.py",
+                "iamc_stream.py", "region_filter.py")),
+    Stage("8", "8.Final_Merge_pop_ngfs_macro.py",
+          inputs=(f"{OUT}/macro_gdp_merged.csv", f"{OUT}/popgdp_cleaned.csv"),
+          outputs=(f"{OUT}/ngfs_final_merge.csv",)),
+    Stage("11", "11.Annual_NGFS_interpolation.py",
+          inputs=(f"{OUT}/ngfs_final_merge.csv",),
+          outputs=(f"{OUT}/ngfs_final_merge_annual.csv",),
+          code=("annual_interp.py",)),
+    Stage("9", "9.SSPS.py",
+          inputs=(f"{RAW}/SSPS/governance.xlsx", f"{RAW}/SSPS/urbanization.xlsx",
+                  f"{RAW}/SSPS/rule_law.xlsx"),
+          outputs=(f"{OUT}/governance_1996_2015.csv", f"{OUT}/governance_2015_2099.csv",
+                   f"{OUT}/governance_1996_2024.csv", f"{OUT}/urbanization_pre2024.csv",
+                   f"{OUT}/urbanization_2025plus.csv", f"{OUT}/rule_law_pre2024.csv",
+                   f"{OUT}/rule_law_2025plus.csv"),
+          code=("iso_resolver.py", "excel_cache.py")),
+    Stage("10", "10.Final_SSPS_WACC.py",
+          inputs=(f"{OUT}/urbanization_pre2024.csv", f"{OUT}/rule_law_pre2024.csv",
+                  f"{OUT}/governance_1996_2024.csv", f"{OUT}/wacc_cleaned.csv"),
+          outputs=(f"{OUT}/cleaned_ssps_data.csv", f"{OUT}/final_merged_dataset.csv")),
+]
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Graph + hashing
+# ───────────────────────────────────────────────────────────────────────────────
+
+def dependencies(stages: list[Stage]) -> dict[str, set[str]]:
+    """Stage name -> names of the stages producing one of its inputs."""
+    producer = {}
+    for st in stages:
+        for out in st.outputs:
+            if out in producer:
+                raise ValueError(f"{out} is written by both stage {producer[out]} and {st.name}")
+            producer[out] = st.name
+    deps = {st.name: {producer[i] for i in st.inputs if i in producer} - {st.name}
+            for st in stages}
+
+    # cycle check (Kahn)
+    pending = {k: set(v) for k, v in deps.items()}
+    while pending:
+        ready = [k for k, v in pending.items() if not v]
+        if not ready:
+            raise ValueError(f"Dependency cycle between stages {sorted(pending)}")
+        for k in ready:
+            del pending[k]
+        for v in pending.values():
+            v.difference_update(ready)
+    return deps
+
+
+def _hash_file(h, path: Path) -> None:
+    h.update(str(path.relative_to(ROOT)).encode())
+    if not path.exists():
+        h.update(b"<missing>")
+        return
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+
+def stage_hash(st: Stage) -> str:
+    h = hashlib.sha256()
+    for rel in (st.script, *st.code):
+        _hash_file(h, STAGE_DIR / rel)
+    for rel in st.inputs:
+        _hash_file(h, ROOT / rel)
+    return h.hexdigest()
+
+
+def _load_state() -> dict[str, str]:
+    try:
+        return json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(state: dict[str, str]) -> None:
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    STATE_PATH.write_text(json.dumps(state, indent=1, sort_keys=True), encoding="utf-8")
+
+
+def is_fresh(st: Stage, state: dict[str, str]) -> bool:
+    return (state.get(st.name) == stage_hash(st)
+            and all((ROOT / out).exists() for out in st.outputs))
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Execution
+# ───────────────────────────────────────────────────────────────────────────────
+
+def _run_script(script: str) -> None:
+    """Worker: execute one numbered script as if launched from this folder."""
+    os.chdir(STAGE_DIR)
+    if str(STAGE_DIR) not in sys.path:
+        sys.path.insert(0, str(STAGE_DIR))
+    runpy.run_path(str(STAGE_DIR / script), run_name="__main__")
+
+
+def run(
+    stages: list[Stage] = STAGES,
+    *,
+    only: list[str] | None = None,
+    force: bool = False,
+    jobs: int | None = None,
+    dry_run: bool = False,
+) -> dict[str, str]:
+    """Run out-of-date stages in dependency order; returns stage -> status."""
+    by_name = {st.name: st for st in stages}
+    deps = dependencies(stages)
+
+    # --only restricts to the named stages plus everything downstream of them
+    selected = set(by_name)
+    if only:
+        unknown = set(only) - set(by_name)
+        if unknown:
+            raise ValueError(f"Unknown stage(s): {sorted(unknown)}")
+        selected = set(only)
+        grew = True
+        while grew:
+            extra = {n for n, d in deps.items() if d & selected} - selected
+            selected |= extra
+            grew = bool(extra)
+
+    state = _load_state()
+    status: dict[str, str] = {}
+    done: set[str] = set()
+    failed: set[str] = set()
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while len(done) + len(failed) < len(by_name):
+            for name, st in by_name.items():
+                if name in done or name in failed or name in running.values():
+                    continue
+                if deps[name] & failed:
+                    failed.add(name)
+                    status[name] = "blocked"
+                    continue
+                if not deps[name] <= done:
+                    continue
+                stale_upstream = dry_run and any(status.get(d) == "would run" for d in deps[name])
+                if name not in selected or (not force and not stale_upstream and is_fresh(st, state)):
+                    done.add(name)
+                    status[name] = "cached" if name in selected else "not selected"
+                    continue
+                if dry_run:
+                    # pretend it ran, so its dependents show up as stale too
+                    done.add(name)
+                    state.pop(name, None)
+                    status[name] = "would run"
+                    continue
+                print(f"▶ stage {name}: {st.script}")
+                running[pool.submit(_run_script, st.script)] = name
+
+            if not running:
+                continue
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                try:
+                    fut.result()
+                except Exception as e:
+                    failed.add(name)
+                    status[name] = f"failed: {e}"
+                    print(f"❌ stage {name} failed: {e}")
+                    continue
+                done.add(name)
+                status[name] = "ran"
+                state[name] = stage_hash(by_name[name])
+                _save_state(state)
+                print(f"✅ stage {name} done")
+
+    return status
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+# In-process driver
+# ───────────────────────────────────────────────────────────────────────────────
+
+def load_stage(script: str):
+    """Import a numbered script (not a valid module name) without running __main__."""
+    if str(STAGE_DIR) not in sys.path:
+        sys.path.insert(0, str(STAGE_DIR))
+    name = "stage_" + script.split(".", 1)[0]
+    spec = importlib.util.spec_from_file_location(name, STAGE_DIR / script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_in_process(checkpoint_dir: str | Path | None = None, fmt: str = "csv") -> dict:
+    """Chain stages 1-11 in memory and return every stage output by name.
+
+    3.NGFS_cleaning.py only prints a consistency check and is not part of the chain.
+    """
+    from storage import checkpoint
+
+    mods = {st.name: load_stage(st.script) for st in STAGES if st.name != "3"}
+
+    def keep(name, df):
+        path = Path(checkpoint_dir) / f"{name}.{fmt}" if checkpoint_dir is not None else None
+        out[name] = checkpoint(df, path)
+        return df
+
+    out: dict = {}
+    macro = mods["1"].build_macro()
+    keep("merged_with_wacc", mods["1"].merge_wacc(macro))
+    keep("gdp_ppp_cleaned", mods["2"].clean_gdp_ppp())
+    popgdp = keep("popgdp_cleaned", mods["4"].clean_popgdp())
+
+    gdp_ppp_long = keep("gdp_ppp_2021_long", mods["5"].clean_gdp_ppp_2021())
+    wacc_gdp = keep("wacc_with_gdpppp2021", mods["5"].merge_wacc_gdp_ppp(gdp_ppp_long))
+    # stage 1 already loaded the WDI population indicator, no second read
+    pop_long = (macro.loc[macro["year"].between(2008, 2023), ["ISO", "year", "population"]]
+                .rename(columns={"year": "Year", "population": "Population"}))
+    keep("final_wacc_macro_historical", mods["6"].merge_population(wacc_gdp, pop_long=pop_long))
+
+    for name, df in mods["7"].run(save=False).items():
+        keep(name, df)
+    keep("ngfs_final_merge",
+         mods["8"].merge_ngfs_population(out["macro_gdp_merged"], popgdp))
+    keep("ngfs_final_merge_annual", mods["11"].annualize_ngfs(out["ngfs_final_merge"]))
+
+    ssps = mods["9"].build_ssps()
+    cleaned_ssps = keep("cleaned_ssps_data", mods["10"].merge_ssps(
+        ssps["urbanization_pre2024"], ssps["rule_law_pre2024"], ssps["governance_1996_2024"]))
+    keep("final_merged_dataset", mods["10"].merge_ssps_wacc(cleaned_ssps, out["wacc_cleaned"]))
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the cleaning stages as a cached DAG.")
+    parser.add_argument("--only", nargs="+", help="stage names to (re)run, plus their dependents")
+    parser.add_argument("--force", action="store_true", help="ignore cached hashes")
+    parser.add_argument("--jobs", type=int, default=None, help="parallel worker processes")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would run")
+    parser.add_argument("--in-process", action="store_true",
+                        help="chain the stage functions in memory instead of running scripts")
+    parser.add_argument("--checkpoint-dir", default=None, help="with --in-process: write outputs here")
+    parser.add_argument("--format", default="csv", choices=["csv", "parquet"])
+    args = parser.parse_args()
+
+    if args.in_process:
+        frames = run_in_process(args.checkpoint_dir, args.format)
+        for name, df in frames.items():
+            print(f"  {name:<30} {df.shape}")
+        sys.exit(0)
+
+    result = run(only=args.only, force=args.force, jobs=args.jobs, dry_run=args.dry_run)
+    for name in sorted(result, key=lambda n: int(n) if n.isdigit() else n):
+        print(f"  {name:>3}  {result[name]}")
+    if any(s.startswith(("failed", "blocked")) for s in result.values()):
+        sys.exit(1)
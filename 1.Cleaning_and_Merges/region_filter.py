@@ -0,0 +1,78 @@
+#SHARED REGION NORMALIZATION AND AGGREGATE FILTERING
+# Region / country columns hold a few hundred distinct labels repeated over
+# hundreds of thousands of rows (years x variables x scenarios). The string work
+# (stripping the NiGEM "v1.24.2|" prefix, matching aggregate names or the WDI
+# aggregate regex) is done once per distinct label and mapped back to the rows
+# through the integer codes, so the cost grows with the number of labels, not
+# the number of rows.
+from __future__ import annotations
+
+import re
+
+import numpy as np
+import pandas as pd
+
+NIGEM_PREFIX = re.compile(r"^NiGEM NGFS v[\d\.]+\|\s*")
+
+# NGFS aggregates that are not countries
+AGGREGATE_REGIONS = frozenset({
+    "Africa", "Asia", "Central America", "Europe", "Middle East", "North America",
+    "South America", "World", "Rest of the World", "European Union", "Pacific Island States",
+})
+
+# WDI aggregates (income groups, regions, lending groups) by country name
+WDI_AGGREGATES = re.compile(
+    r"World|Europe|Asia|Africa|America|Caribbean|OECD|income|Middle East|"
+    r"Euro area|Arab World|Least developed|IDA|IBRD|LDC|Small states|"
+    r"Sub-Saharan|Pacific|G20|G7", re.IGNORECASE)
+
+
+def _codes(series: pd.Series) -> tuple[np.ndarray, pd.Index]:
+    """Integer codes (-1 for missing) and the distinct labels of `series`."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, uniques = pd.factorize(series)
+    return codes, pd.Index(uniques)
+
+
+def strip_prefix(series: pd.Series, pattern: re.Pattern = NIGEM_PREFIX) -> pd.Series:
+    """`series` with `pattern` removed from the start of each label.
+
+    Categorical input gives categorical output; other input keeps its dtype.
+    """
+    codes, labels = _codes(series)
+    cleaned = pd.Index([pattern.sub("", str(v)) for v in labels])
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # different raw labels can normalize to the same name (e.g. two vintages)
+        categories = cleaned.unique()
+        remap = np.append(categories.get_indexer(cleaned), -1)
+        values = pd.Categorical.from_codes(remap[codes], categories=categories)
+    else:
+        values = cleaned.append(pd.Index([None])).take(codes).astype(series.dtype)
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def is_aggregate(
+    series: pd.Series,
+    names=AGGREGATE_REGIONS,
+    pattern: re.Pattern | None = None,
+    prefix: re.Pattern | None = NIGEM_PREFIX,
+) -> pd.Series:
+    """Boolean mask of rows whose label is an aggregate region.
+
+    A label is an aggregate if, after removing `prefix`, it is in `names` or
+    `pattern` matches it. Missing labels are never aggregates.
+    """
+    codes, labels = _codes(series)
+    flags = np.zeros(len(labels) + 1, dtype=bool)    # last slot: missing (-1)
+    for i, label in enumerate(labels):
+        label = str(label)
+        if prefix is not None:
+            label = prefix.sub("", label)
+        flags[i] = label in names or (pattern is not None and pattern.search(label) is not None)
+    return pd.Series(flags[codes], index=series.index, name=series.name)
+
+
+def is_wdi_aggregate(series: pd.Series) -> pd.Series:
+    """Aggregate rows of a WDI table, matched on the country name."""
+    return is_aggregate(series, names=(), pattern=WDI_AGGREGATES, prefix=None)
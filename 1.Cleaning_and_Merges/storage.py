@@ -0,0 +1,193 @@
+#TYPED CSV / PARQUET STORAGE FOR STAGE OUTPUTS AND PROJECTIONS
+# Stages hand their DataFrames to each other in memory; these helpers are used
+# when a result is persisted (checkpoint) or loaded again by a later stage.
+#
+# Every table gets one typed schema: labels such as ISO / Scenario / Technology
+# are categoricals, Year is int16 everywhere (no more str in one stage and int in
+# the next), dummies are int8 and values float64 (float32 for the large NGFS
+# long tables). Parquet files are read with column projection and predicate
+# pushdown, e.g. one scenario of a projection table without parsing the rest:
+#
+#   read_table("wacc_projection_OLS_with_groups.parquet",
+#              columns=["Scenario", "Region", "Year", "Technology", "wacc_projection"],
+#              filters={"Scenario": "Netzero"})
+from __future__ import annotations
+
+import operator
+from pathlib import Path
+
+import pandas as pd
+
+_OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Schemas
+# ───────────────────────────────────────────────────────────────────────────────
+
+CATEGORICAL = {
+    "ISO", "Country", "country", "Scenario", "Technology", "technology",
+    "Variable", "Model", "Region", "IncomeLevel",
+}
+YEAR = {"Year", "year"}
+
+# per-table overrides on top of the column-name rules; also sets the sort order
+# used when writing Parquet so row groups can be skipped by Scenario / ISO
+SCHEMAS: dict[str, dict] = {
+    "macro_long_cleaned": {"dtypes": {"Value": "float32"}, "sort_by": ["Scenario", "ISO", "Variable", "Year"]},
+    "macro_long": {"dtypes": {"Value": "float32"}, "sort_by": ["Scenario", "ISO", "Variable", "Year"]},
+    "popgdp_cleaned": {"dtypes": {"Value": "float32"}, "sort_by": ["Model", "Scenario", "Variable", "ISO", "Year"]},
+    "macro_gdp_merged": {"sort_by": ["Scenario", "ISO", "Year"]},
+    "ngfs_final_merge": {"sort_by": ["Scenario", "ISO", "Year"]},
+    "ngfs_final_merge_annual": {"sort_by": ["Scenario", "ISO", "Year"]},
+    "final_wacc_macro_historical": {"sort_by": ["ISO", "Year"]},
+    "wacc_projection": {"sort_by": ["Scenario", "Technology", "ISO", "Year"]},
+}
+
+
+def schema_for(name: str | None) -> dict:
+    """Schema entry for a table name / file stem (projection variants share one)."""
+    if name is None:
+        return {}
+    if name.startswith("wacc_projection"):
+        return SCHEMAS["wacc_projection"]
+    return SCHEMAS.get(name, {})
+
+
+def column_dtype(col: str, series: pd.Series, overrides: dict | None = None) -> str | None:
+    if overrides and col in overrides:
+        return overrides[col]
+    if col in CATEGORICAL:
+        return "category"
+    if col in YEAR:
+        return "Int16" if series.isna().any() else "int16"
+    if col.startswith("is_"):
+        return "int8"
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return "float64"
+    return None
+
+
+def apply_schema(df: pd.DataFrame, name: str | None = None) -> pd.DataFrame:
+    """Cast `df` to the typed schema (column rules + overrides for `name`)."""
+    overrides = schema_for(name).get("dtypes", {})
+    casts = {}
+    for col in df.columns:
+        dtype = column_dtype(col, df[col], overrides)
+        if dtype is None or str(df[col].dtype) == dtype:
+            continue
+        if col in YEAR and not pd.api.types.is_numeric_dtype(df[col]):
+            df = df.assign(**{col: pd.to_numeric(df[col], errors="coerce")})
+            dtype = column_dtype(col, df[col], overrides)
+        casts[col] = dtype
+    return df.astype(casts) if casts else df
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Filters: {"Scenario": "Netzero", "Year": [2030, 2050]}  or pyarrow tuples
+# ───────────────────────────────────────────────────────────────────────────────
+
+def _as_pyarrow_filters(filters):
+    if filters is None or isinstance(filters, list):
+        return filters
+    out = []
+    for col, value in filters.items():
+        if isinstance(value, (list, tuple, set)):
+            out.append((col, "in", list(value)))
+        else:
+            out.append((col, "==", value))
+    return out
+
+
+def _filter_frame(df: pd.DataFrame, filters) -> pd.DataFrame:
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in _as_pyarrow_filters(filters):
+        values = value if op in ("in", "not in") else [value]
+        if op in ("in", "==", "="):
+            mask &= df[col].isin(values)
+        elif op in ("not in", "!="):
+            mask &= ~df[col].isin(values)
+        else:
+            mask &= _OPS[op](df[col], value)
+    return df[mask]
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Read / write
+# ───────────────────────────────────────────────────────────────────────────────
+
+def write_table(df: pd.DataFrame, path: str | Path, *, name: str | None = None) -> Path:
+    """Write `df` as CSV or Parquet depending on the file suffix.
+
+    Parquet output is cast to the typed schema and sorted so that filters on the
+    leading sort keys can skip whole row groups.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    name = name or path.stem
+    if path.suffix == ".parquet":
+        df = apply_schema(df, name)
+        sort_by = [c for c in schema_for(name).get("sort_by", []) if c in df.columns]
+        if sort_by:
+            df = df.sort_values(sort_by, kind="stable", ignore_index=True)
+        df.to_parquet(path, index=False, row_group_size=50_000)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def read_table(
+    path: str | Path,
+    columns: list[str] | None = None,
+    filters=None,
+    *,
+    name: str | None = None,
+    typed: bool = True,
+) -> pd.DataFrame:
+    """Read a CSV or Parquet table, optionally only some columns / rows.
+
+    For Parquet, `columns` and `filters` are pushed down into the reader; for
+    CSV they are applied after parsing. `typed=True` returns the schema dtypes
+    for both formats.
+    """
+    path = Path(path)
+    name = name or path.stem
+    if path.suffix == ".parquet":
+        df = pd.read_parquet(path, columns=columns, filters=_as_pyarrow_filters(filters))
+    else:
+        usecols = None
+        if columns is not None:
+            usecols = list(dict.fromkeys(columns + [f[0] for f in _as_pyarrow_filters(filters) or []]))
+        df = pd.read_csv(path, usecols=usecols)
+        if filters:
+            df = apply_schema(df, name) if typed else df
+            df = _filter_frame(df, filters)
+        if columns is not None:
+            df = df[columns]
+    if typed:
+        df = apply_schema(df, name)
+        # drop categories filtered away by the predicate
+        for col in df.select_dtypes("category"):
+            df[col] = df[col].cat.remove_unused_categories()
+    return df.reset_index(drop=True)
+
+
+def convert_to_parquet(csv_path: str | Path, parquet_path: str | Path | None = None) -> Path:
+    """One-off conversion of an existing CSV artifact to typed Parquet."""
+    csv_path = Path(csv_path)
+    parquet_path = Path(parquet_path) if parquet_path else csv_path.with_suffix(".parquet")
+    return write_table(pd.read_csv(csv_path), parquet_path, name=csv_path.stem)
+
+
+def checkpoint(df: pd.DataFrame, path: str | Path | None) -> pd.DataFrame:
+    """Persist `df` when a path is given, then hand it on unchanged."""
+    if path is not None:
+        write_table(df, path)
+        print(f"💾 Checkpoint written: {path}")
+    return df
+
+
+if __name__ == "__main__":
+    # python storage.py file1.csv file2.csv ...  -> typed .parquet next to each CSV
+    import sys
+    for arg in sys.argv[1:]:
+        print("✅", convert_to_parquet(arg))
@@ -0,0 +1,98 @@
+#SHARED WORLD BANK (WDI) INDICATOR LOADER
+# Reads both WDI export layouts:
+#   - bulk download: 4 metadata lines, then "Country Name","Country Code",
+#     "Indicator Name","Indicator Code","1960",...  (empty cells for missing)
+#   - DataBank export: "Country Name","Country Code","Series Name","Series Code",
+#     "2021 [YR2021]",...  (".." for missing, source notes at the bottom)
+# Every file becomes the same long frame (Country Name, ISO, Indicator Name,
+# Indicator Code, Year, Value). load_wdi reads several files concurrently,
+# stacks them into one long frame keyed by (ISO, Year, indicator) and pivots
+# once, instead of melting each file and chaining outer merges.
+from __future__ import annotations
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+ID_COLS = ["Country Name", "ISO", "Indicator Name", "Indicator Code"]
+YEAR_HEADER = re.compile(r"^(\d{4})(?:\s*\[YR\d{4}\])?$")
+_DATABANK = {"Series Name": "Indicator Name", "Series Code": "Indicator Code"}
+
+
+def _header_line(path: Path, max_lines: int = 50) -> int:
+    """Index of the "Country Name" header line (0 for DataBank, 4 for bulk files)."""
+    with open(path, encoding="utf-8-sig") as f:
+        for i, line in enumerate(f):
+            if line.lstrip('"').startswith("Country Name"):
+                return i
+            if i >= max_lines:
+                break
+    raise ValueError(f"{path}: no 'Country Name' header found, not a WDI export")
+
+
+def read_wdi(path: str | Path, years=None) -> pd.DataFrame:
+    """One WDI file (either layout) as a long frame with numeric Year / Value.
+
+    `years` keeps only those year columns. Rows without a country code (DataBank
+    footnotes) are dropped; missing values stay as NaN.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"The file {path} does not exist. Please check the path.")
+
+    df = pd.read_csv(path, skiprows=_header_line(path), na_values=[".."], encoding="utf-8-sig")
+    df = df.rename(columns=_DATABANK).rename(columns={"Country Code": "ISO"})
+
+    year_cols = {}
+    for col in df.columns:
+        m = YEAR_HEADER.match(str(col).strip())
+        if m and (years is None or int(m.group(1)) in years):
+            year_cols[col] = m.group(1)
+    df = df.dropna(subset=["ISO"])
+    df = df[[c for c in ID_COLS if c in df.columns] + list(year_cols)].rename(columns=year_cols)
+
+    long = df.melt(id_vars=[c for c in ID_COLS if c in df.columns],
+                   var_name="Year", value_name="Value")
+    long["Year"] = long["Year"].astype(int)
+    long["Value"] = pd.to_numeric(long["Value"], errors="coerce")
+    return long
+
+
+def load_wdi(
+    files: dict[str, str | Path],
+    *,
+    years=None,
+    wide: bool = True,
+    max_workers: int | None = None,
+) -> pd.DataFrame:
+    """Several WDI indicators keyed by (ISO, Year), read concurrently.
+
+    `files` maps an output column name to a file. A file holding several series
+    (DataBank) is labelled "<name>|<series code>". With `wide=True` the result has
+    one column per indicator in the order of `files` and every (ISO, Year) that
+    appears in any file, like an outer merge on ISO / Year; otherwise the stacked
+    long frame (ISO, Year, indicator, Value) is returned.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers or len(files) or 1) as pool:
+        frames = dict(zip(files, pool.map(lambda p: read_wdi(p, years), files.values())))
+
+    labels, stacked = [], []
+    for name, long in frames.items():
+        codes = long["Indicator Code"].dropna().unique() if "Indicator Code" in long else []
+        if len(codes) > 1:
+            long = long.assign(indicator=name + "|" + long["Indicator Code"])
+            labels.extend(name + "|" + c for c in codes)
+        else:
+            long = long.assign(indicator=name)
+            labels.append(name)
+        stacked.append(long[["ISO", "Year", "indicator", "Value"]])
+    long = pd.concat(stacked, ignore_index=True)
+
+    if not wide:
+        return long
+    out = long.set_index(["ISO", "Year", "indicator"])["Value"].unstack("indicator")
+    out = out.reindex(columns=labels).reset_index()
+    out.columns.name = None
+    return out
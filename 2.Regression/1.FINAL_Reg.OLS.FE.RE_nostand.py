@@ -4,28 +4,18 @@
 # ================================================================
 
 import pandas as pd
-import numpy as np
 import statsmodels.api as sm
 from linearmodels.panel import PanelOLS, RandomEffects
-from scipy.stats import chi2
-from statsmodels.stats.outliers_influence import variance_inflation_factor
-from statsmodels.stats.diagnostic import het_breuschpagan
-from statsmodels.stats.stattools import durbin_watson
+from panel_builder import entity, load_panel, sample
+from hausman import hausman, mundlak, preferred
+from diagnostics import diagnostics
+from model_registry import save_model
 
 # ---------------------------------------------------------------
-# 1. Load data
+# 1. Load data (cached panel: (ISO, Year) index, int8 technology
+#    dummies, inf already replaced by NaN)
 # ---------------------------------------------------------------
-df = pd.read_csv(
-    "/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/1.Cleaning_and_Merges/final_wacc_macro_historical.csv"
-)
-
-# Create technology dummies
-df["is_solar"] = df["technology"].str.contains("solar", case=False, na=False).astype(int)
-df["is_wind_onshore"] = df["technology"].str.contains("onshore", case=False, na=False).astype(int)
-df["is_wind_offshore"] = df["technology"].str.contains("offshore", case=False, na=False).astype(int)
-
-# Replace inf with NaN
-df = df.replace([np.inf, -np.inf], np.nan)
+df = load_panel("historical")
 
 # ---------------------------------------------------------------
 # 2. Define predictor sets
@@ -38,72 +28,61 @@ predictors_all = continuous_all + tech_vars
 predictors_no_pop = continuous_no_pop + tech_vars
 
 # ---------------------------------------------------------------
-# 3. Clean data
+# 3. Clean data (complete cases, shared definition in panel_builder)
 # ---------------------------------------------------------------
-df_clean_all = df.dropna(subset=predictors_all + ["wacc", "ISO", "Year"]).copy()
-df_clean_nopop = df.dropna(subset=predictors_no_pop + ["wacc", "ISO", "Year"]).copy()
+df_clean_all = sample(df, "all")
+df_clean_nopop = sample(df, "no_pop")
 
 # ---------------------------------------------------------------
 # 4. OLS (with population)
 # ---------------------------------------------------------------
 X_ols = sm.add_constant(df_clean_all[predictors_all])
 y = df_clean_all["wacc"]
-ols = sm.OLS(y, X_ols).fit(cov_type="cluster", cov_kwds={"groups": df_clean_all["ISO"]})
+ols = sm.OLS(y, X_ols).fit(cov_type="cluster", cov_kwds={"groups": entity(df_clean_all)})
 
 # ---------------------------------------------------------------
 # 5. FE (with population)
+#    PanelOLS for the full summary (R² between / overall, F-tests,
+#    confidence intervals); within_estimator.fit_within gives the same
+#    estimates and is used for the sweeps and robustness loops
 # ---------------------------------------------------------------
-panel_fe_all = df_clean_all.set_index(["ISO", "Year"])
-fe_all = PanelOLS(panel_fe_all["wacc"], panel_fe_all[predictors_all],
+fe_all = PanelOLS(df_clean_all["wacc"], df_clean_all[predictors_all],
                   entity_effects=True, time_effects=True).fit(cov_type="clustered", cluster_entity=True)
 
 # ---------------------------------------------------------------
 # 6. FE (without population)
 # ---------------------------------------------------------------
-panel_fe_nopop = df_clean_nopop.set_index(["ISO", "Year"])
-fe_nopop = PanelOLS(panel_fe_nopop["wacc"], panel_fe_nopop[predictors_no_pop],
+fe_nopop = PanelOLS(df_clean_nopop["wacc"], df_clean_nopop[predictors_no_pop],
                     entity_effects=True, time_effects=True).fit(cov_type="clustered", cluster_entity=True)
 
 # ---------------------------------------------------------------
 # 7. Random Effects (with population)
 # ---------------------------------------------------------------
-panel_re = df_clean_all.set_index(["ISO", "Year"])
+panel_re = df_clean_all
 re = RandomEffects(panel_re["wacc"], panel_re[predictors_all]).fit()
 
 # ---------------------------------------------------------------
 # 8. Hausman Test
 # ---------------------------------------------------------------
-def hausman(fe, re):
-    b = fe.params
-    B = re.params
-    common = b.index.intersection(B.index)
-    b = b[common]
-    B = B[common]
-    v_b = fe.cov.loc[common, common]
-    v_B = re.cov.loc[common, common]
-    stat = np.dot((b - B).T, np.linalg.inv(v_b - v_B)).dot(b - B)
-    pval = chi2.sf(stat, df=len(b))
-    return stat, pval
-
-stat, pval = hausman(fe_all, re)
+# generalized inverse of V_FE - V_RE (see hausman.py), plus the Mundlak
+# (augmented OLS) variant that needs no RE fit
+stat, pval, hausman_df, _ = hausman(fe_all, re)
+mundlak_test = mundlak(df_clean_all, predictors_all)
 
 # ---------------------------------------------------------------
-# 9. Diagnostics
+# 9. Diagnostics (VIF from the inverted correlation matrix, BP and DW
+#    from the OLS residuals, see diagnostics.py)
 # ---------------------------------------------------------------
+diag = diagnostics(df_clean_all[predictors_all], ols.resid)
+
 print("\n--- Variance Inflation Factors (VIF) ---")
-vif_data = pd.DataFrame()
-vif_data["Variable"] = predictors_all
-vif_data["VIF"] = [variance_inflation_factor(df_clean_all[predictors_all].values, i)
-                   for i in range(len(predictors_all))]
-print(vif_data)
+print(diag.vif.reset_index())
 
-bp_test = het_breuschpagan(ols.resid, ols.model.exog)
 print("\n--- Breusch-Pagan test for heteroskedasticity ---")
-print(f"LM statistic: {bp_test[0]:.4f}, p-value: {bp_test[1]:.4f}")
+print(f"LM statistic: {diag.bp_lm:.4f}, p-value: {diag.bp_pvalue:.4f}")
 
-dw_stat = durbin_watson(ols.resid)
 print("\n--- Durbin-Watson test for autocorrelation ---")
-print(f"Durbin-Watson statistic: {dw_stat:.4f} (value near 2 suggests no autocorrelation)")
+print(f"Durbin-Watson statistic: {diag.dw:.4f} (value near 2 suggests no autocorrelation)")
 
 # ---------------------------------------------------------------
 # 10. Output summaries
@@ -113,7 +92,8 @@ print(f"OLS Adj. R²:        {ols.rsquared_adj:.4f}")
 print(f"FE (with pop) R²:   {fe_all.rsquared_within:.4f}")
 print(f"FE (no pop) R²:     {fe_nopop.rsquared_within:.4f}")
 print(f"RE Overall R²:      {re.rsquared:.4f}")
-print(f"Hausman p-value:    {pval:.4f}")
+print(f"Hausman p-value:    {pval:.4f} (df = {hausman_df})")
+print(f"Mundlak p-value:    {mundlak_test.pvalue:.4f}")
 
 print("\n=== OLS Coefficients ===")
 print(ols.summary())
@@ -127,7 +107,16 @@ print(fe_nopop.summary)
 print("\n=== Random Effects Coefficients ===")
 print(re.summary)
 
-if pval < 0.05:
+if preferred(pval) == "FE":
     print("\nRecommendation: Use Fixed Effects model (reject RE assumptions).")
-else:
+elif preferred(pval) == "RE":
     print("\nRecommendation: Use Random Effects model (RE preferred).")
+else:
+    print("\nRecommendation: none, the Hausman test is undefined (no positive direction in V_FE - V_RE, df = 0).")
+
+# ---------------------------------------------------------------
+# 11. Save the projection models (FE without population, OLS) to the
+#     registry read by 3.Projection, see model_registry.py
+# ---------------------------------------------------------------
+save_model("fe_nopop", fe_nopop, df_clean_nopop)
+save_model("ols_all", ols, df_clean_all)
@@ -1,25 +1,16 @@
 # REGRESSION SSPS - WACC with Technology Dummies
-import pandas as pd
 import statsmodels.api as sm
-from statsmodels.stats.outliers_influence import variance_inflation_factor
-from statsmodels.stats.diagnostic import het_breuschpagan
 from linearmodels.panel import PanelOLS
 import matplotlib.pyplot as plt
 import seaborn as sns
+from panel_builder import load_panel, sample
+from diagnostics import breusch_pagan, vif
 
-# === Load merged dataset ===
-data_path = "/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/1.Cleaning_and_Merges/final_merged_dataset.csv"
-df = pd.read_csv(data_path).dropna()
-
-# === Ensure index and dependent variable ===
-df = df.set_index(['Country', 'Year'])
+# === Load merged dataset === (cached panel indexed by ISO / Year, complete
+# cases, int8 technology dummies)
+df = sample(load_panel("ssps"), "ssps")
 y = df['wacc']
 
-# === Create technology dummies if not already present ===
-# Only uncomment if they need to be created from 'technology' column:
-# df['is_solar'] = df['technology'].str.contains('solar', case=False, na=False).astype(int)
-# df['is_wind_offshore'] = df['technology'].str.contains('offshore', case=False, na=False).astype(int)
-
 # === Model configurations ===
 models = {
     'Urban only': ['Urban_Share', 'is_solar', 'is_wind_offshore'],
@@ -48,14 +39,11 @@ for name, vars in models.items():
     # --- VIF (only if >1 predictor) ---
     if len(vars) > 1:
         print("\n--- Variance Inflation Factors (VIF) ---")
-        vif_df = pd.DataFrame()
-        vif_df["Variable"] = X.columns
-        vif_df["VIF"] = [variance_inflation_factor(X.values, i) for i in range(X.shape[1])]
-        print(vif_df)
+        print(vif(X).reset_index())
 
     # --- Breusch-Pagan Test (Heteroskedasticity) ---
     print("\n--- Breusch-Pagan Test ---")
-    bp_test = het_breuschpagan(pooled_model.resid, X_ols)
+    bp_test = breusch_pagan(pooled_model.resid, X_ols)
     bp_labels = ['LM statistic', 'p-value', 'f-value', 'f p-value']
     print(dict(zip(bp_labels, bp_test)))
 
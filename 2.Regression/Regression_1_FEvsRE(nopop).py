@@ -1,46 +1,23 @@
 import pandas as pd
-import numpy as np
 import statsmodels.api as sm
 from linearmodels.panel import PanelOLS, RandomEffects
 from sklearn.preprocessing import StandardScaler
-from scipy.stats import chi2
-from statsmodels.stats.outliers_influence import variance_inflation_factor
-from statsmodels.stats.diagnostic import het_breuschpagan
-from statsmodels.stats.stattools import durbin_watson
-
-# Load data
-df = pd.read_csv(
-    "/Users/valentinadlc/Library/Caches/JetBrains/PyCharm2025.1/demo/PyCharmLearningProject/data1/wacc_with_gdpppp2021.csv"
-)
-df.rename(columns={"GDP_PPP": "gdp_ppp"}, inplace=True)
-
-# Technology dummies
-df["is_solar"] = df["technology"].str.contains("solar", case=False, na=False).astype(int)
-df["is_wind_onshore"] = df["technology"].str.contains("onshore", case=False, na=False).astype(int)
-df["is_wind_offshore"] = df["technology"].str.contains("offshore", case=False, na=False).astype(int)
+from panel_builder import entity, load_panel, sample
+from hausman import hausman, mundlak, preferred
+from diagnostics import diagnostics
+
+# Load data (cached panel: (ISO, Year) index, technology dummies, inf -> NaN)
+df = load_panel("gdp2021")
 
 # Standardize macro vars (excluding population)
-df = df.replace([np.inf, -np.inf], np.nan)
 continuous = ["gdp_ppp", "inflation", "unemployment"]
 df[continuous] = StandardScaler().fit_transform(df[continuous])
 
 # Create explicit time dummies from Year for RE model
-year_dummies = pd.get_dummies(df["Year"], prefix="Year", drop_first=True)
+year_dummies = pd.get_dummies(df.index.get_level_values("Year"), prefix="Year", drop_first=True)
+year_dummies.index = df.index
 df = pd.concat([df, year_dummies], axis=1)
 
-# Hausman test function
-def hausman(fe, re):
-    b = fe.params
-    B = re.params
-    common = b.index.intersection(B.index)
-    b = b[common]
-    B = B[common]
-    v_b = fe.cov.loc[common, common]
-    v_B = re.cov.loc[common, common]
-    stat = np.dot((b - B).T, np.linalg.inv(v_b - v_B)).dot(b - B)
-    pval = chi2.sf(stat, df=len(b))
-    return stat, pval
-
 # Base predictors (tech + macro vars)
 tech_vars = ["is_solar", "is_wind_offshore"]
 time_vars = list(year_dummies.columns)  # All time dummies except first year
@@ -48,56 +25,53 @@ predictors_ols_fe = continuous + tech_vars
 predictors_re = continuous + tech_vars + time_vars  # Include time dummies for RE
 
 # Clean data for OLS and FE (no time dummies needed)
-df_clean = df.dropna(subset=predictors_ols_fe + ["wacc", "ISO", "Year"]).copy()
+df_clean = sample(df, "no_pop")
 
 # Prepare data for diagnostics and OLS
 X_ols = sm.add_constant(df_clean[predictors_ols_fe])
 y = df_clean["wacc"]
 
-# Calculate VIFs for multicollinearity check
-vif_data = pd.DataFrame()
-vif_data["Variable"] = predictors_ols_fe
-vif_data["VIF"] = [variance_inflation_factor(X_ols.values, i+1) for i in range(len(predictors_ols_fe))]
+# OLS model
+ols = sm.OLS(y, X_ols).fit(cov_type="cluster", cov_kwds={"groups": entity(df_clean)})
 
-print("\n--- Variance Inflation Factors (VIF) ---")
-print(vif_data)
+# Diagnostics: VIFs (multicollinearity), Breusch-Pagan (heteroskedasticity)
+# and Durbin-Watson (autocorrelation) from the OLS residuals
+diag = diagnostics(df_clean[predictors_ols_fe], ols.resid)
 
-# OLS model
-ols = sm.OLS(y, X_ols).fit(cov_type="cluster", cov_kwds={"groups": df_clean["ISO"]})
+print("\n--- Variance Inflation Factors (VIF) ---")
+print(diag.vif.reset_index())
 
-# Breusch-Pagan test for heteroskedasticity
-bp_test = het_breuschpagan(ols.resid, ols.model.exog)
 print(f"\n--- Breusch-Pagan test for heteroskedasticity ---")
-print(f"LM statistic: {bp_test[0]:.4f}, p-value: {bp_test[1]:.4f}")
+print(f"LM statistic: {diag.bp_lm:.4f}, p-value: {diag.bp_pvalue:.4f}")
 
-# Durbin-Watson test for autocorrelation
-dw_stat = durbin_watson(ols.resid)
 print(f"\n--- Durbin-Watson test for autocorrelation ---")
-print(f"Durbin-Watson statistic: {dw_stat:.4f} (value near 2 suggests no autocorrelation)")
+print(f"Durbin-Watson statistic: {diag.dw:.4f} (value near 2 suggests no autocorrelation)")
 
 # Panel data for FE and RE
-panel_data_fe = df_clean.set_index(["ISO", "Year"])
+panel_data_fe = df_clean
 
 # Fixed Effects model (with entity and time effects)
 fe = PanelOLS(panel_data_fe["wacc"], panel_data_fe[predictors_ols_fe],
               entity_effects=True, time_effects=True).fit(cov_type="clustered", cluster_entity=True)
 
 # For RE, must include time dummies explicitly
-df_clean_re = df_clean.dropna(subset=predictors_re + ["wacc", "ISO", "Year"]).copy()
-panel_data_re = df_clean_re.set_index(["ISO", "Year"])
+panel_data_re = df_clean.dropna(subset=predictors_re + ["wacc"])
 X_re = panel_data_re[predictors_re]
 
 re = RandomEffects(panel_data_re["wacc"], X_re).fit()
 
-# Hausman test
-stat, pval = hausman(fe, re)
+# Hausman test (generalized inverse of V_FE - V_RE) and its Mundlak
+# (augmented OLS) variant
+stat, pval, hausman_df, _ = hausman(fe, re)
+mundlak_test = mundlak(df_clean, predictors_ols_fe)
 
 # Output results
 print("\n=== Model Comparison ===")
 print(f"OLS Adj. R²:      {ols.rsquared_adj:.4f}")
 print(f"FE Within R²:     {fe.rsquared_within:.4f}")
 print(f"RE Overall R²:    {re.rsquared:.4f}")
-print(f"Hausman test p-value: {pval:.4f}")
+print(f"Hausman test p-value: {pval:.4f} (df = {hausman_df})")
+print(f"Mundlak test p-value: {mundlak_test.pvalue:.4f}")
 
 print("\n=== OLS Coefficients ===")
 print(ols.summary())
@@ -108,7 +82,9 @@ print(fe.summary)
 print("\n=== Random Effects Coefficients ===")
 print(re.summary)
 
-if pval < 0.05:
+if preferred(pval) == "FE":
     print("\nRecommendation: Use Fixed Effects model (reject RE assumptions).")
-else:
+elif preferred(pval) == "RE":
     print("\nRecommendation: Use Random Effects model (RE preferred).")
+else:
+    print("\nRecommendation: none, the Hausman test is undefined (no positive direction in V_FE - V_RE, df = 0).")
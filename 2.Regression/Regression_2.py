@@ -4,67 +4,28 @@
 # -------------------------------------------------------------
 import pandas as pd
 import statsmodels.api as sm
-from linearmodels.panel import PanelOLS
 from sklearn.preprocessing import StandardScaler
 import matplotlib.pyplot as plt
+from panel_builder import load_panel
+from within_estimator import WithinDesign
+from spec_sweep import r2_table, sweep_groups
+from wild_bootstrap import wild_bootstrap
 
 # -------------------------------------------------------------
-# 0. Load dataset
+# 0. Load dataset (cached panel with int8 technology dummies and
+#    inf -> NaN, see panel_builder; ISO / Year kept as columns here)
 # -------------------------------------------------------------
-df = pd.read_csv("/Users/valentinadlc/Library/Caches/JetBrains/PyCharm2025.1/demo/PyCharmLearningProject/data1/wacc_with_gdpppp2021.csv")
-df.rename(columns={"GDP_PPP": "gdp_ppp"}, inplace=True)
+df = load_panel("gdp2021").reset_index()
 
 # -------------------------------------------------------------
-# 1. Add Region from ISO
-# -------------------------------------------------------------
-iso_to_region = {
-    'ARG': 'Latin America & Caribbean', 'AUS': 'East Asia & Pacific', 'AUT': 'Europe & Central Asia',
-    'BEL': 'Europe & Central Asia', 'BGD': 'South Asia', 'BGR': 'Europe & Central Asia',
-    'BHR': 'Middle East & North Africa', 'BOL': 'Latin America & Caribbean', 'BRA': 'Latin America & Caribbean',
-    'BWA': 'Sub-Saharan Africa', 'CHE': 'Europe & Central Asia', 'CHL': 'Latin America & Caribbean',
-    'CHN': 'East Asia & Pacific', 'CMR': 'Sub-Saharan Africa', 'COL': 'Latin America & Caribbean',
-    'CRI': 'Latin America & Caribbean', 'CYP': 'Europe & Central Asia', 'CZE': 'Europe & Central Asia',
-    'DEU': 'Europe & Central Asia', 'DNK': 'Europe & Central Asia', 'EGY': 'Middle East & North Africa',
-    'ESP': 'Europe & Central Asia', 'EST': 'Europe & Central Asia', 'FIN': 'Europe & Central Asia',
-    'FRA': 'Europe & Central Asia', 'GBR': 'Europe & Central Asia', 'GHA': 'Sub-Saharan Africa',
-    'GRC': 'Europe & Central Asia', 'GTM': 'Latin America & Caribbean', 'HRV': 'Europe & Central Asia',
-    'HUN': 'Europe & Central Asia', 'IDN': 'East Asia & Pacific', 'IND': 'South Asia', 'IRL': 'Europe & Central Asia',
-    'ISR': 'Middle East & North Africa', 'ITA': 'Europe & Central Asia', 'JAM': 'Latin America & Caribbean',
-    'JOR': 'Middle East & North Africa', 'KEN': 'Sub-Saharan Africa', 'KHM': 'East Asia & Pacific',
-    'LKA': 'South Asia', 'LTU': 'Europe & Central Asia', 'LVA': 'Europe & Central Asia',
-    'MAR': 'Middle East & North Africa', 'MEX': 'Latin America & Caribbean', 'MLT': 'Middle East & North Africa',
-    'MOZ': 'Sub-Saharan Africa', 'MUS': 'Sub-Saharan Africa', 'MYS': 'East Asia & Pacific', 'NAM': 'Sub-Saharan Africa',
-    'NGA': 'Sub-Saharan Africa', 'NLD': 'Europe & Central Asia', 'NOR': 'Europe & Central Asia',
-    'OMN': 'Middle East & North Africa', 'PAK': 'South Asia', 'PAN': 'Latin America & Caribbean',
-    'PER': 'Latin America & Caribbean', 'PHL': 'East Asia & Pacific', 'POL': 'Europe & Central Asia',
-    'PRT': 'Europe & Central Asia', 'PRY': 'Latin America & Caribbean', 'ROU': 'Europe & Central Asia',
-    'SAU': 'Middle East & North Africa', 'SEN': 'Sub-Saharan Africa', 'SGP': 'East Asia & Pacific',
-    'SLV': 'Latin America & Caribbean', 'SVK': 'Europe & Central Asia', 'SVN': 'Europe & Central Asia',
-    'SWE': 'Europe & Central Asia', 'TUN': 'Middle East & North Africa', 'TUR': 'Europe & Central Asia',
-    'TWN': 'East Asia & Pacific', 'TZA': 'Sub-Saharan Africa', 'UGA': 'Sub-Saharan Africa',
-    'UKR': 'Europe & Central Asia', 'URY': 'Latin America & Caribbean', 'USA': 'North America',
-    'VEN': 'Latin America & Caribbean', 'VNM': 'East Asia & Pacific', 'YEM': 'Middle East & North Africa',
-    'ZAF': 'Sub-Saharan Africa', 'ZMB': 'Sub-Saharan Africa'
-}
-df["Region"] = df["ISO"].map(iso_to_region)
-
-# -------------------------------------------------------------
-# 2. Technology dummies
-# -------------------------------------------------------------
-df["is_solar"] = df["technology"].str.contains("solar", case=False, na=False).astype(int)
-df["is_wind_onshore"] = df["technology"].str.contains("onshore", case=False, na=False).astype(int)
-df["is_wind_offshore"] = df["technology"].str.contains("offshore", case=False, na=False).astype(int)
-
+# 1. Standardize macro variables
 # -------------------------------------------------------------
-# 3. Standardize macro variables
-# -------------------------------------------------------------
-df = df.replace([float('inf'), float('-inf')], pd.NA)
 continuous = ["gdp_ppp", "inflation", "unemployment"]
 scaler = StandardScaler()
 df[continuous] = scaler.fit_transform(df[continuous])
 
 # -------------------------------------------------------------
-# 4. Base regressions: pooled OLS & FE
+# 2. Base regressions: pooled OLS & FE
 # -------------------------------------------------------------
 base_sets = {
     "Onshore_ref": ["is_solar", "is_wind_offshore"],
@@ -72,21 +33,20 @@ base_sets = {
 }
 results = []
 
+# The technology dummies are never missing, so both reference choices use the
+# same sample: demean it once (two-way FE) and solve each predictor set on it.
+tmp = df.dropna(subset=continuous + ["wacc", "ISO", "Year"]).copy()
+fe_design = WithinDesign(tmp.set_index(["ISO", "Year"]),
+                         continuous + ["is_solar", "is_wind_onshore", "is_wind_offshore"])
+
 for name, tech_dums in base_sets.items():
     predictors = continuous + tech_dums
-    tmp = df.dropna(subset=predictors + ["wacc", "ISO", "Year"]).copy()
 
     X_ols = sm.add_constant(tmp[predictors])
     y_ols = tmp["wacc"]
     ols = sm.OLS(y_ols, X_ols).fit(cov_type="cluster", cov_kwds={"groups": tmp["ISO"]})
 
-    panel_data = tmp.set_index(["ISO", "Year"])
-    fe_model = PanelOLS(
-        panel_data["wacc"], panel_data[predictors],
-        entity_effects=True, time_effects=True,
-        check_rank=False, drop_absorbed=True
-    )
-    fe = fe_model.fit(cov_type="clustered", cluster_entity=True)
+    fe = fe_design.fit(predictors)
 
     results.append({
         "Reference": name,
@@ -97,7 +57,7 @@ for name, tech_dums in base_sets.items():
     })
 
 # -------------------------------------------------------------
-# 5. Summary display
+# 3. Summary display
 # -------------------------------------------------------------
 for res in results:
     print(f"\n=== {res['Reference']} ===")
@@ -109,76 +69,51 @@ for res in results:
     print(res["FE_params"].filter(like="is_"))
 
 # -------------------------------------------------------------
-# 6. Robustness: Technology & Region
+# 4. Wild cluster bootstrap (Webb weights per ISO, 9,999 replicates):
+#    percentile-t CIs and restricted p-values next to the clustered SEs
 # -------------------------------------------------------------
-tech_labels = {
-    "Solar_PV": {"is_solar": 1},
-    "Wind_Onshore": {"is_wind_onshore": 1},
-    "Wind_Offshore": {"is_wind_offshore": 1}
-}
-regions = df["Region"].dropna().unique()
-robustness_results = []
+bootstrap_tables = []
+for name, tech_dums in base_sets.items():
+    predictors = continuous + tech_dums
+    for model in ["ols", "fe"]:
+        boot = wild_bootstrap(tmp.set_index(["ISO", "Year"]), predictors, model, seed=2021)
+        print(f"\n=== {name} / {model.upper()}: wild cluster bootstrap ===")
+        print(boot.round(4).to_string())
+        bootstrap_tables.append(boot.reset_index().assign(Reference=name, Model=model.upper()))
 
-print("\n\n================= ROBUSTNESS: BY TECHNOLOGY =================\n")
-for label, tech_filter in tech_labels.items():
-    subset = df.copy()
-    for col, val in tech_filter.items():
-        subset = subset[subset[col] == val]
-    if subset.shape[0] < 20:
-        print(f"⚠️ Not enough data for {label} — skipped.")
-        continue
-    predictors = ["gdp_ppp", "inflation", "unemployment"]
-    subset = subset.dropna(subset=predictors + ["wacc", "ISO", "Year"])
-    X = sm.add_constant(subset[predictors])
-    y = subset["wacc"]
-    ols = sm.OLS(y, X).fit(cov_type="cluster", cov_kwds={"groups": subset["ISO"]})
-    panel = subset.set_index(["ISO", "Year"])
-    fe_model = PanelOLS(
-        panel["wacc"], panel[predictors],
-        entity_effects=True, time_effects=True,
-        check_rank=False, drop_absorbed=True
-    )
-    fe = fe_model.fit(cov_type="clustered", cluster_entity=True)
-    print(f"\n▶ Technology: {label}")
-    print(f"  OLS Adj. R²: {ols.rsquared_adj:.4f}")
-    print(f"  FE Within R²: {fe.rsquared_within:.4f}")
-    robustness_results.append({
-        "Group": label, "Type": "Technology",
-        "OLS_R2": ols.rsquared_adj, "FE_R2": fe.rsquared_within
-    })
+# -------------------------------------------------------------
+# 5. Robustness: Technology & Region
+#    (one fit per group on slices of the panel sorted by group,
+#    regions from 3.Projection/country_groups.py, see spec_sweep)
+# -------------------------------------------------------------
+panel = df.set_index(["ISO", "Year"])
+robustness_sets = {
+    "Technology": {"macro": ["gdp_ppp", "inflation", "unemployment"]},
+    "Region": {"Onshore_ref": ["gdp_ppp", "inflation", "unemployment", "is_solar", "is_wind_offshore"]},
+}
+robustness_results, robustness_grids = [], []
 
-print("\n\n================= ROBUSTNESS: BY REGION =================\n")
-for region in sorted(regions):
-    subset = df[df["Region"] == region].copy()
-    predictors = ["gdp_ppp", "inflation", "unemployment", "is_solar", "is_wind_offshore"]
-    subset = subset.dropna(subset=predictors + ["wacc", "ISO", "Year"])
-    if subset.shape[0] < 20:
-        print(f"⚠️ Not enough data for {region} — skipped.")
-        continue
-    X = sm.add_constant(subset[predictors])
-    y = subset["wacc"]
-    ols = sm.OLS(y, X).fit(cov_type="cluster", cov_kwds={"groups": subset["ISO"]})
-    panel = subset.set_index(["ISO", "Year"])
-    fe_model = PanelOLS(
-        panel["wacc"], panel[predictors],
-        entity_effects=True, time_effects=True,
-        check_rank=False, drop_absorbed=True
-    )
-    fe = fe_model.fit(cov_type="clustered", cluster_entity=True)
-    print(f"\n▶ Region: {region}")
-    print(f"  OLS Adj. R²: {ols.rsquared_adj:.4f}")
-    print(f"  FE Within R²: {fe.rsquared_within:.4f}")
-    robustness_results.append({
-        "Group": region, "Type": "Region",
-        "OLS_R2": ols.rsquared_adj, "FE_R2": fe.rsquared_within
-    })
+for group_type, sets in robustness_sets.items():
+    print(f"\n\n================= ROBUSTNESS: BY {group_type.upper()} =================\n")
+    grid = sweep_groups(panel, sets, group_type, ("ols", "fe"), executor="thread")
+    table = r2_table(grid, group_type)
+    for _, row in table.iterrows():
+        print(f"\n▶ {group_type}: {row['Group']}")
+        print(f"  OLS Adj. R²: {row['OLS_R2']:.4f}")
+        print(f"  FE Within R²: {row['FE_R2']:.4f}")
+    robustness_results.append(table.drop(columns="Spec"))
+    robustness_grids.append(grid.assign(Type=group_type))
 
 # -------------------------------------------------------------
-# 7. Save & Plot
+# 6. Save & Plot
 # -------------------------------------------------------------
-robust_df = pd.DataFrame(robustness_results)
+robust_df = pd.concat(robustness_results, ignore_index=True)
 robust_df.to_csv("robustness_check_results.csv", index=False)
 print("\n✅ Saved to: robustness_check_results.csv")
+pd.concat(robustness_grids, ignore_index=True).to_csv("robustness_check_coefficients.csv", index=False)
+print("✅ Coefficients and clustered SEs saved to: robustness_check_coefficients.csv")
+pd.concat(bootstrap_tables, ignore_index=True).to_csv("bootstrap_results.csv", index=False)
+print("✅ Wild bootstrap CIs and p-values saved to: bootstrap_results.csv")
 
 for subset in ["Technology", "Region"]:
     df_sub = robust_df[robust_df["Type"] == subset].sort_values("FE_R2", ascending=False)
@@ -1,16 +1,13 @@
 # REGRESSION SSPS - WACC
-import pandas as pd
 import statsmodels.api as sm
-from statsmodels.stats.outliers_influence import variance_inflation_factor
-from statsmodels.stats.diagnostic import het_breuschpagan
 from linearmodels.panel import PanelOLS
 import matplotlib.pyplot as plt
 import seaborn as sns
+from panel_builder import load_panel, sample
+from diagnostics import breusch_pagan, vif
 
-# === Load merged dataset ===
-data_path = "/Users/valentinadlc/Library/Caches/JetBrains/PyCharm2025.1/demo/PyCharmLearningProject/WACC Thesis/final_merged_dataset.csv"
-df = pd.read_csv(data_path).dropna()
-df = df.set_index(['Country', 'Year'])
+# === Load merged dataset === (cached panel indexed by ISO / Year, complete cases)
+df = sample(load_panel("ssps"), "ssps")
 y = df['wacc']
 
 # === Model configurations ===
@@ -41,13 +38,10 @@ for name, vars in models.items():
     # --- VIF
     if len(vars) > 1:  # Only if more than one predictor
         print("\n--- VIF ---")
-        vif_df = pd.DataFrame()
-        vif_df["Variable"] = X.columns
-        vif_df["VIF"] = [variance_inflation_factor(X.values, i) for i in range(X.shape[1])]
-        print(vif_df)
+        print(vif(X).reset_index())
 
     # --- Breusch-Pagan (OLS residuals)
-    bp_test = het_breuschpagan(pooled_model.resid, X_ols)
+    bp_test = breusch_pagan(pooled_model.resid, X_ols)
     bp_labels = ['Lagrange multiplier statistic', 'p-value', 'f-value', 'f p-value']
     print("\n--- Breusch-Pagan Test ---")
     print(dict(zip(bp_labels, bp_test)))
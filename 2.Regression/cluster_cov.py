@@ -0,0 +1,127 @@
+#CLUSTER-ROBUST (SANDWICH) COVARIANCE SHARED BY THE ESTIMATORS
+# statsmodels (cov_type="cluster") and PanelOLS (cov_type="clustered") group the
+# scores in Python on every fit. Here the cluster structure is built once per
+# sample: the labels are factorized into integer codes and the rows ordered by
+# code, so the per-cluster score sums of any residual vector are a single
+# np.add.reduceat over contiguous blocks. One-way (ISO) and two-way (ISO x Year,
+# Cameron-Gelbach-Miller: V_iso + V_year - V_iso&year) clustering are supported:
+#
+#   clusters = Clusters(panel.index.get_level_values("ISO"))
+#   cov = cluster_cov(X, eps, clusters)                  # statsmodels CRV1
+#   cov = cluster_cov(X, eps, clusters, scale=n / df)    # PanelOLS convention
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+class _Groups:
+    """Integer codes of one clustering dimension and its row order by code."""
+
+    def __init__(self, codes: np.ndarray):
+        self.codes = codes
+        self.n = int(codes.max()) + 1 if len(codes) else 0
+        self.order = np.argsort(codes, kind="stable")
+        self.starts = np.searchsorted(codes[self.order], np.arange(self.n))
+
+    def sums(self, scores: np.ndarray) -> np.ndarray:
+        """Per-group column sums of `scores` (n x k) -> (groups x k)."""
+        return np.add.reduceat(scores[self.order], self.starts, axis=0)
+
+
+class Clusters:
+    """One- or two-way cluster structure of a sample, built once and reused.
+
+    `keys` are one or two row-aligned label arrays (e.g. ISO, or ISO and Year).
+    Missing labels are not allowed.
+    """
+
+    def __init__(self, *keys):
+        if len(keys) not in (1, 2):
+            raise ValueError("Only 1 or 2-way clustering supported.")
+        codes = [pd.factorize(np.asarray(k))[0] for k in keys]
+        if any((c < 0).any() for c in codes):
+            raise ValueError("cluster labels must not be missing")
+        self.dims = [_Groups(c) for c in codes]
+        if len(codes) == 2:
+            both = pd.factorize(codes[0].astype("int64") * (codes[1].max() + 1) + codes[1])[0]
+            self.intersection = _Groups(both)
+        self.nobs = len(codes[0])
+
+    @property
+    def n_groups(self) -> tuple[int, ...]:
+        return tuple(d.n for d in self.dims)
+
+    def _component(self, groups: _Groups, scores: np.ndarray, correct: bool, k: int) -> np.ndarray:
+        s = groups.sums(scores)
+        meat = s.T @ s
+        if correct:
+            g, n = groups.n, self.nobs
+            meat *= g / (g - 1) * (n - 1) / (n - k)
+        return meat
+
+    def meat(self, scores: np.ndarray, *, correct: bool = False) -> np.ndarray:
+        """Sum over clusters of s_g s_g', combined across dimensions.
+
+        With `correct=True` every component gets the CRV1 factor
+        G/(G-1) * (N-1)/(N-K), as statsmodels applies it.
+        """
+        k = scores.shape[1]
+        out = self._component(self.dims[0], scores, correct, k)
+        if len(self.dims) == 2:
+            out = (out + self._component(self.dims[1], scores, correct, k)
+                   - self._component(self.intersection, scores, correct, k))
+        return out
+
+
+def gram_inv(gram: np.ndarray) -> np.ndarray:
+    """(Pseudo-)inverse of a cross-product matrix, computed on unit-norm columns.
+
+    Predictors in levels (population, GDP) and dummies differ by many orders
+    of magnitude; scaling first keeps the inverse accurate.
+    """
+    norms = np.sqrt(np.diag(gram))
+    norms[norms == 0] = 1.0
+    scaled = gram / np.outer(norms, norms)
+    try:
+        inv = np.linalg.inv(scaled)
+    except np.linalg.LinAlgError:
+        inv = None
+    if inv is None or not np.isfinite(inv).all() or np.abs(inv).max() > 1e12:
+        # (near) singular, collinear predictors: pseudo-inverse, as statsmodels
+        inv = np.linalg.pinv(scaled)
+    return inv / np.outer(norms, norms)
+
+
+def _as_clusters(clusters) -> Clusters:
+    if isinstance(clusters, Clusters):
+        return clusters
+    if isinstance(clusters, (tuple, list)):
+        return Clusters(*clusters)
+    return Clusters(clusters)
+
+
+def cluster_cov(
+    X: np.ndarray,
+    eps: np.ndarray,
+    clusters,
+    *,
+    xpxi: np.ndarray | None = None,
+    scale: float | None = None,
+) -> np.ndarray:
+    """Cluster-robust covariance of OLS coefficients on `X` with residuals `eps`.
+
+    `clusters` is a Clusters instance, one label array or a tuple of two.
+    Without `scale` the statsmodels CRV1 small-sample factor is applied per
+    clustering dimension; with `scale` the raw sandwich is multiplied by it
+    (PanelOLS uses nobs / df_resid). `xpxi` is (X'X)^-1 if already known.
+    """
+    clusters = _as_clusters(clusters)
+    if xpxi is None:
+        xpxi = gram_inv(X.T @ X)
+    scores = X * np.asarray(eps, dtype="float64").reshape(-1, 1)
+    meat = clusters.meat(scores, correct=scale is None)
+    cov = xpxi @ meat @ xpxi
+    if scale is not None:
+        cov *= scale
+    return (cov + cov.T) / 2
@@ -0,0 +1,97 @@
+#OLS DIAGNOSTICS: VIF, BREUSCH-PAGAN AND DURBIN-WATSON
+# statsmodels' variance_inflation_factor runs one auxiliary OLS per column.
+# All VIFs are the diagonal of one inverted correlation matrix instead
+# (VIF_j = [R^-1]_jj), and with the cross-products of a design already at hand
+# (PooledDesign.gram) no pass over the data is needed at all.
+# Breusch-Pagan (Koenker's studentized LM, as het_breuschpagan(robust=True))
+# and Durbin-Watson use the residuals the fit already computed:
+#
+#   diag = diagnostics(df_clean[predictors], ols.resid)
+#   print(diag.summary)
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from cluster_cov import gram_inv
+
+
+def _vif_from_cross(cross: np.ndarray) -> np.ndarray:
+    """VIFs from the centered cross-product matrix of the predictors."""
+    diag = np.diag(cross)
+    out = np.diag(gram_inv(cross)) * diag
+    out[diag <= 0] = np.nan
+    return out
+
+
+def vif_from_gram(gram: np.ndarray, cols, const: int) -> np.ndarray:
+    """VIFs of `cols` from a Gram matrix that also holds the constant column.
+
+    The cross-products are centered as G - s s' / n, with s the column sums
+    (row `const`) and n = G[const, const].
+    """
+    sums = gram[const, cols]
+    return _vif_from_cross(gram[np.ix_(cols, cols)] - np.outer(sums, sums) / gram[const, const])
+
+
+def vif(X: pd.DataFrame) -> pd.Series:
+    """Variance inflation factor of every column of `X` (no constant column),
+    as statsmodels' variance_inflation_factor on standardized columns."""
+    values = X.to_numpy(dtype="float64")
+    values = values - values.mean(axis=0)
+    return pd.Series(_vif_from_cross(values.T @ values),
+                     index=pd.Index(X.columns, name="Variable"), name="VIF")
+
+
+def breusch_pagan(resid, exog: np.ndarray, *, gram: np.ndarray | None = None) -> tuple[float, float, float, float]:
+    """(LM, LM p-value, F, F p-value) of the studentized Breusch-Pagan test.
+
+    `exog` includes the constant; `gram` is exog'exog if already known.
+    """
+    u = np.asarray(resid, dtype="float64") ** 2
+    exog = np.asarray(exog, dtype="float64")
+    n, k = exog.shape
+    gram = exog.T @ exog if gram is None else gram
+    xu = exog.T @ u
+    fitted_ss = float(xu @ gram_inv(gram) @ xu) - u.sum() ** 2 / n
+    r2 = fitted_ss / float(((u - u.mean()) ** 2).sum())
+    lm = n * r2
+    fvalue = (r2 / (k - 1)) / ((1 - r2) / (n - k))
+    return lm, stats.chi2.sf(lm, k - 1), fvalue, stats.f.sf(fvalue, k - 1, n - k)
+
+
+def durbin_watson(resid) -> float:
+    """Durbin-Watson statistic of the residuals in row order."""
+    e = np.asarray(resid, dtype="float64")
+    return float(np.diff(e) @ np.diff(e) / (e @ e))
+
+
+@dataclass
+class Diagnostics:
+    """VIFs and residual tests of one OLS model."""
+    vif: pd.Series
+    bp_lm: float
+    bp_pvalue: float
+    bp_fvalue: float
+    bp_f_pvalue: float
+    dw: float
+
+    @property
+    def summary(self) -> pd.Series:
+        """Compact table: one VIF per predictor, then BP and DW."""
+        return pd.concat([
+            self.vif.rename(lambda v: f"VIF {v}"),
+            pd.Series({"BP LM": self.bp_lm, "BP p-value": self.bp_pvalue, "Durbin-Watson": self.dw}),
+        ]).rename("value")
+
+
+def diagnostics(X: pd.DataFrame, resid) -> Diagnostics:
+    """VIF, Breusch-Pagan and Durbin-Watson for OLS residuals `resid` on `X`.
+
+    `X` holds the predictors without the constant (added for Breusch-Pagan).
+    """
+    exog = np.column_stack([np.ones(len(X)), X.to_numpy(dtype="float64")])
+    return Diagnostics(vif(X), *breusch_pagan(resid, exog), durbin_watson(resid))
@@ -0,0 +1,272 @@
+#REGISTRY OF FITTED MODELS FOR THE PROJECTION SCRIPTS
+# The projection scripts used to carry coefficients copied by hand from the
+# regression printouts. Here every projection model has an ID (MODELS) and the
+# regression stage saves its fit as a small versioned JSON artifact in
+# .cache/models/<id>.json:
+#   - params and covariance
+#   - scaler state (mean / scale per standardized column), if any
+#   - sample metadata: source, predictor set, N, countries, years
+#   - the gdp_ppp unit: params, cov and scaler are stored for gdp_ppp in
+#     billions of USD (the NGFS scenarios and final_wacc_macro_historical),
+#     whatever the unit of the panel the model was fitted on
+#   - a stamp (REGISTRY_VERSION, PANEL_VERSION, source CSV hash, model spec)
+# load_model refits and saves the model when its artifact is missing or the
+# stamp no longer matches, so refit-and-reproject is a single run:
+#
+#   model = load_model("fe_nopop")
+#   tmp["wacc_projection"] = model.predict(tmp)
+#
+# Command line:  python model_registry.py [fe_nopop ols_all ...] [--refit]
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from panel_builder import PANEL_VERSION, PREDICTOR_SETS, SOURCES, TARGET, _source_hash, load_panel, sample
+
+REGISTRY_VERSION = 2
+
+MODEL_DIR = Path(__file__).resolve().parent / ".cache" / "models"
+
+SCALED = ["gdp_ppp", "population", "inflation", "unemployment"]
+
+# USD per unit of gdp_ppp in each panel source, and in the projection inputs
+GDP_UNITS = {"historical": 1e9, "gdp2021": 1.0}
+PROJECTION_GDP_UNIT = 1e9
+
+# a projection frame whose median gdp_ppp lies this far outside the range of
+# the fit sample is taken to be in other units (e.g. USD instead of billions)
+GDP_UNIT_TOLERANCE = 1e4
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """How a registered model is fitted (see fit_model)."""
+    source: str                  # panel_builder source
+    estimator: str               # "ols" (pooled, ISO-clustered), "fe" (two-way) or "re"
+    predictor_set: str           # key of panel_builder.PREDICTOR_SETS, also the sample
+    standardize: tuple = ()      # columns z-scored on the full panel before fitting
+    year_dummies: bool = False   # explicit Year_ dummies (RE); not used in projections
+
+
+MODELS = {
+    # 1.FINAL_Reg: two-way FE without population, raw units -> 1.Final_Projection_FE_nostandnopop
+    "fe_nopop": ModelSpec("historical", "fe", "no_pop"),
+    # 1.FINAL_Reg: pooled OLS with population, raw units -> 2.Final_Projection_OLS_nostand
+    "ols_all": ModelSpec("historical", "ols", "all"),
+    # Regression_1_FEvsRE(pop): RE on standardized macro incl. population -> Projection_RE
+    "re_pop_std": ModelSpec("gdp2021", "re", "all", standardize=tuple(SCALED), year_dummies=True),
+}
+
+
+@dataclass
+class RegisteredModel:
+    """A fitted model as stored in the registry."""
+    model_id: str
+    spec: ModelSpec
+    params: pd.Series
+    cov: pd.DataFrame
+    scaler: dict = field(default_factory=dict)     # column -> (mean, scale)
+    sample: dict = field(default_factory=dict)
+    units: dict = field(default_factory=dict)      # column -> USD per unit expected in projection frames
+    stamp: dict = field(default_factory=dict)
+
+    @property
+    def terms(self) -> list[str]:
+        """Terms used in projections: everything but the constant and year dummies."""
+        return [t for t in self.params.index if t != "const" and not t.startswith("Year_")]
+
+    def check_units(self, frame: pd.DataFrame) -> None:
+        """Raise if the gdp_ppp of `frame` is not in the units of the model (billions)."""
+        bounds = self.sample.get("gdp_ppp_range")
+        if "gdp_ppp" not in self.terms or "gdp_ppp" not in frame or bounds is None:
+            return
+        level = np.nanmedian(frame["gdp_ppp"].to_numpy(dtype="float64"))
+        low, high = bounds[0] / GDP_UNIT_TOLERANCE, bounds[1] * GDP_UNIT_TOLERANCE
+        if not np.isnan(level) and not low <= level <= high:
+            raise ValueError(
+                f"gdp_ppp of the projection frame (median {level:.3g}) is not in the units of model "
+                f"'{self.model_id}' ({self.units['gdp_ppp']:g} USD, fit sample {bounds[0]:.3g} to {bounds[1]:.3g})"
+            )
+
+    def design(self, frame: pd.DataFrame) -> np.ndarray:
+        """Projection inputs of `frame` in `terms` order, standardized like the fit."""
+        self.check_units(frame)
+        X = frame[self.terms].to_numpy(dtype="float64", copy=True)
+        for j, term in enumerate(self.terms):
+            if term in self.scaler:
+                mean, scale = self.scaler[term]
+                X[:, j] = (X[:, j] - mean) / scale
+        return X
+
+    def predict(self, frame: pd.DataFrame) -> np.ndarray:
+        """Fitted WACC for the rows of `frame` (constant included if the model has one)."""
+        const = float(self.params.get("const", 0.0))
+        return const + self.design(frame) @ self.params[self.terms].to_numpy()
+
+    def to_json(self) -> dict:
+        return {
+            "model_id": self.model_id,
+            "spec": asdict(self.spec),
+            "stamp": self.stamp,
+            "terms": list(self.params.index),
+            "params": self.params.tolist(),
+            "cov": self.cov.to_numpy().tolist(),
+            "scaler": {c: list(v) for c, v in self.scaler.items()},
+            "sample": self.sample,
+            "units": self.units,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "RegisteredModel":
+        terms = data["terms"]
+        spec = data["spec"]
+        return cls(
+            model_id=data["model_id"],
+            spec=ModelSpec(**{**spec, "standardize": tuple(spec["standardize"])}),
+            params=pd.Series(data["params"], index=terms, name="parameter"),
+            cov=pd.DataFrame(data["cov"], index=terms, columns=terms),
+            scaler={c: tuple(v) for c, v in data["scaler"].items()},
+            sample=data["sample"],
+            units=data["units"],
+            stamp=data["stamp"],
+        )
+
+
+def _stamp(spec: ModelSpec) -> dict:
+    spec_hash = hashlib.sha256(json.dumps(asdict(spec), sort_keys=True).encode()).hexdigest()[:16]
+    return {"registry_version": REGISTRY_VERSION, "panel_version": PANEL_VERSION,
+            "source_sha256": _source_hash(SOURCES[spec.source]["path"]), "spec": spec_hash}
+
+
+def _artifact(model_id: str) -> Path:
+    return MODEL_DIR / f"{model_id}.json"
+
+
+def _params_cov(result) -> tuple[pd.Series, pd.DataFrame]:
+    """params / cov of a WithinResult, PooledResult, linearmodels or statsmodels fit."""
+    cov = result.cov if hasattr(result, "cov") and isinstance(result.cov, pd.DataFrame) else result.cov_params()
+    return result.params.astype("float64"), cov.astype("float64")
+
+
+def _to_projection_units(spec: ModelSpec, params: pd.Series, cov: pd.DataFrame, scaler: dict, data: pd.DataFrame):
+    """params, cov, scaler and sample range with gdp_ppp in PROJECTION_GDP_UNIT.
+
+    gdp_ppp in the fit units is `ratio` times gdp_ppp in projection units, so a
+    standardized column keeps its coefficient and gets mean / ratio, scale / ratio,
+    and a raw column gets its coefficient (and covariance) times `ratio`.
+    """
+    ratio = PROJECTION_GDP_UNIT / GDP_UNITS.get(spec.source, PROJECTION_GDP_UNIT)
+    scaler = dict(scaler)
+    gdp = data["gdp_ppp"].to_numpy(dtype="float64") if "gdp_ppp" in data else np.empty(0)
+    if "gdp_ppp" in scaler:
+        mean, scale = scaler["gdp_ppp"]
+        gdp = gdp * scale + mean                   # the sample is standardized, back to fit units
+        scaler["gdp_ppp"] = (mean / ratio, scale / ratio)
+    elif "gdp_ppp" in params.index:
+        params, cov = params.copy(), cov.copy()
+        params["gdp_ppp"] *= ratio
+        cov.loc["gdp_ppp"] *= ratio
+        cov["gdp_ppp"] *= ratio
+    gdp = gdp[~np.isnan(gdp)] / ratio
+    bounds = [float(gdp.min()), float(gdp.max())] if len(gdp) else None
+    return params, cov, scaler, bounds
+
+
+def save_model(model_id: str, result, data: pd.DataFrame, *, scaler=None) -> RegisteredModel:
+    """Store a fitted result under `model_id` (one of MODELS).
+
+    `data` is the estimation sample ((ISO, Year) index); `scaler` is the fitted
+    sklearn StandardScaler or {column: (mean, scale)} for spec.standardize.
+    Both are in the units of spec.source; gdp_ppp is converted to billions
+    (PROJECTION_GDP_UNIT) before the model is stored.
+    """
+    spec = MODELS[model_id]
+    params, cov = _params_cov(result)
+    if scaler is not None and not isinstance(scaler, dict):
+        scaler = dict(zip(spec.standardize, zip(scaler.mean_.tolist(), scaler.scale_.tolist())))
+    params, cov, scaler, gdp_range = _to_projection_units(spec, params, cov, scaler or {}, data)
+    years = data.index.get_level_values("Year")
+    model = RegisteredModel(
+        model_id=model_id,
+        spec=spec,
+        params=params,
+        cov=cov.loc[params.index, params.index],
+        scaler=scaler,
+        sample={"nobs": int(len(data)), "n_countries": int(data.index.get_level_values("ISO").nunique()),
+                "years": [int(years.min()), int(years.max())], "target": TARGET, "gdp_ppp_range": gdp_range},
+        units={"gdp_ppp": PROJECTION_GDP_UNIT},
+        stamp=_stamp(spec),
+    )
+    path = _artifact(model_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(model.to_json()))
+    print(f"💾 Model '{model_id}' saved -> {path.name}")
+    return model
+
+
+def fit_model(model_id: str) -> RegisteredModel:
+    """Fit `model_id` as its regression script does and save it."""
+    spec = MODELS[model_id]
+    panel = load_panel(spec.source)
+    scaler = None
+    if spec.standardize:
+        # StandardScaler on the full panel (population std, NaN ignored)
+        cols = list(spec.standardize)
+        mean, scale = panel[cols].mean(), panel[cols].std(ddof=0)
+        panel = panel.assign(**((panel[cols] - mean) / scale))
+        scaler = {c: (float(mean[c]), float(scale[c])) for c in cols}
+    data = sample(panel, spec.predictor_set)
+    predictors = PREDICTOR_SETS[spec.predictor_set]
+
+    if spec.estimator == "ols":
+        from spec_sweep import PooledDesign
+        result = PooledDesign(data, predictors).fit(predictors)
+    elif spec.estimator == "fe":
+        from within_estimator import fit_within
+        result = fit_within(data, predictors)
+    elif spec.estimator == "re":
+        from linearmodels.panel import RandomEffects
+        exog = data[predictors]
+        if spec.year_dummies:
+            years = pd.get_dummies(data.index.get_level_values("Year"), prefix="Year", drop_first=True)
+            years.index = data.index
+            exog = pd.concat([exog, years], axis=1)
+        result = RandomEffects(data[TARGET], exog).fit()
+    else:
+        raise ValueError(f"unknown estimator {spec.estimator!r}")
+    return save_model(model_id, result, data, scaler=scaler)
+
+
+def load_model(model_id: str, *, refit: bool = False) -> RegisteredModel:
+    """Registered model `model_id`; refitted if the artifact is missing or stale."""
+    if model_id not in MODELS:
+        raise KeyError(f"unknown model {model_id!r}, registered: {list(MODELS)}")
+    path = _artifact(model_id)
+    if path.exists() and not refit:
+        model = RegisteredModel.from_json(json.loads(path.read_text()))
+        if model.stamp == _stamp(MODELS[model_id]):
+            return model
+    return fit_model(model_id)
+
+
+def load_models(model_ids=None, *, refit: bool = False) -> dict[str, RegisteredModel]:
+    """{id: model} for `model_ids` (default: all registered models)."""
+    return {m: load_model(m, refit=refit) for m in (model_ids or MODELS)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit and save the registered projection models.")
+    parser.add_argument("models", nargs="*", default=list(MODELS), help=f"any of {list(MODELS)}")
+    parser.add_argument("--refit", action="store_true")
+    args = parser.parse_args()
+    for model_id, model in load_models(args.models, refit=args.refit).items():
+        print(f"\n✅ {model_id}: {model.spec.estimator.upper()} on {model.spec.source}, "
+              f"N = {model.sample['nobs']}")
+        print(model.params[model.terms].to_string())
@@ -0,0 +1,136 @@
+#SHARED PANEL DATASET FOR THE REGRESSION SCRIPTS
+# Builds the modelling matrix once from the cleaned CSVs of 1.Cleaning_and_Merges
+# and stores it as a versioned Parquet artifact in .cache/:
+#   - (ISO, Year) MultiIndex, sorted
+#   - technology dummies as int8, classified once per technology label
+#   - +/-inf replaced by NaN
+#   - one boolean complete-case column "cc_<set>" per predictor set in
+#     PREDICTOR_SETS (predictors + wacc all present)
+# The artifact is rebuilt when the source CSV or PANEL_VERSION changes, so every
+# script uses the same sample definition:
+#
+#   panel = load_panel("historical")
+#   df_clean = sample(panel, "all")
+#   PanelOLS(df_clean["wacc"], df_clean[PREDICTOR_SETS["all"]], ...)
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PANEL_VERSION = 1
+
+ROOT = Path(__file__).resolve().parents[1]
+CLEAN = ROOT / "1.Cleaning_and_Merges"
+CACHE_DIR = Path(__file__).resolve().parent / ".cache"
+
+SOURCES = {
+    # WDI macro + population + GDP PPP (billions), used by 1.FINAL_Reg
+    "historical": {"path": CLEAN / "final_wacc_macro_historical.csv", "rename": {}},
+    # same sample with GDP PPP in constant 2021 $, used by Regression_1/2/3
+    "gdp2021": {"path": CLEAN / "wacc_with_gdpppp2021.csv", "rename": {"GDP_PPP": "gdp_ppp"}},
+    # SSP urbanization / governance / rule of law, used by the SSPS regressions
+    "ssps": {"path": CLEAN / "final_merged_dataset.csv", "rename": {}},
+}
+
+# dummy column -> substring of the technology label (case-insensitive)
+TECH_DUMMIES = {"is_solar": "solar", "is_wind_onshore": "onshore", "is_wind_offshore": "offshore"}
+
+MACRO = ["gdp_ppp", "inflation", "unemployment"]
+PREDICTOR_SETS = {
+    "all": ["gdp_ppp", "population", "inflation", "unemployment", "is_solar", "is_wind_offshore"],
+    "no_pop": MACRO + ["is_solar", "is_wind_offshore"],
+    "macro": MACRO,
+    "ssps": ["Urban_Share", "Governance_Index", "Rule_of_Law", "is_solar", "is_wind_offshore"],
+}
+TARGET = "wacc"
+
+
+def _source_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _tech_dummies(technology: pd.Series) -> pd.DataFrame:
+    """int8 dummies from the technology labels, matched once per distinct label."""
+    codes, labels = pd.factorize(technology.str.lower())
+    out = {}
+    for col, key in TECH_DUMMIES.items():
+        flags = np.append([key in label for label in labels], False)   # last slot: missing
+        out[col] = flags[codes].astype("int8")
+    return pd.DataFrame(out, index=technology.index)
+
+
+def build_panel(source: str = "historical") -> pd.DataFrame:
+    """Modelling matrix for `source` (see SOURCES), not cached."""
+    spec = SOURCES[source]
+    df = pd.read_csv(spec["path"]).rename(columns=spec["rename"])
+
+    if "technology" in df.columns:
+        df[list(TECH_DUMMIES)] = _tech_dummies(df["technology"])
+    else:
+        df[list(TECH_DUMMIES)] = df[list(TECH_DUMMIES)].astype("int8")
+
+    numeric = df.select_dtypes("float").columns
+    df[numeric] = df[numeric].replace([np.inf, -np.inf], np.nan)
+
+    df = (df.dropna(subset=["ISO", "Year"])
+            .astype({"Year": "int64"})
+            .sort_values(["ISO", "Year"], kind="stable")
+            .set_index(["ISO", "Year"]))
+
+    for name, cols in PREDICTOR_SETS.items():
+        if all(c in df.columns for c in cols):
+            df[f"cc_{name}"] = df[cols + [TARGET]].notna().all(axis=1)
+    return df
+
+
+def _artifact(source: str) -> Path:
+    return CACHE_DIR / f"panel_{source}.parquet"
+
+
+def load_panel(source: str = "historical", *, rebuild: bool = False) -> pd.DataFrame:
+    """Cached panel for `source`; rebuilt if the CSV or PANEL_VERSION changed."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = _artifact(source)
+    stamp = {"version": PANEL_VERSION, "source_sha256": _source_hash(SOURCES[source]["path"])}
+
+    if path.exists() and not rebuild:
+        meta = pq.read_schema(path).metadata or {}
+        if json.loads(meta.get(b"panel_builder", b"{}")) == stamp:
+            return pd.read_parquet(path)
+
+    df = build_panel(source)
+    table = pa.Table.from_pandas(df)
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), b"panel_builder": json.dumps(stamp).encode()})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, path)
+    print(f"💾 Panel '{source}' built: {df.shape} -> {path.name}")
+    return df
+
+
+def sample(panel: pd.DataFrame, predictor_set: str) -> pd.DataFrame:
+    """Complete-case rows of `panel` for one of PREDICTOR_SETS."""
+    return panel[panel[f"cc_{predictor_set}"]]
+
+
+def entity(panel: pd.DataFrame) -> pd.Index:
+    """ISO of every row, e.g. as cluster groups for statsmodels."""
+    return panel.index.get_level_values("ISO")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the cached regression panels.")
+    parser.add_argument("sources", nargs="*", default=list(SOURCES))
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+    for src in args.sources:
+        panel = load_panel(src, rebuild=args.rebuild)
+        masks = {c[3:]: int(panel[c].sum()) for c in panel.columns if c.startswith("cc_")}
+        print(f"✅ {src}: {panel.shape}  complete cases: {masks}")
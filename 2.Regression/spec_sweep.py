@@ -0,0 +1,435 @@
+#SPECIFICATION SWEEP: PREDICTOR SETS x ESTIMATORS x SAMPLES
+# The regression scripts hand-code small grids (base_sets in Regression_2/3, the
+# models dict of the SSPS scripts, with / without population in 1.FINAL) and fit
+# every cell on its own. sweep() takes the whole grid at once:
+#   - samples: named row filters (technology, year window, any boolean mask)
+#   - inside a sample, predictor sets with the same complete cases share one
+#     design: the cross-products (X'X, X'y) of the union of their columns are
+#     computed once and every set is solved from them (pooled OLS and two-way
+#     FE, see within_estimator); RE is fitted per set with linearmodels
+#   - the designs are fitted in a process pool
+# and returns one tidy table (sample, spec, estimator, term, coef, std_err,
+# tstat, pvalue, r2, r2_type, nobs, dropped, error). Standard errors are
+# clustered by ISO as in the scripts (statsmodels cov_type="cluster" for OLS,
+# PanelOLS cluster_entity for FE); RE uses the linearmodels default.
+# Every requested cell is in the table: predictors left out of a cell (no
+# variation in the sample, absorbed by the FE) are listed in `dropped`, and a
+# cell that could not be fitted is one row with NaN estimates and the reason
+# in `error`.
+#
+#   grid = sweep(load_panel("gdp2021"), GRIDS["gdp2021"], ("ols", "fe"),
+#                samples={"all": None, **by_technology(), **year_windows([(2008, 2015)])})
+#
+# Command line:  python spec_sweep.py [--source gdp2021] [--by technology years]
+#                [--groups Region Income] [--diagnostics] [--jobs 4]
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from cluster_cov import Clusters, cluster_cov, gram_inv
+from diagnostics import breusch_pagan, durbin_watson, vif_from_gram
+from panel_builder import MACRO, PREDICTOR_SETS, TARGET, load_panel
+from within_estimator import WithinDesign, gram_solve
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "3.Projection"))
+from country_groups import ISO_TO_INCOME, ISO_TO_WB_REGION
+
+ESTIMATORS = ("ols", "fe", "re")
+
+# predictor grids of the regression scripts, by panel source
+GRIDS = {
+    # 1.FINAL_Reg: with / without population
+    "historical": {"all": PREDICTOR_SETS["all"], "no_pop": PREDICTOR_SETS["no_pop"]},
+    # Regression_2/3: reference technology, plus the population variant
+    "gdp2021": {
+        "Onshore_ref": MACRO + ["is_solar", "is_wind_offshore"],
+        "Solar_ref": MACRO + ["is_wind_onshore", "is_wind_offshore"],
+        "with_pop": PREDICTOR_SETS["all"],
+    },
+    # 2.FINAL_SSPS_REG: urbanization with / without governance or rule of law
+    "ssps": {
+        "Urban only": ["Urban_Share", "is_solar", "is_wind_offshore"],
+        "Urban + Governance": ["Urban_Share", "Governance_Index", "is_solar", "is_wind_offshore"],
+        "Urban + Rule of Law": ["Urban_Share", "Rule_of_Law", "is_solar", "is_wind_offshore"],
+    },
+}
+
+# technology dummy -> sample / group label used in the robustness checks
+TECHNOLOGIES = {"is_solar": "Solar_PV", "is_wind_onshore": "Wind_Onshore", "is_wind_offshore": "Wind_Offshore"}
+
+COLUMNS = ["sample", "spec", "estimator", "term", "coef", "std_err",
+           "tstat", "pvalue", "r2", "r2_type", "nobs", "dropped", "error"]
+R2_TYPES = {"ols": "adj", "fe": "within", "re": "overall"}
+# added to the OLS cells with diagnostics=True (see diagnostics.py)
+DIAGNOSTIC_COLUMNS = ["vif", "bp_lm", "bp_pvalue", "dw"]
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Sample filters
+# ───────────────────────────────────────────────────────────────────────────────
+
+def by_technology() -> dict:
+    """One sample per technology dummy, e.g. {"Solar_PV": <is_solar == 1>}."""
+    return {name: (lambda panel, col=col: panel[col] == 1) for col, name in TECHNOLOGIES.items()}
+
+
+def year_windows(windows) -> dict:
+    """One sample per (first, last) year window, both years included."""
+    def window(first, last):
+        def rule(panel):
+            years = panel.index.get_level_values("Year")
+            return (years >= first) & (years <= last)
+        return rule
+    return {f"{first}-{last}": window(first, last) for first, last in windows}
+
+
+def _select(panel: pd.DataFrame, rule) -> pd.DataFrame:
+    """Rows of `panel` kept by `rule` (None, callable mask or {column: values})."""
+    if rule is None:
+        return panel
+    if callable(rule):
+        return panel[rule(panel)]
+    mask = pd.Series(True, index=panel.index)
+    for col, values in rule.items():
+        col_values = panel[col] if col in panel.columns else panel.index.get_level_values(col)
+        values = values if isinstance(values, (list, tuple, set)) else [values]
+        mask &= np.asarray(pd.Series(col_values, index=panel.index).isin(values))
+    return panel[mask]
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Pooled OLS from shared cross-products
+# ───────────────────────────────────────────────────────────────────────────────
+
+@dataclass
+class PooledResult:
+    """Pooled OLS fit with ISO-clustered covariance (statsmodels conventions)."""
+    params: pd.Series
+    cov: pd.DataFrame
+    rsquared: float
+    rsquared_adj: float
+    nobs: int
+
+    @property
+    def std_errors(self) -> pd.Series:
+        return pd.Series(np.sqrt(np.diag(self.cov)), index=self.params.index, name="std_error")
+
+    @property
+    def pvalues(self) -> pd.Series:
+        # statsmodels reports normal p-values for cov_type="cluster"
+        return pd.Series(2 * stats.norm.sf(np.abs(self.params / self.std_errors)),
+                         index=self.params.index, name="pvalue")
+
+
+class PooledDesign:
+    """Constant + `columns` of one complete-case sample, with shared X'X / X'y.
+
+    SEs are clustered by ISO, or by ISO and year with `cluster_time=True`.
+    """
+
+    def __init__(self, panel: pd.DataFrame, columns, *, target: str = TARGET, cluster_time: bool = False):
+        self.columns = list(dict.fromkeys([target, "const", *columns]))
+        self.target = target
+        data = panel[[c for c in self.columns if c != "const"]].to_numpy(dtype="float64")
+        self._data = np.insert(data, 1, 1.0, axis=1)
+        levels = [panel.index.get_level_values(0)]
+        if cluster_time:
+            levels.append(panel.index.get_level_values(1))
+        self.clusters = Clusters(*levels)
+
+    @cached_property
+    def gram(self) -> np.ndarray:
+        return self._data.T @ self._data
+
+    def arrays(self, predictors) -> tuple[np.ndarray, np.ndarray]:
+        """(X with constant, y) for `predictors`."""
+        cols = [self.columns.index(c) for c in ["const", *predictors]]
+        return self._data[:, cols], self._data[:, 0]
+
+    def fit(self, predictors) -> PooledResult:
+        names = ["const", *predictors]
+        cols = [self.columns.index(c) for c in names]
+        X, y = self.arrays(predictors)
+        nobs, k = X.shape
+        params = gram_solve(self.gram, cols, 0)
+        if params is None:
+            # collinear predictors (e.g. a dummy that is all zero in a region):
+            # minimum-norm solution and df from the rank, like statsmodels' pinv
+            params, _, k, _ = np.linalg.lstsq(X, y, rcond=None)
+        eps = y - X @ params
+
+        cov = cluster_cov(X, eps, self.clusters, xpxi=gram_inv(X.T @ X))
+
+        centered = y - y.mean()
+        r2 = 1.0 - float(eps @ eps) / float(centered @ centered)
+        return PooledResult(
+            params=pd.Series(params, index=names),
+            cov=pd.DataFrame(cov, index=names, columns=names),
+            rsquared=r2,
+            rsquared_adj=1.0 - (1.0 - r2) * (nobs - 1) / (nobs - k),
+            nobs=nobs,
+        )
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Sweep
+# ───────────────────────────────────────────────────────────────────────────────
+
+def _tidy(sample, spec, estimator, params, std_err, pvalues, r2, r2_type, nobs, dropped="", **extra) -> pd.DataFrame:
+    return pd.DataFrame({
+        "sample": sample, "spec": spec, "estimator": estimator, "term": params.index,
+        "coef": params.to_numpy(), "std_err": std_err.to_numpy(),
+        "tstat": (params / std_err).to_numpy(), "pvalue": pvalues.to_numpy(),
+        "r2": r2, "r2_type": r2_type, "nobs": nobs, "dropped": dropped, "error": "", **extra,
+    })
+
+
+def _failed(sample, spec, estimator, nobs, dropped, error) -> pd.DataFrame:
+    """The row kept for a cell that could not be fitted: NaN estimates, reason in `error`."""
+    row = dict.fromkeys(COLUMNS, np.nan)
+    row |= {"sample": sample, "spec": spec, "estimator": estimator, "r2_type": R2_TYPES[estimator],
+            "nobs": nobs, "dropped": dropped, "error": error}
+    return pd.DataFrame([row])
+
+
+def _ols_diagnostics(design: PooledDesign, preds, params: pd.Series) -> dict:
+    """VIF per term and BP / DW of one OLS cell, from the design's cross-products."""
+    cols = [design.columns.index(c) for c in ["const", *preds]]
+    X, y = design.arrays(preds)
+    eps = y - X @ params.to_numpy()
+    bp_lm, bp_pvalue, _, _ = breusch_pagan(eps, X, gram=design.gram[np.ix_(cols, cols)])
+    vifs = np.r_[np.nan, vif_from_gram(design.gram, cols[1:], cols[0])]
+    return {"vif": vifs, "bp_lm": bp_lm, "bp_pvalue": bp_pvalue, "dw": durbin_watson(eps)}
+
+
+def _fit_block(task) -> list[pd.DataFrame]:
+    """All predictor sets of one (sample, complete-case block) for `estimators`.
+
+    Cells of a skipped block, and cells whose fit fails, come back as `_failed` rows.
+    """
+    sample_name, frame, sets, dropped, estimators, target, with_diagnostics, skipped = task
+    union = list(dict.fromkeys(c for preds in sets.values() for c in preds))
+    out = []
+    for estimator in estimators:
+        design = None
+        for spec, preds in sets.items():
+            if skipped:
+                out.append(_failed(sample_name, spec, estimator, len(frame), ", ".join(dropped[spec]), skipped))
+                continue
+            extra = {}
+            try:
+                if estimator == "ols":
+                    design = design if design is not None else PooledDesign(frame, union, target=target)
+                    r = design.fit(preds)
+                    extra = _ols_diagnostics(design, preds, r.params) if with_diagnostics else {}
+                    cell = (r.params, r.std_errors, r.pvalues, r.rsquared_adj)
+                elif estimator == "fe":
+                    design = design if design is not None else WithinDesign(frame, union, target=target)
+                    r = design.fit(preds)
+                    cell = (r.params, r.std_errors, r.pvalues, r.rsquared_within)
+                else:
+                    from linearmodels.panel import RandomEffects
+                    r = RandomEffects(frame[target], frame[preds], check_rank=False).fit()
+                    cell = (r.params, r.std_errors, r.pvalues, r.rsquared)
+            except (np.linalg.LinAlgError, ValueError, ZeroDivisionError) as e:
+                print(f"⚠️ {sample_name} / {spec} / {estimator}: not estimable ({e}) — kept as an error row.")
+                out.append(_failed(sample_name, spec, estimator, len(frame), ", ".join(dropped[spec]), str(e)))
+                continue
+            # constant in the sample (dropped in _tasks) or absorbed by the effects
+            left_out = dropped[spec] + [c for c in preds if c not in r.params.index]
+            out.append(_tidy(sample_name, spec, estimator, *cell, R2_TYPES[estimator], r.nobs,
+                             dropped=", ".join(left_out), **extra))
+    return out
+
+
+def _tasks(frames, predictor_sets, estimators, target, min_obs, with_diagnostics=False):
+    """(sample, block, sets, dropped, estimators, target, diagnostics, skipped) work items for `_fit_block`."""
+    unknown = [e for e in estimators if e not in ESTIMATORS]
+    if unknown:
+        raise ValueError(f"unknown estimator {unknown[0]!r}, use one of {ESTIMATORS}")
+    for sample_name, sub in frames:
+        # predictor sets with identical complete cases share one design
+        blocks: dict[bytes, tuple[np.ndarray, dict]] = {}
+        dropped = {}
+        for spec, preds in predictor_sets.items():
+            mask = sub[list(preds) + [target]].notna().all(axis=1).to_numpy()
+            # predictors without variation in the sample (the technology dummies
+            # of a single-technology sample) are left out of the specification
+            kept = [c for c in preds if sub.loc[mask, c].nunique() > 1]
+            dropped[spec] = [c for c in preds if c not in kept]
+            blocks.setdefault(mask.tobytes(), (mask, {}))[1][spec] = kept
+        for mask, sets in blocks.values():
+            skipped = ""
+            if mask.sum() < min_obs:
+                which = f" ({', '.join(sets)})" if len(blocks) > 1 else ""
+                print(f"⚠️ Not enough data for {sample_name}{which} — kept as error rows.")
+                skipped = f"{mask.sum()} complete cases, fewer than min_obs = {min_obs}"
+            yield (sample_name, (sub if mask.all() else sub[mask]), sets, {spec: dropped[spec] for spec in sets},
+                   tuple(estimators), target, with_diagnostics, skipped)
+
+
+def _run(tasks, max_workers, executor) -> pd.DataFrame:
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        blocks = list(map(_fit_block, tasks))
+    else:
+        pool_cls = ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor
+        with pool_cls(max_workers=min(workers, len(tasks))) as pool:
+            blocks = list(pool.map(_fit_block, tasks))
+    frames = [frame for block in blocks for frame in block]
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    grid = pd.concat(frames, ignore_index=True)
+    return grid[COLUMNS + [c for c in DIAGNOSTIC_COLUMNS if c in grid.columns]]
+
+
+def sweep(
+    panel: pd.DataFrame,
+    predictor_sets: dict,
+    estimators=("ols", "fe"),
+    samples: dict | None = None,
+    *,
+    target: str = TARGET,
+    min_obs: int = 20,
+    max_workers: int | None = None,
+    executor: str = "process",
+    diagnostics: bool = False,
+) -> pd.DataFrame:
+    """Fit every predictor set x estimator x sample and return the tidy table.
+
+    `panel` is a panel_builder panel ((ISO, Year) index). `samples` maps a name
+    to None (all rows), a callable returning a row mask, or {column: values};
+    samples with fewer than `min_obs` complete cases are not fitted (one error
+    row per cell). With
+    `max_workers=1` everything runs in this process; `executor="thread"` uses
+    threads instead of processes (for flat scripts, which a spawned process
+    would re-run on import). `diagnostics=True` adds the VIF of every term and
+    the Breusch-Pagan / Durbin-Watson statistics to the OLS cells.
+    """
+    samples = {"all": None} if samples is None else samples
+    frames = ((name, _select(panel, rule)) for name, rule in samples.items())
+    tasks = list(_tasks(frames, predictor_sets, estimators, target, min_obs, diagnostics))
+    return _run(tasks, max_workers, executor)
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Grouped robustness (one sample per technology / region / income group)
+# ───────────────────────────────────────────────────────────────────────────────
+
+def technology_groups(panel: pd.DataFrame) -> pd.Series:
+    """Technology label of every row, from the int8 dummies."""
+    names = list(TECHNOLOGIES.values())
+    codes = np.full(len(panel), -1)
+    for i, col in enumerate(TECHNOLOGIES):
+        codes[panel[col].to_numpy() == 1] = i
+    return pd.Series(pd.Categorical.from_codes(codes, categories=names), index=panel.index)
+
+
+def _iso_groups(mapping: dict):
+    def groups(panel: pd.DataFrame) -> pd.Series:
+        iso = panel.index.get_level_values("ISO")
+        return pd.Series(iso.map(mapping), index=panel.index)
+    return groups
+
+
+GROUPINGS = {
+    "Technology": technology_groups,
+    "Region": _iso_groups(ISO_TO_WB_REGION),
+    "Income": _iso_groups(ISO_TO_INCOME),
+}
+
+
+def sweep_groups(
+    panel: pd.DataFrame,
+    predictor_sets: dict,
+    groups="Region",
+    estimators=("ols", "fe"),
+    *,
+    target: str = TARGET,
+    min_obs: int = 20,
+    max_workers: int | None = None,
+    executor: str = "process",
+    diagnostics: bool = False,
+) -> pd.DataFrame:
+    """`sweep` with one sample per group, e.g. per region (column "sample").
+
+    `groups` is a name in GROUPINGS or a row-aligned Series of labels. The
+    panel is sorted by group once and every group is a contiguous slice of it;
+    groups come out in category order (Technology) or sorted. Rows without a
+    group (ISO missing from the map) are left out.
+    """
+    labels = GROUPINGS[groups](panel) if isinstance(groups, str) else groups
+    codes, names = pd.factorize(labels, sort=True)
+    if isinstance(labels.dtype, pd.CategoricalDtype):
+        codes, names = labels.cat.codes.to_numpy(), labels.cat.categories
+
+    order = np.argsort(codes, kind="stable")
+    ordered = panel.take(order)
+    bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+    frames = ((names[g], ordered.iloc[bounds[g]:bounds[g + 1]]) for g in range(len(names)))
+    tasks = list(_tasks(frames, predictor_sets, estimators, target, min_obs, diagnostics))
+    return _run(tasks, max_workers, executor)
+
+
+def r2_table(grid: pd.DataFrame, group_type: str) -> pd.DataFrame:
+    """One row per group and spec with the R² of each estimator, in the layout
+    of robustness_check_results.csv (Group, Type, Spec, OLS_R2, FE_R2, ...).
+    Cells that were not fitted (error rows) are left out."""
+    cells = grid[grid["error"].eq("")].drop_duplicates(["sample", "spec", "estimator"])
+    wide = cells.pivot(index=["sample", "spec"], columns="estimator", values="r2")
+    wide = wide.reindex(pd.MultiIndex.from_frame(cells[["sample", "spec"]]).unique())
+    wide = wide[[e for e in ESTIMATORS if e in wide.columns]]
+    wide.columns = [f"{e.upper()}_R2" for e in wide.columns]
+    out = wide.reset_index().rename(columns={"sample": "Group", "spec": "Spec"})
+    out.insert(1, "Type", group_type)
+    return out
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Sweep predictor sets x estimators x samples.")
+    parser.add_argument("--source", default="gdp2021", choices=list(GRIDS))
+    parser.add_argument("--estimators", nargs="+", default=list(ESTIMATORS), choices=ESTIMATORS)
+    parser.add_argument("--by", nargs="*", default=["technology", "years"], choices=["technology", "years"])
+    parser.add_argument("--windows", nargs="+", default=["2008-2015", "2016-2023"],
+                        help="year windows for --by years, as first-last")
+    parser.add_argument("--groups", nargs="*", default=[], choices=list(GROUPINGS),
+                        help="also fit one sample per group of these groupings")
+    parser.add_argument("--diagnostics", action="store_true", help="add VIF, Breusch-Pagan and Durbin-Watson to the OLS cells")
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--out", default=None, help="CSV path (default: sweep_results_<source>.csv)")
+    args = parser.parse_args(argv)
+
+    samples = {"all": None}
+    if "technology" in args.by:
+        samples |= by_technology()
+    if "years" in args.by:
+        samples |= year_windows(tuple(map(int, w.split("-"))) for w in args.windows)
+
+    panel = load_panel(args.source)
+    grid = sweep(panel, GRIDS[args.source], args.estimators, samples,
+                 max_workers=args.jobs, diagnostics=args.diagnostics)
+    for grouping in args.groups:
+        by_group = sweep_groups(panel, GRIDS[args.source], grouping, args.estimators,
+                                max_workers=args.jobs, diagnostics=args.diagnostics)
+        grid = pd.concat([grid, by_group.assign(sample=grouping + ": " + by_group["sample"])],
+                         ignore_index=True)
+
+    out = Path(args.out or Path(__file__).resolve().parent / f"sweep_results_{args.source}.csv")
+    grid.to_csv(out, index=False)
+    cells = grid.drop_duplicates(["sample", "spec", "estimator"])
+    failed = int(cells["error"].ne("").sum())
+    print(f"✅ {len(cells) - failed} specifications fitted, {failed} not estimable -> {out.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#TWO-WAY FIXED EFFECTS (WITHIN) ESTIMATOR
+# PanelOLS(entity_effects=True, time_effects=True) demeans the data again for
+# every fit. The robustness loops fit several predictor subsets on the same
+# sample (with / without population, Onshore_ref vs Solar_ref dummies), so here
+# the sample is demeaned once:
+#   - ISO and Year are factorized once into integer codes
+#   - all candidate columns are swept by alternating projections (subtract the
+#     entity means, then the year means, until nothing changes); group means
+#     come from np.bincount on the codes
+# and every fit is solved from the cross-products (Gram matrix) of that
+# demeaned matrix, computed once per sample.
+# Coefficients, within R² and the entity-clustered covariance follow the
+# PanelOLS conventions (fit(cov_type="clustered", cluster_entity=True)):
+#
+#   design = WithinDesign(sample(panel, "all"), PREDICTOR_SETS["all"])
+#   fe_all = design.fit(PREDICTOR_SETS["all"])
+#   fe_nopop = design.fit(PREDICTOR_SETS["no_pop"])
+from __future__ import annotations
+
+import warnings
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from cluster_cov import Clusters, cluster_cov, gram_inv
+from panel_builder import TARGET
+
+
+def _group_means(values: np.ndarray, codes: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Per-group column means of `values` (n x k) broadcast back to the rows."""
+    sums = np.column_stack([np.bincount(codes, weights=col, minlength=len(counts))
+                            for col in values.T])
+    return (sums / counts[:, None])[codes]
+
+
+def gram_solve(gram: np.ndarray, cols, target: int, max_cond: float = 1e10) -> np.ndarray | None:
+    """Least-squares coefficients of column `target` on `cols` from the Gram matrix.
+
+    The normal equations are solved after scaling every column to unit norm;
+    None if they are too ill-conditioned, so the caller can fall back to lstsq
+    on the data.
+    """
+    A = gram[np.ix_(cols, cols)]
+    norms = np.sqrt(np.diag(A))
+    if (norms == 0).any():
+        return None
+    A = A / np.outer(norms, norms)
+    if np.linalg.cond(A) > max_cond:
+        return None
+    return np.linalg.solve(A, gram[cols, target] / norms) / norms
+
+
+@dataclass
+class WithinResult:
+    """Two-way FE fit, laid out like the PanelOLS result attributes."""
+    params: pd.Series
+    cov: pd.DataFrame
+    rsquared_within: float
+    nobs: int
+    df_resid: int
+    resid: pd.Series
+
+    @property
+    def std_errors(self) -> pd.Series:
+        return pd.Series(np.sqrt(np.diag(self.cov)), index=self.params.index, name="std_error")
+
+    @property
+    def tstats(self) -> pd.Series:
+        return (self.params / self.std_errors).rename("tstat")
+
+    @property
+    def pvalues(self) -> pd.Series:
+        return pd.Series(2 * stats.t.sf(np.abs(self.tstats), self.df_resid),
+                         index=self.params.index, name="pvalue")
+
+    @property
+    def summary(self) -> pd.DataFrame:
+        """Coefficient table (parameter, std. error, t-stat, p-value)."""
+        return pd.concat([self.params, self.std_errors, self.tstats, self.pvalues], axis=1)
+
+
+class WithinDesign:
+    """Two-way demeaned copy of `columns` (and the target) for one sample.
+
+    `panel` has an (entity, time) MultiIndex as built by panel_builder and no
+    missing values in `columns` / `target`. Columns of the sample that are not
+    passed here cannot be used in `fit`. `cluster_time=True` clusters the SEs
+    by entity and year, like PanelOLS cluster_entity + cluster_time.
+    """
+
+    def __init__(
+        self,
+        panel: pd.DataFrame,
+        columns,
+        *,
+        target: str = TARGET,
+        cluster_time: bool = False,
+        tol: float = 1e-12,
+        max_iter: int = 10_000,
+    ):
+        self.columns = list(dict.fromkeys([target, *columns]))
+        self.target = target
+        self.index = panel.index
+
+        raw = panel[self.columns].to_numpy(dtype="float64")
+        if np.isnan(raw).any():
+            raise ValueError("WithinDesign needs complete cases, use panel_builder.sample first")
+
+        self.entity_codes, entities = pd.factorize(panel.index.get_level_values(0))
+        time_codes, periods = pd.factorize(panel.index.get_level_values(1))
+        self.n_entity, self.n_time = len(entities), len(periods)
+        # SEs clustered by entity, or by entity and year (cluster_time=True)
+        self.clusters = Clusters(self.entity_codes, *([time_codes] if cluster_time else []))
+        entity_counts = np.bincount(self.entity_codes).astype("float64")
+        time_counts = np.bincount(time_codes).astype("float64")
+
+        # entity-only demeaning, used for the within R² as in PanelOLS
+        self._entity_demeaned = raw - _group_means(raw, self.entity_codes, entity_counts)
+
+        demeaned = self._entity_demeaned.copy()
+        scale = np.maximum(np.abs(raw).max(axis=0), 1.0)
+        for self.iterations in range(1, max_iter + 1):
+            step = _group_means(demeaned, time_codes, time_counts)
+            demeaned -= step
+            step_e = _group_means(demeaned, self.entity_codes, entity_counts)
+            demeaned -= step_e
+            change = np.maximum(np.abs(step).max(axis=0), np.abs(step_e).max(axis=0))
+            if (change <= tol * scale).all():
+                break
+        else:
+            warnings.warn(f"two-way demeaning did not converge in {max_iter} iterations")
+        self._demeaned = demeaned
+        self._raw = raw
+
+    @cached_property
+    def gram(self) -> np.ndarray:
+        """Cross-products of the demeaned columns, shared by every fit."""
+        return self._demeaned.T @ self._demeaned
+
+    def _cols(self, names) -> list[int]:
+        missing = [c for c in names if c not in self.columns]
+        if missing:
+            raise KeyError(f"{missing} not in the demeaned design, pass them to WithinDesign")
+        return [self.columns.index(c) for c in names]
+
+    def arrays(self, predictors, *, target: str | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Demeaned (X, y) for `predictors`, e.g. for the wild bootstrap."""
+        return (self._demeaned[:, self._cols(list(predictors))],
+                self._demeaned[:, self._cols([target or self.target])[0]])
+
+    def fit(self, predictors, *, target: str | None = None) -> WithinResult:
+        """Two-way FE regression of `target` on `predictors`, entity-clustered SEs.
+
+        Predictors absorbed by the effects (e.g. a technology dummy in a single-
+        technology subset) are dropped with a warning, like drop_absorbed=True.
+        """
+        target = target or self.target
+        predictors = list(predictors)
+        X = self._demeaned[:, self._cols(predictors)]
+        y = self._demeaned[:, self._cols([target])[0]]
+
+        raw_ss = (self._raw[:, self._cols(predictors)] ** 2).sum(axis=0)
+        keep = (X ** 2).sum(axis=0) > 1e-8 * np.maximum(raw_ss, 1e-300)
+        if not keep.all():
+            dropped = [p for p, k in zip(predictors, keep) if not k]
+            warnings.warn(f"absorbed by the fixed effects, dropped: {', '.join(dropped)}")
+            predictors = [p for p, k in zip(predictors, keep) if k]
+            X = X[:, keep]
+            if not predictors:
+                raise ValueError("All predictors are absorbed by the fixed effects, nothing to estimate.")
+
+        params = gram_solve(self.gram, self._cols(predictors), self._cols([target])[0])
+        if params is None:
+            params = np.linalg.lstsq(X, y, rcond=None)[0]
+        eps = y - X @ params
+
+        # PanelOLS: clustered covariance with debiased=True and the effects
+        # counted in the small-sample correction, n / (n - effects - k)
+        nobs, k = X.shape
+        n_effects = self.n_entity + self.n_time - 1
+        df_resid = nobs - k - n_effects
+        cov = cluster_cov(X, eps, self.clusters, xpxi=gram_inv(X.T @ X), scale=nobs / df_resid)
+
+        wy = self._entity_demeaned[:, self._cols([target])[0]]
+        wx = self._entity_demeaned[:, self._cols(predictors)]
+        weps = wy - wx @ params
+        total_ss = float(wy @ wy)
+        r2w = 1.0 - float(weps @ weps) / total_ss if total_ss > 0.0 else 0.0
+
+        return WithinResult(
+            params=pd.Series(params, index=predictors, name="parameter"),
+            cov=pd.DataFrame(cov, index=predictors, columns=predictors),
+            rsquared_within=r2w,
+            nobs=nobs,
+            df_resid=df_resid,
+            resid=pd.Series(eps, index=self.index, name="residual"),
+        )
+
+    def fit_many(self, predictor_sets: dict, *, target: str | None = None) -> dict:
+        """`fit` for every {name: predictors} on the same demeaned matrix."""
+        return {name: self.fit(preds, target=target) for name, preds in predictor_sets.items()}
+
+
+def fit_within(panel: pd.DataFrame, predictors, *, target: str = TARGET, **kwargs) -> WithinResult:
+    """One-off two-way FE fit of `target` on `predictors`."""
+    return WithinDesign(panel, predictors, target=target, **kwargs).fit(predictors)
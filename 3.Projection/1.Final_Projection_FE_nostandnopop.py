@@ -1,17 +1,24 @@
 # ================================================================
 # 0. Imports
 # ================================================================
+import sys
+from pathlib import Path
+
 import pandas as pd
 
+projection_dir = Path(__file__).resolve().parent
+cleaning_dir = projection_dir.parent / "1.Cleaning_and_Merges"
+sys.path.append(str(projection_dir.parent / "2.Regression"))
+sys.path.append(str(cleaning_dir))
+from annual_interp import interpolate_annual
+from model_registry import load_model
+from projection_engine import project_bands, project_one
+
 # ---------------------------------------------------------------
 # 1. File paths
 # ---------------------------------------------------------------
-wacc_path = (
-    "/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/1.Cleaning_and_Merges/final_wacc_macro_historical.csv"
-)
-macro_path = (
-    "/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/1.Cleaning_and_Merges/ngfs_final_merge.csv"
-)
+wacc_path = cleaning_dir / "final_wacc_macro_historical.csv"
+macro_path = cleaning_dir / "ngfs_final_merge.csv"
 
 # ---------------------------------------------------------------
 # 2. Load data and convert units
@@ -26,60 +33,38 @@ macro_df['population'] = macro_df['population'] * 1_000_000
 wacc_df = wacc_df.rename(columns={"GDP_PPP": "gdp_ppp"})
 macro_df = macro_df.rename(columns={"GDP_PPP": "gdp_ppp"})
 
+# True: project every year, NGFS inputs interpolated between the 5-year
+# steps (GDP PPP log-linear, the rest linear; see annual_interp.py)
+annual_steps = False
+if annual_steps:
+    macro_df = interpolate_annual(macro_df)
+
 print("WACC columns :", wacc_df.columns.tolist())
 print("Macro columns:", macro_df.columns.tolist())
 
 # ---------------------------------------------------------------
-# 3. FE coefficients (no constant, no population)
+# 3. FE model (no constant, no population), fitted by 1.FINAL_Reg and
+#    loaded from the model registry (refitted there if the data changed)
 # ---------------------------------------------------------------
-coef = {
-    "gdp_ppp": -2.943e-06,
-    "inflation": 0.0024,
-    "unemployment": 0.0038,
-    "is_solar": 0.0005,
-    "is_wind_offshore": 0.0154,
-}
+model = load_model("fe_nopop")
 
-# ---------------------------------------------------------------
-# 4. Technology dummy map
-# ---------------------------------------------------------------
-tech_map = {
-    "Wind_Onshore": {"is_solar": 0, "is_wind_offshore": 0},
-    "Solar_PV":     {"is_solar": 1, "is_wind_offshore": 0},
-    "Wind_Offshore": {"is_solar": 0, "is_wind_offshore": 1},
-}
+# > 0: add wacc_p5 / wacc_p50 / wacc_p95 bands from this many coefficient
+# draws of the fitted covariance (projection_engine.project_bands)
+uncertainty_draws = 0
 
 # ---------------------------------------------------------------
-# 5. Generate projections
+# 4-5. Generate projections for all technologies in one matrix product
+#      (technology dummies: projection_engine.TECHNOLOGIES)
 # ---------------------------------------------------------------
-proj_frames = []
-
-for tech, dummies in tech_map.items():
-    tmp = macro_df.copy()
-    tmp["Technology"] = tech
-    tmp["is_solar"] = dummies["is_solar"]
-    tmp["is_wind_offshore"] = dummies["is_wind_offshore"]
-
-    tmp["wacc_projection"] = (
-        coef["gdp_ppp"] * tmp["gdp_ppp"]
-        + coef["inflation"] * tmp["inflation"]
-        + coef["unemployment"] * tmp["unemployment"]
-        + coef["is_solar"] * tmp["is_solar"]
-        + coef["is_wind_offshore"] * tmp["is_wind_offshore"]
-    )
-
-    proj_frames.append(
-        tmp[["Scenario", "ISO", "Year", "Technology", "wacc_projection"]]
-    )
-
-proj_df = pd.concat(proj_frames, ignore_index=True)
+if uncertainty_draws:
+    proj_df = project_bands(macro_df, model, draws=uncertainty_draws)
+else:
+    proj_df = project_one(macro_df, model)
 
 # ---------------------------------------------------------------
 # 6. Save final output
 # ---------------------------------------------------------------
-out_path = (
-    "/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/3.Projection/wacc_projection_FE_nopop.csv"
-)
+out_path = projection_dir / "wacc_projection_FE_nopop.csv"
 proj_df.to_csv(out_path, index=False)
 
 print("\n✅ FE projection (without population) written to:")
@@ -1,20 +1,21 @@
 # ================================================================
 # 0. Imports
 # ================================================================
+from pathlib import Path
+
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 
+from projection_engine import project_one
+
+projection_dir = Path(__file__).resolve().parent
+cleaning_dir = projection_dir.parent / "1.Cleaning_and_Merges"
+
 # ---------------------------------------------------------------
 # 1. File paths
 # ---------------------------------------------------------------
-wacc_path = (
-    "/Users/valentinadlc/Library/Caches/JetBrains/PyCharm2025.1/demo/"
-    "PyCharmLearningProject/WACC Thesis/final_wacc_macro_historical.csv"
-)
-macro_path = (
-    "/Users/valentinadlc/Library/Caches/JetBrains/PyCharm2025.1/demo/"
-    "PyCharmLearningProject/WACC Thesis/ngfs_final_merge.csv"
-)
+wacc_path = cleaning_dir / "final_wacc_macro_historical.csv"
+macro_path = cleaning_dir / "ngfs_final_merge.csv"
 
 # ---------------------------------------------------------------
 # 2. Load data and standardize units
@@ -67,43 +68,15 @@ coef = {
 }
 
 # ---------------------------------------------------------------
-# 7. Generate projections by technology type
+# 7. Generate projections for all technologies in one matrix product
+#    (technology dummies: projection_engine.TECHNOLOGIES)
 # ---------------------------------------------------------------
-tech_map = {
-    "Wind_Onshore": {"is_solar": 0, "is_wind_offshore": 0},
-    "Solar_PV":     {"is_solar": 1, "is_wind_offshore": 0},
-    "Wind_Offshore": {"is_solar": 0, "is_wind_offshore": 1},
-}
-
-proj_frames = []
-for tech, dums in tech_map.items():
-    tmp = macro_std.copy()
-    tmp["Technology"] = tech
-    tmp["is_solar"] = dums["is_solar"]
-    tmp["is_wind_offshore"] = dums["is_wind_offshore"]
-
-    tmp["wacc_projection"] = (
-        coef["gdp_ppp"] * tmp["gdp_ppp"]
-        + coef["population"] * tmp["population"]
-        + coef["inflation"] * tmp["inflation"]
-        + coef["unemployment"] * tmp["unemployment"]
-        + coef["is_solar"] * tmp["is_solar"]
-        + coef["is_wind_offshore"] * tmp["is_wind_offshore"]
-    )
-
-    proj_frames.append(
-        tmp[["Scenario", "ISO", "Year", "Technology", "wacc_projection"]]
-    )
-
-proj_df = pd.concat(proj_frames, ignore_index=True)
+proj_df = project_one(macro_std, coef)
 
 # ---------------------------------------------------------------
 # 8. Save final projection result
 # ---------------------------------------------------------------
-out_path = (
-    "/Users/valentinadlc/Library/Caches/JetBrains/PyCharm2025.1/"
-    "demo/PyCharmLearningProject/WACC Thesis/wacc_projection_FE.csv"
-)
+out_path = projection_dir / "wacc_projection_FE.csv"
 proj_df.to_csv(out_path, index=False)
 
 print("\n✅ Fixed Effects Projections written to:", out_path)
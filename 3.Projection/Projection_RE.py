@@ -1,20 +1,24 @@
 # ================================================================
 # 0. Imports
 # ================================================================
+import sys
+from pathlib import Path
+
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
+
+projection_dir = Path(__file__).resolve().parent
+cleaning_dir = projection_dir.parent / "1.Cleaning_and_Merges"
+sys.path.append(str(projection_dir.parent / "2.Regression"))
+sys.path.append(str(cleaning_dir))
+from annual_interp import interpolate_annual
+from model_registry import load_model
+from projection_engine import project_bands, project_one
 
 # ---------------------------------------------------------------
 # 1. File paths
 # ---------------------------------------------------------------
-wacc_path = (
-    "/Users/valentinadlc/Library/Caches/JetBrains/PyCharm2025.1/demo/"
-    "PyCharmLearningProject/WACC Thesis/final_wacc_macro_historical.csv"
-)
-macro_path = (
-    "/Users/valentinadlc/Library/Caches/JetBrains/PyCharm2025.1/demo/"
-    "PyCharmLearningProject/WACC Thesis/ngfs_final_merge.csv"
-)
+wacc_path = cleaning_dir / "final_wacc_macro_historical.csv"
+macro_path = cleaning_dir / "ngfs_final_merge.csv"
 
 # ---------------------------------------------------------------
 # 2. Load data and standardize units
@@ -29,6 +33,12 @@ macro_df['population'] = macro_df['population'] * 1_000_000
 wacc_df = wacc_df.rename(columns={"GDP_PPP": "gdp_ppp"})
 macro_df = macro_df.rename(columns={"GDP_PPP": "gdp_ppp"})
 
+# True: project every year, NGFS inputs interpolated between the 5-year
+# steps (GDP PPP log-linear, the rest linear; see annual_interp.py)
+annual_steps = False
+if annual_steps:
+    macro_df = interpolate_annual(macro_df)
+
 # ---------------------------------------------------------------
 # 3. Add technology dummies to historical WACC data
 # ---------------------------------------------------------------
@@ -36,65 +46,31 @@ wacc_df["is_solar"] = wacc_df["technology"].str.contains("solar", case=False, na
 wacc_df["is_wind_offshore"] = wacc_df["technology"].str.contains("offshore", case=False, na=False).astype(int)
 
 # ---------------------------------------------------------------
-# 4. Fit scaler on macroeconomic variables (including population)
+# 4-5. Random Effects model (Regression_1_FEvsRE(pop)) from the model
+#      registry; it carries the scaler of the regression, so the scenario
+#      data is standardized with the same means / SDs inside predict. The
+#      model is fitted on gdp_ppp in USD (gdp2021 panel); the registry stores
+#      its gdp_ppp scaler in billions, the unit of ngfs_final_merge.csv
 # ---------------------------------------------------------------
-cont_vars = ["gdp_ppp", "inflation", "unemployment", "population"]
-scaler = StandardScaler().fit(wacc_df[cont_vars])
+model = load_model("re_pop_std")
 
-# Apply scaling to macro-scenario data
-macro_std = macro_df.copy()
-macro_std[cont_vars] = scaler.transform(macro_std[cont_vars])
-
-# ---------------------------------------------------------------
-# 5. Random Effects model coefficients
-# ---------------------------------------------------------------
-coef = {
-    "gdp_ppp": -0.0286,
-    "population": 0.0164,
-    "inflation": 0.0162,
-    "unemployment": 0.0115,
-    "is_solar": 0.0035,
-    "is_wind_offshore": 0.0215,
-}
+# > 0: add wacc_p5 / wacc_p50 / wacc_p95 bands from this many coefficient
+# draws of the fitted covariance (projection_engine.project_bands)
+uncertainty_draws = 0
 
 # ---------------------------------------------------------------
-# 6. Generate projections by technology type
+# 6. Generate projections for all technologies in one matrix product
+#    (technology dummies: projection_engine.TECHNOLOGIES)
 # ---------------------------------------------------------------
-tech_map = {
-    "Wind_Onshore": {"is_solar": 0, "is_wind_offshore": 0},
-    "Solar_PV":     {"is_solar": 1, "is_wind_offshore": 0},
-    "Wind_Offshore": {"is_solar": 0, "is_wind_offshore": 1},
-}
-
-proj_frames = []
-for tech, dums in tech_map.items():
-    tmp = macro_std.copy()
-    tmp["Technology"] = tech
-    tmp["is_solar"] = dums["is_solar"]
-    tmp["is_wind_offshore"] = dums["is_wind_offshore"]
-
-    tmp["wacc_projection"] = (
-        coef["gdp_ppp"] * tmp["gdp_ppp"]
-        + coef["population"] * tmp["population"]
-        + coef["inflation"] * tmp["inflation"]
-        + coef["unemployment"] * tmp["unemployment"]
-        + coef["is_solar"] * tmp["is_solar"]
-        + coef["is_wind_offshore"] * tmp["is_wind_offshore"]
-    )
-
-    proj_frames.append(
-        tmp[["Scenario", "ISO", "Year", "Technology", "wacc_projection"]]
-    )
-
-proj_df = pd.concat(proj_frames, ignore_index=True)
+if uncertainty_draws:
+    proj_df = project_bands(macro_df, model, draws=uncertainty_draws)
+else:
+    proj_df = project_one(macro_df, model)
 
 # ---------------------------------------------------------------
 # 7. Save final projection result
 # ---------------------------------------------------------------
-out_path = (
-    "/Users/valentinadlc/Library/Caches/JetBrains/PyCharm2025.1/"
-    "demo/PyCharmLearningProject/WACC Thesis/wacc_projection_RE.csv"
-)
+out_path = projection_dir / "wacc_projection_RE.csv"
 proj_df.to_csv(out_path, index=False)
 
 print("\n✅ Random Effects Projections written to:", out_path)
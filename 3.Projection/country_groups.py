@@ -0,0 +1,93 @@
+#SHARED COUNTRY GROUPINGS (ISO3 -> COUNTRY NAME, REGION, INCOME LEVEL)
+# One copy of the ISO maps that were pasted into the regression and projection
+# scripts:
+#   - ISO_TO_COUNTRY / ISO_TO_REGION / ISO_TO_INCOME: the projection countries
+#     (World Bank region and income labels), used by 3.Final_Regions.py
+#   - ISO_TO_WB_REGION: the ~80 countries of the WACC regression sample, with
+#     the "&" region labels of the robustness checks in Regression_2/3
+# ISO_TO_INCOME only covers the projection countries; regression countries
+# missing from it have no income group.
+
+ISO_TO_COUNTRY = {
+    "ARG": "Argentina", "AUS": "Australia", "AUT": "Austria", "BEL": "Belgium", "BGR": "Bulgaria",
+    "BRA": "Brazil", "CAN": "Canada", "CHE": "Switzerland", "CHL": "Chile", "CHN": "China",
+    "CZE": "Czech Republic", "DEU": "Germany", "DNK": "Denmark", "EGY": "Egypt", "ESP": "Spain",
+    "EST": "Estonia", "FIN": "Finland", "FRA": "France", "GBR": "United Kingdom", "GRC": "Greece",
+    "HKG": "Hong Kong", "HRV": "Croatia", "HUN": "Hungary", "IDN": "Indonesia", "IND": "India",
+    "IRL": "Ireland", "ITA": "Italy", "JPN": "Japan", "KOR": "South Korea", "LTU": "Lithuania",
+    "LVA": "Latvia", "MEX": "Mexico", "MYS": "Malaysia", "NLD": "Netherlands", "NOR": "Norway",
+    "NZL": "New Zealand", "POL": "Poland", "PRT": "Portugal", "ROU": "Romania", "RUS": "Russia",
+    "SGP": "Singapore", "SVK": "Slovakia", "SVN": "Slovenia", "SWE": "Sweden", "TWN": "Taiwan",
+    "USA": "United States", "VNM": "Vietnam", "ZAF": "South Africa"
+}
+
+ISO_TO_REGION = {
+    "AUS": "East Asia and Pacific", "CHN": "East Asia and Pacific", "HKG": "East Asia and Pacific",
+    "IDN": "East Asia and Pacific", "JPN": "East Asia and Pacific", "KOR": "East Asia and Pacific",
+    "MYS": "East Asia and Pacific", "NZL": "East Asia and Pacific", "SGP": "East Asia and Pacific",
+    "TWN": "East Asia and Pacific", "VNM": "East Asia and Pacific",
+    "AUT": "Europe and Central Asia", "BEL": "Europe and Central Asia", "BGR": "Europe and Central Asia",
+    "CHE": "Europe and Central Asia", "CZE": "Europe and Central Asia", "DEU": "Europe and Central Asia",
+    "DNK": "Europe and Central Asia", "ESP": "Europe and Central Asia", "EST": "Europe and Central Asia",
+    "FIN": "Europe and Central Asia", "FRA": "Europe and Central Asia", "GBR": "Europe and Central Asia",
+    "GRC": "Europe and Central Asia", "HRV": "Europe and Central Asia", "HUN": "Europe and Central Asia",
+    "IRL": "Europe and Central Asia", "ITA": "Europe and Central Asia", "LTU": "Europe and Central Asia",
+    "LVA": "Europe and Central Asia", "NLD": "Europe and Central Asia", "NOR": "Europe and Central Asia",
+    "POL": "Europe and Central Asia", "PRT": "Europe and Central Asia", "ROU": "Europe and Central Asia",
+    "RUS": "Europe and Central Asia", "SVK": "Europe and Central Asia", "SVN": "Europe and Central Asia",
+    "SWE": "Europe and Central Asia",
+    "ARG": "Latin America and Caribbean", "BRA": "Latin America and Caribbean", "CHL": "Latin America and Caribbean",
+    "MEX": "Latin America and Caribbean",
+    "EGY": "Middle East and North Africa",
+    "CAN": "North America", "USA": "North America",
+    "IND": "South Asia",
+    "ZAF": "Sub-Saharan Africa"
+}
+
+ISO_TO_INCOME = {
+    "AUS": "High income", "AUT": "High income", "BEL": "High income", "CAN": "High income",
+    "CHE": "High income", "CZE": "High income", "DEU": "High income", "DNK": "High income",
+    "ESP": "High income", "EST": "High income", "FIN": "High income", "FRA": "High income",
+    "GBR": "High income", "GRC": "High income", "HRV": "High income", "HUN": "High income",
+    "IRL": "High income", "ITA": "High income", "JPN": "High income", "KOR": "High income",
+    "LTU": "High income", "LVA": "High income", "NLD": "High income", "NOR": "High income",
+    "NZL": "High income", "POL": "High income", "PRT": "High income", "SVK": "High income",
+    "SVN": "High income", "SWE": "High income", "SGP": "High income", "TWN": "High income",
+    "USA": "High income", "CHL": "High income",
+    "ARG": "Upper middle income", "BRA": "Upper middle income", "CHN": "Upper middle income",
+    "MEX": "Upper middle income", "RUS": "Upper middle income", "ZAF": "Upper middle income",
+    "BGR": "Upper middle income", "ROU": "Upper middle income",
+    "EGY": "Lower middle income", "IND": "Lower middle income", "IDN": "Lower middle income",
+    "VNM": "Lower middle income",
+    "HKG": "High income", "MYS": "Upper middle income"
+}
+
+ISO_TO_WB_REGION = {
+    "ARG": "Latin America & Caribbean", "AUS": "East Asia & Pacific", "AUT": "Europe & Central Asia",
+    "BEL": "Europe & Central Asia", "BGD": "South Asia", "BGR": "Europe & Central Asia",
+    "BHR": "Middle East & North Africa", "BOL": "Latin America & Caribbean", "BRA": "Latin America & Caribbean",
+    "BWA": "Sub-Saharan Africa", "CHE": "Europe & Central Asia", "CHL": "Latin America & Caribbean",
+    "CHN": "East Asia & Pacific", "CMR": "Sub-Saharan Africa", "COL": "Latin America & Caribbean",
+    "CRI": "Latin America & Caribbean", "CYP": "Europe & Central Asia", "CZE": "Europe & Central Asia",
+    "DEU": "Europe & Central Asia", "DNK": "Europe & Central Asia", "EGY": "Middle East & North Africa",
+    "ESP": "Europe & Central Asia", "EST": "Europe & Central Asia", "FIN": "Europe & Central Asia",
+    "FRA": "Europe & Central Asia", "GBR": "Europe & Central Asia", "GHA": "Sub-Saharan Africa",
+    "GRC": "Europe & Central Asia", "GTM": "Latin America & Caribbean", "HRV": "Europe & Central Asia",
+    "HUN": "Europe & Central Asia", "IDN": "East Asia & Pacific", "IND": "South Asia", "IRL": "Europe & Central Asia",
+    "ISR": "Middle East & North Africa", "ITA": "Europe & Central Asia", "JAM": "Latin America & Caribbean",
+    "JOR": "Middle East & North Africa", "KEN": "Sub-Saharan Africa", "KHM": "East Asia & Pacific",
+    "LKA": "South Asia", "LTU": "Europe & Central Asia", "LVA": "Europe & Central Asia",
+    "MAR": "Middle East & North Africa", "MEX": "Latin America & Caribbean", "MLT": "Middle East & North Africa",
+    "MOZ": "Sub-Saharan Africa", "MUS": "Sub-Saharan Africa", "MYS": "East Asia & Pacific", "NAM": "Sub-Saharan Africa",
+    "NGA": "Sub-Saharan Africa", "NLD": "Europe & Central Asia", "NOR": "Europe & Central Asia",
+    "OMN": "Middle East & North Africa", "PAK": "South Asia", "PAN": "Latin America & Caribbean",
+    "PER": "Latin America & Caribbean", "PHL": "East Asia & Pacific", "POL": "Europe & Central Asia",
+    "PRT": "Europe & Central Asia", "PRY": "Latin America & Caribbean", "ROU": "Europe & Central Asia",
+    "SAU": "Middle East & North Africa", "SEN": "Sub-Saharan Africa", "SGP": "East Asia & Pacific",
+    "SLV": "Latin America & Caribbean", "SVK": "Europe & Central Asia", "SVN": "Europe & Central Asia",
+    "SWE": "Europe & Central Asia", "TUN": "Middle East & North Africa", "TUR": "Europe & Central Asia",
+    "TWN": "East Asia & Pacific", "TZA": "Sub-Saharan Africa", "UGA": "Sub-Saharan Africa",
+    "UKR": "Europe & Central Asia", "URY": "Latin America & Caribbean", "USA": "North America",
+    "VEN": "Latin America & Caribbean", "VNM": "East Asia & Pacific", "YEM": "Middle East & North Africa",
+    "ZAF": "Sub-Saharan Africa", "ZMB": "Sub-Saharan Africa"
+}
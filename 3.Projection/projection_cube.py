@@ -0,0 +1,307 @@
+#PROJECTION CUBE: DENSE MODEL x SCENARIO x TECHNOLOGY x YEAR x ISO ARRAY
+# The plot scripts reloaded both projection tables, concatenated them,
+# recomputed groupby means by Region / IncomeLevel and filtered with boolean
+# masks inside their tech x scenario x model loops. Here the projections are
+# stored once as a dense NumPy array with one label index per axis (DIMS), so
+# a slice by label is a hash lookup per axis and a view into the array. The
+# Region and IncomeLevel means over countries are precomputed (NaN-aware, as
+# groupby().mean()) with one membership-matrix product each and stored with
+# the cube in wacc_projection_cube.npz, written by 3.Final_Regions.py. The
+# .npz is not committed; it carries the SHA-256 of the tables it was built
+# from, and load_cube rebuilds it when they no longer match (mtimes are
+# meaningless after a checkout).
+#
+# Rollups can be weighted: a weight is any table keyed by a subset of the cube
+# axes (gdp_ppp and population per Scenario x ISO x Year from the NGFS panel,
+# installed capacity per ISO x Technology, ...) aligned once to the cube. The
+# weighted sums and weight totals of every weighting of a grouping are stacked
+# and reduced over ISO by one sparse ISO x group membership matrix product, so
+# a new weighting or grouping is one more add_weights / add_rollup call, not
+# another groupby pass:
+#
+#   cube = load_cube()                    # rebuilt if a projection table changed
+#   cube.sel(Model="FE", Scenario="Netzero", Technology="Solar_PV")        # Year x ISO
+#   cube.rollup("Region", Model="FE", Scenario="Netzero", Technology="Solar_PV")   # Year x Region
+#   cube.rollup("Region", "gdp_ppp", Model="FE")                           # GDP-weighted
+#   cube.add_weights("capacity", capacity_df).add_rollup("Region", ["capacity"])
+#   cube.frame(ISO="DEU")                 # long table for seaborn
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from country_groups import ISO_TO_COUNTRY, ISO_TO_INCOME, ISO_TO_REGION
+
+DIMS = ("Model", "Scenario", "Technology", "Year", "ISO")
+
+# bump when the layout of the .npz or the precomputed rollups change
+CUBE_VERSION = 1
+
+PROJECTION_DIR = Path(__file__).resolve().parent
+CUBE_PATH = PROJECTION_DIR / "wacc_projection_cube.npz"
+
+# model label -> projection table (3.Final_Regions.py output)
+MODEL_TABLES = {
+    "FE": PROJECTION_DIR / "wacc_projection_FE_nopop_with_groups.parquet",
+    "OLS": PROJECTION_DIR / "wacc_projection_OLS_with_groups.parquet",
+}
+
+# NGFS scenario panel; its gdp_ppp and population columns are the default weights
+MACRO_PATH = PROJECTION_DIR.parent / "1.Cleaning_and_Merges" / "ngfs_final_merge.csv"
+MACRO_WEIGHTS = ("gdp_ppp", "population")
+
+# ISO -> group label maps carried by the cube; ROLLUPS are precomputed for
+# every weighting in WEIGHTINGS (None = unweighted mean)
+GROUPS = {"Country": ISO_TO_COUNTRY, "Region": ISO_TO_REGION, "IncomeLevel": ISO_TO_INCOME}
+ROLLUPS = ("Region", "IncomeLevel")
+WEIGHTINGS = (None,) + MACRO_WEIGHTS
+
+
+def rollup_key(by: str, weight: str | None = None) -> str:
+    return by if weight is None else f"{by}:{weight}"
+
+
+def membership(members: pd.Series) -> tuple[pd.Index, sparse.csr_array]:
+    """(group labels, sparse ISO x group 0/1 matrix) of an ISO -> group Series (NaN = no group)."""
+    codes, labels = pd.factorize(members, sort=True)
+    rows = np.flatnonzero(codes >= 0)
+    M = sparse.csr_array((np.ones(len(rows)), (rows, codes[rows])), shape=(len(members), len(labels)))
+    return pd.Index(labels, name=members.name), M
+
+
+def group_means(values: np.ndarray, weights: list, M: sparse.csr_array) -> list[np.ndarray]:
+    """(Weighted) means over the last axis (ISO) within each group, one per entry of `weights`.
+
+    A weight is None (plain mean) or an array broadcastable to `values`. Cells
+    with a NaN value or weight are left out. Weighted sums and weight totals of
+    all weightings go through a single sparse product with M.
+    """
+    cells = values.reshape(-1, values.shape[-1])
+    valid = ~np.isnan(cells)
+    blocks = []
+    for w in weights:
+        w = valid.astype("float64") if w is None else np.broadcast_to(w, values.shape).reshape(cells.shape)
+        w = np.where(valid & ~np.isnan(w), w, 0.0)
+        blocks += [w * np.where(valid, cells, 0.0), w]
+    parts = np.split(np.vstack(blocks) @ M, 2 * len(weights))
+    shape = values.shape[:-1] + (M.shape[1],)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return [np.where(weight > 0, total / weight, np.nan).reshape(shape)
+                for total, weight in zip(parts[0::2], parts[1::2])]
+
+
+@dataclass
+class ProjectionCube:
+    """WACC projections as a dense array over DIMS with label indexes."""
+    values: np.ndarray                                   # Model x Scenario x Technology x Year x ISO
+    labels: dict[str, pd.Index]                          # one index per dimension
+    groups: dict[str, pd.Series] = field(default_factory=dict)     # ISO -> group label
+    weights: dict[str, np.ndarray] = field(default_factory=dict)   # broadcastable to values
+    rollups: dict[str, tuple[pd.Index, np.ndarray]] = field(default_factory=dict)   # rollup_key -> groups, values
+
+    @classmethod
+    def from_tables(
+        cls,
+        tables: dict[str, pd.DataFrame],
+        value: str = "wacc_projection",
+        weights: dict[str, pd.DataFrame] | None = None,
+    ) -> "ProjectionCube":
+        """Cube from {model: long projection table} (Scenario, Technology, Year, ISO, value).
+
+        `weights` maps a weight name to a table with a column of that name
+        (see add_weights); ROLLUPS are precomputed for each of them and unweighted.
+        """
+        frames = [t.assign(Model=m)[list(DIMS) + [value]] for m, t in tables.items()]
+        long = pd.concat(frames, ignore_index=True)
+        labels = {d: pd.Index(pd.unique(_labels(long[d], d)), name=d) for d in DIMS}
+        labels = {d: idx if d == "Model" else idx.sort_values() for d, idx in labels.items()}
+        codes = tuple(labels[d].get_indexer(_labels(long[d], d)) for d in DIMS)
+        values = np.full(tuple(len(labels[d]) for d in DIMS), np.nan)
+        values[codes] = long[value].to_numpy(dtype="float64")
+
+        iso = labels["ISO"]
+        groups = {name: pd.Series(iso.map(lambda c, m=mapping: m.get(c, np.nan)), index=iso, name=name)
+                  for name, mapping in GROUPS.items()}
+        cube = cls(values, labels, groups)
+        for name, table in (weights or {}).items():
+            cube.add_weights(name, table)
+        for by in ROLLUPS:
+            cube.add_rollup(by, [None, *cube.weights])
+        return cube
+
+    def add_weights(self, name: str, table: pd.DataFrame, column: str | None = None) -> "ProjectionCube":
+        """Align the `column` (default `name`) of `table` to the cube as weight `name`.
+
+        `table` is keyed by any subset of the Scenario, Technology, Year and ISO
+        columns (e.g. ISO, Technology for installed capacity); the weight is
+        broadcast over the axes it lacks. Rows outside the cube are ignored,
+        cells without a row get no weight (left out of the weighted means).
+        """
+        column = column or name
+        dims = [d for d in DIMS if d in table.columns]
+        if "ISO" not in dims:
+            raise KeyError(f"weight table {name!r} needs an ISO column, got {list(table.columns)}")
+        codes = [self.labels[d].get_indexer(_labels(table[d], d)) for d in dims]
+        inside = np.logical_and.reduce([c >= 0 for c in codes])
+        W = np.full(tuple(len(self.labels[d]) if d in dims else 1 for d in DIMS), np.nan)
+        W[tuple(np.zeros(inside.sum(), dtype="int64") if d not in dims else codes[dims.index(d)][inside]
+                for d in DIMS)] = table[column].to_numpy(dtype="float64")[inside]
+        self.weights[name] = W
+        return self
+
+    def add_rollup(self, by: str, weights=(None,), groups: dict | None = None) -> "ProjectionCube":
+        """Precompute the `by` group means for every weight name in `weights` (None = unweighted).
+
+        `groups` ({ISO: group}) adds a new grouping `by`. All weightings share
+        one sparse membership-matrix product.
+        """
+        if groups is not None:
+            iso = self.labels["ISO"]
+            self.groups[by] = pd.Series(iso.map(lambda c: groups.get(c, np.nan)), index=iso, name=by)
+        group_labels, M = membership(self.groups[by])
+        means = group_means(self.values, [None if w is None else self.weights[w] for w in weights], M)
+        for w, values in zip(weights, means):
+            self.rollups[rollup_key(by, w)] = (group_labels, values)
+        return self
+
+    def _axes(self, by: str | None, weight: str | None = None) -> tuple[tuple, dict, np.ndarray]:
+        """(dims, labels, values) of the ISO cube or of the `by` rollup."""
+        if by is None:
+            return DIMS, self.labels, self.values
+        key = rollup_key(by, weight)
+        if key not in self.rollups:
+            raise KeyError(f"no {key!r} rollup, add it with add_rollup({by!r}, [{weight!r}])")
+        group_labels, values = self.rollups[key]
+        return DIMS[:-1] + (by,), {**self.labels, by: group_labels}, values
+
+    @staticmethod
+    def _positions(dims, labels: dict, selection: dict) -> list:
+        """Axis positions of `selection` (scalar -> int, list -> int array, missing -> slice)."""
+        unknown = set(selection) - set(dims)
+        if unknown:
+            raise KeyError(f"unknown dimension(s) {sorted(unknown)}, use {list(dims)}")
+        out = []
+        for dim in dims:
+            label = selection.get(dim)
+            if label is None:
+                out.append(slice(None))
+            elif isinstance(label, (list, tuple, np.ndarray, pd.Index)):
+                pos = labels[dim].get_indexer(label)
+                if (pos < 0).any():
+                    raise KeyError(f"{dim}: {list(np.asarray(label)[pos < 0])} not in the cube")
+                out.append(pos)
+            else:
+                out.append(labels[dim].get_loc(label))
+        return out
+
+    @staticmethod
+    def _take(values: np.ndarray, positions: list) -> np.ndarray:
+        # one axis at a time from the back, so a list on one axis does not
+        # broadcast against a list on another; scalars and slices stay views
+        for axis in reversed(range(len(positions))):
+            if not isinstance(positions[axis], slice):
+                values = values[(slice(None),) * axis + (positions[axis],)]
+        return values
+
+    def sel(self, **selection) -> np.ndarray:
+        """Values for the given labels (scalar drops the axis, list keeps it, None = all)."""
+        dims, labels, values = self._axes(None)
+        return self._take(values, self._positions(dims, labels, selection))
+
+    def rollup(self, by: str, weight: str | None = None, **selection) -> np.ndarray:
+        """Precomputed (`weight`-weighted) group means over ISO, last axis = groups of `by`, sliced as `sel`."""
+        dims, labels, values = self._axes(by, weight)
+        return self._take(values, self._positions(dims, labels, selection))
+
+    def frame(self, by: str | None = None, weight: str | None = None, **selection) -> pd.DataFrame:
+        """Long table (dims, wacc_projection) of a selection, per ISO or per `by` group."""
+        dims, labels, values = self._axes(by, weight)
+        selection = {d: v if isinstance(v, (list, tuple, np.ndarray, pd.Index)) else [v]
+                     for d, v in selection.items() if v is not None}
+        positions = [np.arange(len(labels[d])) if isinstance(p, slice) else p
+                     for d, p in zip(dims, self._positions(dims, labels, selection))]
+        grid = pd.MultiIndex.from_product([labels[d][p] for d, p in zip(dims, positions)], names=list(dims))
+        out = grid.to_frame(index=False)
+        out["wacc_projection"] = self._take(values, positions).reshape(-1)
+        return out.dropna(subset=["wacc_projection"]).reset_index(drop=True)
+
+    def save(self, path=CUBE_PATH, stamp: dict | None = None) -> Path:
+        arrays = {"values": self.values}
+        if stamp is not None:
+            arrays["stamp"] = np.array(json.dumps(stamp, sort_keys=True))
+        arrays |= {f"label_{d}": self.labels[d].to_numpy(dtype=str if d != "Year" else "int64") for d in DIMS}
+        arrays |= {f"group_{g}": s.fillna("").to_numpy(dtype=str) for g, s in self.groups.items()}
+        arrays |= {f"weight_{w}": W for w, W in self.weights.items()}
+        for key, (group_labels, values) in self.rollups.items():
+            arrays[f"rollup_{key}"] = values
+            arrays[f"rollup_labels_{key}"] = group_labels.to_numpy(dtype=str)
+        np.savez_compressed(path, **arrays)
+        return Path(path)
+
+    @classmethod
+    def load(cls, path=CUBE_PATH) -> "ProjectionCube":
+        with np.load(path) as data:
+            def named(prefix: str) -> dict:
+                return {k[len(prefix):]: data[k] for k in data.files if k.startswith(prefix)}
+
+            labels = {d: pd.Index(data[f"label_{d}"].tolist(), name=d) for d in DIMS}
+            groups = {g: pd.Series(v, index=labels["ISO"], name=g).replace("", np.nan)
+                      for g, v in named("group_").items()}
+            rollup_labels = named("rollup_labels_")
+            rollups = {key: (pd.Index(rollup_labels[key].tolist(), name=key.split(":")[0]), values)
+                       for key, values in named("rollup_").items() if not key.startswith("labels_")}
+            return cls(data["values"], labels, groups, named("weight_"), rollups)
+
+
+def _labels(column: pd.Series, dim: str) -> pd.Series:
+    """Labels of a table column as stored on the cube axis `dim`."""
+    return column.astype("int64") if dim == "Year" else column.astype(str)
+
+
+def load_macro_weights(path=MACRO_PATH) -> dict[str, pd.DataFrame]:
+    """{weight: NGFS panel} for MACRO_WEIGHTS (per Scenario, ISO, Year)."""
+    macro = pd.read_csv(path).rename(columns={"GDP_PPP": "gdp_ppp"})
+    return {name: macro for name in MACRO_WEIGHTS}
+
+
+def _stamp() -> dict:
+    """CUBE_VERSION and the SHA-256 of MODEL_TABLES and the NGFS panel."""
+    sources = {**MODEL_TABLES, "macro": MACRO_PATH}
+    return {"version": CUBE_VERSION,
+            **{name: hashlib.sha256(Path(p).read_bytes()).hexdigest() for name, p in sources.items()}}
+
+
+def _stored_stamp(path: Path) -> dict | None:
+    with np.load(path) as data:
+        return json.loads(data["stamp"].item()) if "stamp" in data.files else None
+
+
+def build_cube(tables: dict | None = None, *, weights: dict | None = None, save_to=CUBE_PATH) -> ProjectionCube:
+    """Cube of the MODEL_TABLES projections (or {model: DataFrame}), saved to `save_to`.
+
+    `weights` defaults to gdp_ppp and population of the NGFS panel. Only a cube
+    built from the files themselves is stamped, so load_cube rebuilds any other.
+    """
+    stamp = _stamp() if tables is None and weights is None else None
+    if tables is None:
+        tables = {m: pd.read_parquet(p) for m, p in MODEL_TABLES.items()}
+    if weights is None:
+        weights = load_macro_weights()
+    cube = ProjectionCube.from_tables(tables, weights=weights)
+    if save_to is not None:
+        cube.save(save_to, stamp)
+    return cube
+
+
+def load_cube(path=CUBE_PATH, *, rebuild: bool = False) -> ProjectionCube:
+    """Stored cube; rebuilt if missing or if MODEL_TABLES or the NGFS panel changed."""
+    path = Path(path)
+    if rebuild or not path.exists() or _stored_stamp(path) != _stamp():
+        return build_cube(save_to=path)
+    return ProjectionCube.load(path)
@@ -0,0 +1,251 @@
+#MATRIX-FORM WACC PROJECTION FOR ALL TECHNOLOGIES AND MODELS AT ONCE
+# The projection scripts copied the scenario frame once per technology, set the
+# dummies and summed coef * column by hand. Here the scenario inputs are read
+# once into a matrix F (rows = Scenario x ISO x Year, columns = macro variables)
+# and every (model, technology) pair becomes one column of a coefficient matrix:
+#   - a model's scaler is folded into its slopes and intercept
+#     (b * (x - mean) / scale = x * b / scale - mean * b / scale)
+#   - the technology dummies only shift the intercept of their column
+# so all projections are a single product [F, 1] @ W, and the long table
+# (keys, Technology, Model, wacc_projection) is assembled from that result by
+# repeating the key columns, without per-technology frame copies:
+#
+#   proj_df = project_one(macro_df, load_model("fe_nopop"))
+#   both = project(macro_df, {"OLS": load_model("ols_all"), "FE": load_model("fe_nopop")})
+#
+# forecast does the same for a fitted sklearn model on a wide NGFS table
+# (Variable rows, year columns): one pivot, one predict call for all
+# technologies, and an explicit table of the cells with missing inputs:
+#
+#   wacc, missing = forecast(model, scenario_df, features, years, tech_combinations)
+#
+# project_bands adds uncertainty bands for a registry model: coefficient
+# vectors are drawn from its fitted covariance and all draws are evaluated as
+# one product X @ B' (plus a per-technology shift), a block of rows at a time.
+# Only the percentiles of each block are kept, so memory is bounded by
+# CHUNK_VALUES whatever the number of draws and cells:
+#
+#   proj_df = project_bands(macro_df, load_model("fe_nopop"), draws=5000)   # + wacc_p5/p50/p95
+from __future__ import annotations
+
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+KEYS = ["Scenario", "ISO", "Year"]
+
+QUANTILES = (0.05, 0.5, 0.95)
+CHUNK_VALUES = 1 << 22          # draws x cells evaluated at once in project_bands (32 MB)
+
+# technology -> dummy values; dummies a model does not use are ignored
+TECHNOLOGIES = {
+    "Wind_Onshore": {"is_solar": 0, "is_wind_onshore": 1, "is_wind_offshore": 0},
+    "Solar_PV": {"is_solar": 1, "is_wind_onshore": 0, "is_wind_offshore": 0},
+    "Wind_Offshore": {"is_solar": 0, "is_wind_onshore": 0, "is_wind_offshore": 1},
+}
+
+
+def _linear(model) -> tuple[float, pd.Series, dict]:
+    """(constant, slopes, scaler) of a registry model or a {term: coef} dict."""
+    if isinstance(model, Mapping):
+        coef = pd.Series(model, dtype="float64")
+        return float(coef.get("const", 0.0)), coef.drop("const", errors="ignore"), {}
+    return float(model.params.get("const", 0.0)), model.params[model.terms], dict(model.scaler)
+
+
+def check_units(macro: pd.DataFrame, models: dict) -> None:
+    """Raise if `macro` is not in the units a registry model expects (gdp_ppp in billions)."""
+    for model in models.values():
+        if not isinstance(model, Mapping):
+            model.check_units(macro)
+
+
+def coefficient_matrix(models: dict, technologies: dict = TECHNOLOGIES) -> tuple[list[str], np.ndarray]:
+    """Macro columns used and W, (columns + 1) x (models * technologies).
+
+    Column m * n_tech + t of W projects technology t with model m in raw
+    units; its last row is the intercept.
+    """
+    dummies = {d for values in technologies.values() for d in values}
+    fitted = {name: _linear(m) for name, m in models.items()}
+    columns = list(dict.fromkeys(t for _, slopes, _ in fitted.values() for t in slopes.index if t not in dummies))
+
+    W = np.zeros((len(columns) + 1, len(models) * len(technologies)))
+    for m, (const, slopes, scaler) in enumerate(fitted.values()):
+        b = np.zeros(len(columns))
+        for term, value in slopes.items():
+            if term in dummies:
+                continue
+            mean, scale = scaler.get(term, (0.0, 1.0))
+            b[columns.index(term)] = value / scale
+            const -= mean * value / scale
+        for t, values in enumerate(technologies.values()):
+            shift = sum(value * slopes.get(d, 0.0) for d, value in values.items())
+            W[:-1, m * len(technologies) + t] = b
+            W[-1, m * len(technologies) + t] = const + shift
+    return columns, W
+
+
+def evaluate(macro: pd.DataFrame, columns: list[str], W: np.ndarray) -> np.ndarray:
+    """[F, 1] @ W for the `columns` of `macro`, rows x W columns.
+
+    NaN only where an input with a non-zero coefficient in that column is missing.
+    """
+    F = macro[columns].to_numpy(dtype="float64")
+    missing = np.isnan(F)
+    Y = np.column_stack([np.where(missing, 0.0, F), np.ones(len(F))]) @ W
+    if missing.any():
+        Y[(missing.astype("float64") @ (W[:-1] != 0)) > 0] = np.nan
+    return Y
+
+
+def _repeat(values: pd.Series, times: int) -> pd.Series:
+    """`values` tiled `times`, categoricals via their codes."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return pd.Categorical.from_codes(np.tile(values.cat.codes.to_numpy(), times), dtype=values.dtype)
+    return np.tile(values.to_numpy(), times)
+
+
+def project(macro: pd.DataFrame, models: dict, technologies: dict = TECHNOLOGIES, *, keys=KEYS) -> pd.DataFrame:
+    """Long projection table for every model x technology x row of `macro`.
+
+    `models` maps a label (Model column) to a model_registry model or to a
+    {term: coef} dict in the units of `macro`. Rows are ordered by model, then
+    technology, then the row order of `macro`. A projection is NaN where an
+    input its model uses is missing.
+    """
+    check_units(macro, models)
+    columns, W = coefficient_matrix(models, technologies)
+    Y = evaluate(macro, columns, W)
+
+    n, n_tech, n_cells = len(macro), len(technologies), W.shape[1]
+    cell = np.repeat(np.arange(n_cells), n)
+    out = {k: _repeat(macro[k], n_cells) for k in keys}
+    out["Technology"] = pd.Categorical.from_codes(cell % n_tech, categories=list(technologies))
+    out["Model"] = pd.Categorical.from_codes(cell // n_tech, categories=list(models))
+    out["wacc_projection"] = Y.T.reshape(-1)
+    return pd.DataFrame(out)
+
+
+def project_one(macro: pd.DataFrame, model, technologies: dict = TECHNOLOGIES, *, keys=KEYS) -> pd.DataFrame:
+    """`project` for a single model, without the Model column."""
+    return project(macro, {"model": model}, technologies, keys=keys).drop(columns="Model")
+
+
+def forecast(
+    model,
+    wide: pd.DataFrame,
+    features,
+    years,
+    technologies: dict = TECHNOLOGIES,
+    *,
+    by=("Scenario",),
+    keys=("Country", "ISO"),
+    variable: str = "Variable",
+    value: str = "wacc_projection",
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(forecasts, missing inputs) of any fitted model with `predict` (sklearn).
+
+    `wide` has one row per `by` x `keys` x `variable` and one column per year
+    (ngfs_reconstruct output). It is pivoted once into a cells x years x
+    features array, and `model.predict` is called once on the rows of every
+    technology, with the dummy `features` set from `technologies`. The first
+    row wins for duplicated variables. Cells with an absent or NaN input get no
+    forecast and are listed in the second table, with the missing features.
+    Forecasts are ordered by `by`, technology, cell and year.
+    """
+    by, keys, years, features = list(by), list(keys), list(years), list(features)
+    dummies = {d for values in technologies.values() for d in values}
+    inputs = [f for f in features if f not in dummies]
+
+    cell_codes = wide.groupby(by + keys, sort=False, dropna=False).ngroup().to_numpy()
+    cell_frame = wide[by + keys].drop_duplicates().reset_index(drop=True)
+    values = wide[years].to_numpy(dtype="float64")
+    names = wide[variable].to_numpy()
+    cube = np.full((len(cell_frame), len(years), len(inputs)), np.nan)
+    for j, feature in enumerate(inputs):
+        rows = np.flatnonzero(names == feature)
+        rows = rows[~pd.Index(cell_codes[rows]).duplicated()]
+        cube[cell_codes[rows], :, j] = values[rows]
+
+    X = cube.reshape(-1, len(inputs))
+    absent = np.isnan(X)
+    complete = np.flatnonzero(~absent.any(axis=1))
+    cell, year = np.divmod(np.arange(len(X)), len(years))
+
+    def _labels(idx: np.ndarray) -> dict:
+        out = {c: cell_frame[c].to_numpy()[cell[idx]] for c in by + keys}
+        out["Year"] = np.asarray(years, dtype=object)[year[idx]]
+        return out
+
+    n, n_tech = len(complete), len(technologies)
+    design = pd.DataFrame(np.tile(X[complete], (n_tech, 1)), columns=inputs)
+    for d in dummies & set(features):
+        design[d] = np.repeat([float(v.get(d, 0)) for v in technologies.values()], n)
+    predicted = model.predict(design[features]) if n else np.empty(0)
+
+    # scenario-major, then technology, then cell / year as the per-cell loops wrote them
+    group = cell_frame.groupby(by, sort=False, dropna=False).ngroup().to_numpy()[cell[complete]]
+    tech = np.repeat(np.arange(n_tech), n)
+    order = np.lexsort((np.tile(complete, n_tech), tech, np.tile(group, n_tech)))
+    rows = np.tile(complete, n_tech)[order]
+    forecasts = pd.DataFrame({**_labels(rows),
+                              "Technology": np.asarray(list(technologies), dtype=object)[tech[order]],
+                              value: np.asarray(predicted)[order]})
+
+    gaps = np.flatnonzero(absent.any(axis=1))
+    missing = np.array([", ".join(np.asarray(inputs)[row]) for row in absent[gaps]], dtype=object)
+    return forecasts, pd.DataFrame({**_labels(gaps), "missing": missing})
+
+
+def project_bands(
+    macro: pd.DataFrame,
+    model,
+    technologies: dict = TECHNOLOGIES,
+    *,
+    draws: int = 5000,
+    quantiles=QUANTILES,
+    seed: int = 0,
+    keys=KEYS,
+) -> pd.DataFrame:
+    """`project_one` plus percentile bands from `draws` coefficient draws.
+
+    `model` is a model_registry model; its constant and projection terms are
+    drawn jointly from N(params, cov). Adds one column wacc_p<q> per quantile
+    (wacc_p5, wacc_p50, wacc_p95 by default) in the row order of project_one.
+    """
+    model.check_units(macro)
+    dummies = {d for values in technologies.values() for d in values}
+    names = (["const"] if "const" in model.params.index else []) + model.terms
+    macro_terms = [t for t in model.terms if t not in dummies]
+    dummy_terms = [t for t in model.terms if t in dummies]
+
+    rng = np.random.default_rng(seed)
+    B = rng.multivariate_normal(model.params[names].to_numpy(), model.cov.loc[names, names].to_numpy(),
+                                size=draws, method="eigh")
+    B = pd.DataFrame(B, columns=names)
+
+    X = macro[macro_terms].to_numpy(dtype="float64", copy=True)
+    for j, term in enumerate(macro_terms):
+        if term in model.scaler:
+            mean, scale = model.scaler[term]
+            X[:, j] = (X[:, j] - mean) / scale
+    Bm = B[macro_terms].to_numpy()
+    if "const" in names:
+        X, Bm = np.column_stack([np.ones(len(X)), X]), np.column_stack([B["const"].to_numpy(), Bm])
+    D = np.array([[float(values.get(d, 0)) for d in dummy_terms] for values in technologies.values()])
+    shift = D.reshape(len(technologies), len(dummy_terms)) @ B[dummy_terms].to_numpy().T    # techs x draws
+
+    n, n_tech = len(macro), len(technologies)
+    bands = np.empty((len(quantiles), n_tech, n))
+    step = max(1, CHUNK_VALUES // (draws * n_tech))
+    for start in range(0, n, step):
+        rows = slice(start, start + step)
+        Y = (X[rows] @ Bm.T)[:, None, :] + shift[None]                               # rows x techs x draws
+        bands[:, :, rows] = np.quantile(Y, quantiles, axis=-1).transpose(0, 2, 1)
+
+    out = project_one(macro, model, technologies, keys=keys)
+    for q, band in zip(quantiles, bands):
+        out[f"wacc_p{q * 100:g}"] = band.reshape(-1)
+    return out
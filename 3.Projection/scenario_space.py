@@ -0,0 +1,221 @@
+#SCENARIO-SPACE EXPLORER: WACC OVER GRIDS OF MACRO SHOCKS (STRESS TESTS)
+# The projections only cover the NGFS scenarios of ngfs_final_merge.csv. Here
+# user-defined shocks to the macro inputs are laid on top of every scenario row:
+#   - "add": x + s * w(year)          e.g. inflation +2 pp
+#   - "mul": x * (1 + s * w(year))    e.g. gdp_ppp -10 %
+# with w(year) = 1, or a path given as {year: weight} knots (linear in between),
+# e.g. {2025: 0, 2035: 1} phases the shock in over ten years. Every shock has a
+# list of sizes, and the space is their Cartesian product x scenario rows x
+# technologies x models.
+#
+# The models are linear, so the base projection ([F, 1] @ W, projection_engine)
+# is computed once and each shock only adds slope * change, broadcast over its
+# own grid axis. Cells are produced lazily, a block of scenario rows at a time
+# (at most CHUNK_CELLS cells), so grids of millions of cells are streamed to
+# Parquet or reduced to summary statistics without being held in memory:
+#
+#   space = ScenarioSpace(macro_df, {"FE": load_model("fe_nopop")},
+#                         [Shock("inflation", (-2, 0, 2, 4)), Shock("gdp_ppp", (-0.2, 0, 0.2), "mul")])
+#   space.describe()                    # mean / min / max WACC per shock point
+#   space.to_parquet("stress.parquet")  # every cell, streamed
+#
+# Command line:  python scenario_space.py --shock inflation add -2 0 2 4 --shock gdp_ppp mul -0.2 0 0.2
+#                [--models fe_nopop ols_all] [--ramp 2025 2050] [--out stress.parquet]
+from __future__ import annotations
+
+import argparse
+import sys
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from projection_engine import KEYS, TECHNOLOGIES, check_units, coefficient_matrix, evaluate
+
+CHUNK_CELLS = 1 << 20
+
+MACRO_PATH = Path(__file__).resolve().parents[1] / "1.Cleaning_and_Merges" / "ngfs_final_merge.csv"
+
+
+@dataclass(frozen=True)
+class Shock:
+    """One shocked macro input and the sizes it takes on the grid."""
+    variable: str                  # column of the scenario frame (inflation, unemployment, gdp_ppp)
+    sizes: tuple                   # grid values, 0 = unshocked
+    kind: str = "add"              # "add" or "mul" (relative, 0.1 = +10 %)
+    path: dict | None = None       # {year: weight} knots; None = full shock every year
+
+    @property
+    def name(self) -> str:
+        return f"{self.variable}_{self.kind}"
+
+    def weights(self, years: np.ndarray) -> np.ndarray:
+        """Shock weight per year (linear between the path knots, flat outside)."""
+        if self.path is None:
+            return np.ones(len(years))
+        knots = sorted(self.path.items())
+        return np.interp(years, [y for y, _ in knots], [w for _, w in knots])
+
+    def change(self, x: np.ndarray, years: np.ndarray) -> np.ndarray:
+        """Change of the input, rows x sizes."""
+        step = np.asarray(self.sizes, dtype="float64")[None, :] * self.weights(years)[:, None]
+        if self.kind == "add":
+            return step
+        if self.kind == "mul":
+            return x[:, None] * step
+        raise ValueError(f"unknown shock kind {self.kind!r}, use 'add' or 'mul'")
+
+
+def _repeat_each(values: pd.Series, times: int):
+    """Every value of `values` `times` times in a row, categoricals via their codes."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return pd.Categorical.from_codes(np.repeat(values.cat.codes.to_numpy(), times), dtype=values.dtype)
+    return np.repeat(values.to_numpy(), times)
+
+
+def ramp(start: int, end: int) -> dict:
+    """Path phasing a shock in linearly from 0 in `start` to full size in `end`."""
+    return {start: 0.0, end: 1.0}
+
+
+class ScenarioSpace:
+    """Projections for scenario rows x shock grid x technologies x models.
+
+    `models` maps a label to a model_registry model or a {term: coef} dict, as
+    in projection_engine.project. Shocks to inputs a model does not use leave
+    its projection unchanged.
+    """
+
+    def __init__(self, macro: pd.DataFrame, models: dict, shocks, technologies: dict = TECHNOLOGIES, *, keys=KEYS):
+        self.shocks = list(shocks)
+        names = [s.name for s in self.shocks]
+        if len(set(names)) != len(names):
+            raise ValueError(f"one shock per variable and kind, got {names}")
+        self.macro = macro.reset_index(drop=True)
+        self.keys = list(keys)
+        self.technologies, self.models = list(technologies), list(models)
+
+        check_units(self.macro, models)
+        columns, W = coefficient_matrix(models, technologies)
+        self._base = evaluate(self.macro, columns, W)                         # rows x (models * techs)
+        years = self.macro["Year"].to_numpy(dtype="float64")
+        self._changes = [s.change(self.macro[s.variable].to_numpy(dtype="float64"), years) for s in self.shocks]
+        self._slopes = [W[columns.index(s.variable)] if s.variable in columns else np.zeros(W.shape[1])
+                        for s in self.shocks]
+
+    @property
+    def shape(self) -> tuple:
+        """(rows, *shock sizes, technologies x models)."""
+        return (len(self.macro), *(len(s.sizes) for s in self.shocks), self._base.shape[1])
+
+    def __len__(self) -> int:
+        return int(np.prod(self.shape))
+
+    def block(self, rows: slice) -> np.ndarray:
+        """WACC of the scenario rows `rows` on the full grid, shaped like `shape`."""
+        k = len(self.shocks)
+        out = self._base[rows].reshape(-1, *([1] * k), self._base.shape[1])
+        for axis, (change, slope) in enumerate(zip(self._changes, self._slopes)):
+            shape = [change[rows].shape[0]] + [1] * k + [1]
+            shape[1 + axis] = change.shape[1]
+            out = out + change[rows].reshape(shape) * slope
+        return out
+
+    def _blocks(self, chunk_cells: int) -> Iterator[tuple[slice, np.ndarray]]:
+        step = max(1, chunk_cells // int(np.prod(self.shape[1:])))
+        for start in range(0, len(self.macro), step):
+            rows = slice(start, start + step)
+            yield rows, self.block(rows)
+
+    def chunks(self, chunk_cells: int = CHUNK_CELLS) -> Iterator[pd.DataFrame]:
+        """Long tables (keys, shock sizes, Technology, Model, wacc_projection), block by block."""
+        n_tech = len(self.technologies)
+        for rows, Y in self._blocks(chunk_cells):
+            r, per_row = Y.shape[0], Y[0].size
+            frame = self.macro.iloc[rows]
+            out = {k: _repeat_each(frame[k], per_row) for k in self.keys}
+            grid = np.indices(Y.shape[1:]).reshape(Y.ndim - 1, -1)                   # shock axes, cell
+            for shock, idx in zip(self.shocks, grid[:-1]):
+                out[shock.name] = np.tile(np.asarray(shock.sizes, dtype="float64")[idx], r)
+            cell = np.tile(grid[-1], r)
+            out["Technology"] = pd.Categorical.from_codes(cell % n_tech, categories=self.technologies)
+            out["Model"] = pd.Categorical.from_codes(cell // n_tech, categories=self.models)
+            out["wacc_projection"] = Y.reshape(-1)
+            yield pd.DataFrame(out)
+
+    def to_parquet(self, path, chunk_cells: int = CHUNK_CELLS) -> Path:
+        """Stream every cell of the space to one Parquet file."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = Path(path)
+        writer = None
+        try:
+            for chunk in self.chunks(chunk_cells):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = writer or pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        return path
+
+    def describe(self, chunk_cells: int = CHUNK_CELLS) -> pd.DataFrame:
+        """Mean / min / max WACC over all scenario rows, per shock point x Technology x Model."""
+        shape = self.shape[1:]
+        total, count = np.zeros(shape), np.zeros(shape)
+        low, high = np.full(shape, np.inf), np.full(shape, -np.inf)
+        for _, Y in self._blocks(chunk_cells):
+            valid = ~np.isnan(Y)
+            total += np.where(valid, Y, 0.0).sum(axis=0)
+            count += valid.sum(axis=0)
+            low = np.minimum(low, np.where(valid, Y, np.inf).min(axis=0))
+            high = np.maximum(high, np.where(valid, Y, -np.inf).max(axis=0))
+
+        cells = pd.MultiIndex.from_product([self.models, self.technologies], names=["Model", "Technology"])
+        index = pd.MultiIndex.from_product([*(s.sizes for s in self.shocks), range(len(cells))],
+                                           names=[*(s.name for s in self.shocks), "cell"])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = pd.DataFrame({"mean": (total / count).reshape(-1), "min": low.reshape(-1),
+                                "max": high.reshape(-1), "n": count.reshape(-1).astype("int64")}, index=index)
+        out[["min", "max"]] = out[["min", "max"]].where(out["n"] > 0)
+        out = out.reset_index()
+        out[["Model", "Technology"]] = cells.to_frame(index=False).iloc[out.pop("cell")].to_numpy()
+        return out[[*(s.name for s in self.shocks), "Technology", "Model", "mean", "min", "max", "n"]]
+
+
+def load_macro(path=MACRO_PATH) -> pd.DataFrame:
+    """NGFS scenario inputs in the units of the regressions (population in persons)."""
+    macro = pd.read_csv(path).rename(columns={"GDP_PPP": "gdp_ppp"})
+    macro["population"] = macro["population"] * 1_000_000
+    return macro
+
+
+def main(argv=None) -> None:
+    sys.path.append(str(Path(__file__).resolve().parents[1] / "2.Regression"))
+    from model_registry import MODELS, load_models
+
+    parser = argparse.ArgumentParser(description="WACC projections over a grid of macro shocks.")
+    parser.add_argument("--shock", nargs="+", action="append", required=True, metavar="VAR KIND SIZE",
+                        help="e.g. --shock inflation add -2 0 2  (KIND: add or mul)")
+    parser.add_argument("--models", nargs="*", default=["fe_nopop"], help=f"any of {list(MODELS)}")
+    parser.add_argument("--ramp", nargs=2, type=int, default=None, metavar=("START", "END"),
+                        help="phase all shocks in linearly between these years")
+    parser.add_argument("--macro", default=str(MACRO_PATH))
+    parser.add_argument("--out", default=None, help="Parquet path for every cell of the grid")
+    args = parser.parse_args(argv)
+
+    path = ramp(*args.ramp) if args.ramp else None
+    shocks = [Shock(var, tuple(float(s) for s in sizes), kind, path) for var, kind, *sizes in args.shock]
+    space = ScenarioSpace(load_macro(args.macro), load_models(args.models), shocks)
+    print(f"▶ {len(space):,} cells: {' x '.join(map(str, space.shape))} (rows x shocks x technologies * models)")
+
+    print(space.describe().round(4).to_string(index=False))
+    if args.out:
+        print(f"\n💾 Grid written to: {space.to_parquet(args.out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,33 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+import sys
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.append(str(root / "3.Projection"))
+from projection_cube import load_cube
 
 # Set output directory and ensure it exists
 output_dir = "/Users/valentinadlc/PyCharmMiscProject/WACC_Thesis/Plots/Plots_country_OLS_FE"
 os.makedirs(output_dir, exist_ok=True)
 
-# Load data
-ols_df = pd.read_csv("/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/3.Projection/wacc_projection_OLS_with_groups.csv")
-fe_df = pd.read_csv("/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/3.Projection/wacc_projection_FE_nopop_with_groups.csv")
-
-# Label each dataset
-fe_df["Model"] = "FE"
-ols_df["Model"] = "OLS"
-
-# Combine datasets
-combined_df = pd.concat([fe_df, ols_df])
-
-# Filter for specific technologies
-filtered_data = combined_df[
-    combined_df["Technology"].isin(["Wind_Onshore", "Solar_PV", "Wind_Offshore"])
-]
-
 # Choose a specific year to plot
 target_year = 2050  # You can change this to 2025, 2030, etc.
 
-# Filter to selected year
-filtered_data = filtered_data[filtered_data["Year"] == target_year]
+# Projection cube (FE and OLS, written by 3.Final_Regions.py)
+cube = load_cube()
+countries = cube.groups["Country"]          # ISO -> Country
+
+# Specific technologies
+technologies = ["Wind_Onshore", "Solar_PV", "Wind_Offshore"]
 
 # Loop and create bar plots by country (no averaging)
 for model in ["FE", "OLS"]:
-    model_df = filtered_data[filtered_data["Model"] == model]
-
-    for scenario in model_df["Scenario"].unique():
-        scenario_df = model_df[model_df["Scenario"] == scenario]
-
-        for tech in scenario_df["Technology"].unique():
-            tech_df = scenario_df[scenario_df["Technology"] == tech]
+    for scenario in cube.labels["Scenario"]:
+        for tech in technologies:
+            values = cube.sel(Model=model, Scenario=scenario, Technology=tech, Year=target_year)   # per ISO
+            tech_df = pd.DataFrame({"Country": countries.to_numpy(), "wacc_projection": values}).dropna()
 
             # Sort values for cleaner plot
             tech_df = tech_df.sort_values(by="wacc_projection", ascending=False)
@@ -1,21 +1,16 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import sys
+from pathlib import Path
 
-# Load data
-ols_df = pd.read_csv("/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/3.Projection/wacc_projection_OLS_with_groups.csv")
-fe_df = pd.read_csv("/Users/valentinadlc/Documents/MASTER/MASTER THESIS/WACC_Thesis_DLC/3.Projection/wacc_projection_FE_nopop_with_groups.csv")
+root = Path(__file__).resolve().parents[1]
+sys.path.append(str(root / "3.Projection"))
+from projection_cube import load_cube
 
-# Add model labels
-ols_df["Model"] = "OLS"
-fe_df["Model"] = "FE"
-
-# Combine datasets
-combined_df = pd.concat([ols_df, fe_df], ignore_index=True)
-
-# Filter for Germany
-germany_df = combined_df[combined_df["Country"] == "Germany"]
+# Germany (DEU) slice of the projection cube, one row per Model, Scenario,
+# Technology and Year
+germany_df = load_cube().frame(Model=["OLS", "FE"], ISO="DEU")
 
 # Define output directory
 output_dir = "/Users/valentinadlc/PyCharmMiscProject/WACC_Thesis/Plots/Plots_Germany2"
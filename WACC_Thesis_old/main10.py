@@ -1,3 +1,5 @@
+import sys
+from pathlib import Path
 import pandas as pd
 import numpy as np
 import pycountry
@@ -6,6 +8,12 @@ from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 
+sys.path.append(str(Path(__file__).resolve().parents[1] / "1.Cleaning_and_Merges"))
+sys.path.append(str(Path(__file__).resolve().parents[1] / "3.Projection"))
+from ngfs_reconstruct import reconstruct
+from region_filter import is_aggregate, strip_prefix
+from projection_engine import forecast
+
 # === Helper Function to Convert Country Names to ISO Codes ===
 def get_iso_alpha3(name):
     try:
@@ -23,13 +31,8 @@ wacc_df = pd.read_csv(wacc_path)
 gdp_cleaned_df = pd.read_csv(gdp_cleaned_path)
 
 # 2. Cleaning Macrofinal
-macro_df["Country"] = macro_df["Region"].str.replace(r"^NiGEM NGFS v1\.24\.2\|\s*", "", regex=True)
-
-regions_to_exclude = [
-    "Africa", "Asia", "Central America", "Europe", "Middle East", "North America",
-    "South America", "World", "Rest of the World", "European Union", "Pacific Island States"
-]
-macro_df = macro_df[~macro_df["Country"].isin(regions_to_exclude)].copy()
+macro_df["Country"] = strip_prefix(macro_df["Region"])
+macro_df = macro_df[~is_aggregate(macro_df["Country"])].copy()
 
 # Define the mapping dictionary for scenario name changes
 scenario_name_map = {
@@ -103,92 +106,33 @@ model = LinearRegression()
 model.fit(X_train, y_train)
 
 # === Rebuild Scenarios ===
-baseline_df = macro_df[macro_df["Scenario"] == "Baseline"].copy()
 scenario_names = macro_df["Scenario"].dropna().unique()
 scenario_names = [s for s in scenario_names if s != "Baseline"]
 years = [str(y) for y in range(2022, 2051)]
 
-scenario_dfs = {}
-for scenario in scenario_names:
-    scenario_df = macro_df[macro_df["Scenario"] == scenario].copy()
-    merged = pd.merge(
-        scenario_df,
-        baseline_df,
-        on=["Country", "Variable", "ISO"],
-        suffixes=("_diff", "_base")
-    )
-    for year in years:
-        merged[year] = merged[f"{year}_base"] + merged[f"{year}_diff"]
-    final_cols = ["Scenario_diff", "Country", "Variable", "ISO"] + years
-    scenario_dfs[scenario] = merged[final_cols].rename(columns={"Scenario_diff": "Scenario"})
+scenario_df = reconstruct(macro_df, keys=["Country", "Variable", "ISO"], values=years)
 
 #Changing scenarios name
-for scenario in scenario_dfs:
-    scenario_dfs[scenario]['Scenario'] = scenario_dfs[scenario]['Scenario'].replace(scenario_name_map)
-
-# === Forecast Function ===
-def forecast_wacc(model, scenario_df, years, tech_name, tech_dummies):
-    forecasts = []
-    countries = scenario_df['Country'].unique()
-
-    for country in countries:
-        country_data = scenario_df[scenario_df['Country'] == country]
-        for year in years:
-            try:
-                gdp_data = country_data[country_data['Variable'] == 'gdp']
-                inflation_data = country_data[country_data['Variable'] == 'inflation']
-                unemployment_data = country_data[country_data['Variable'] == 'unemployment']
-
-                if gdp_data.empty or inflation_data.empty or unemployment_data.empty:
-                    continue
-
-                gdp = float(gdp_data[year].iloc[0])
-                inflation = float(inflation_data[year].iloc[0])
-                unemployment = float(unemployment_data[year].iloc[0])
-
-                X_pred = pd.DataFrame({
-                    'inflation': [inflation],
-                    'unemployment': [unemployment],
-                    'gdp': [gdp],
-                    'is_solar': [tech_dummies['is_solar']],
-                    'is_wind_onshore': [tech_dummies['is_wind_onshore']],
-                    'is_wind_offshore': [tech_dummies['is_wind_offshore']]
-                })
-
-                wacc_pred = model.predict(X_pred)[0]
-                forecasts.append({
-                    'Country': country,
-                    'ISO': country_data['ISO'].iloc[0],
-                    'Year': year,
-                    'Technology': tech_name,
-                    'WACC': wacc_pred
-                })
-
-            except Exception:
-                continue
-
-    return pd.DataFrame(forecasts)
+scenario_df['Scenario'] = scenario_df['Scenario'].replace(scenario_name_map)
 
 # === Forecast WACC ===
+# one pivot of the scenario table and one predict call for all scenarios and
+# technologies (projection_engine.forecast); cells with a missing input are
+# reported instead of being skipped
 tech_combinations = {
     "Solar PV": {"is_solar": 1, "is_wind_onshore": 0, "is_wind_offshore": 0},
     "Wind Onshore": {"is_solar": 0, "is_wind_onshore": 1, "is_wind_offshore": 0},
     "Wind Offshore": {"is_solar": 0, "is_wind_onshore": 0, "is_wind_offshore": 1}
 }
 
-wacc_forecasts_all = []
-for scenario in scenario_names:
-    scenario_df = scenario_dfs[scenario]
-    for tech_name, tech_dummies in tech_combinations.items():
-        forecast_df = forecast_wacc(model, scenario_df, years, tech_name, tech_dummies)
-        if not forecast_df.empty:
-            forecast_df['Scenario'] = scenario
-            wacc_forecasts_all.append(forecast_df)
+wacc_forecast_full, missing_inputs = forecast(
+    model, scenario_df[scenario_df["Scenario"].isin(scenario_names)], features, years, tech_combinations, value="WACC"
+)
+if not missing_inputs.empty:
+    print(f"⚠️ No forecast for {len(missing_inputs)} scenario-country-year cells, missing inputs:")
+    print(missing_inputs.groupby(["Scenario", "missing"]).size().to_string())
 
 # === Final Combined Forecasts ===
-if wacc_forecasts_all:
-    wacc_forecast_full = pd.concat(wacc_forecasts_all, ignore_index=True)
-    # Export to CSV or just print head
 wacc_forecast_full.to_csv("wacc_forecast_by_scenario.csv", index=False)
 print("\n✅ Forecasts saved to: wacc_forecast_by_scenario.csv")
 print(wacc_forecast_full.head())
@@ -212,13 +156,8 @@ macro_df = pd.read_csv(macro_path)
 wacc_df = pd.read_csv(wacc_path)
 
 # === Clean Macrofinal ===
-macro_df["Country"] = macro_df["Region"].str.replace(r"^NiGEM NGFS v1\.24\.2\|\s*", "", regex=True)
-
-regions_to_exclude = [
-    "Africa", "Asia", "Central America", "Europe", "Middle East", "North America",
-    "South America", "World", "Rest of the World", "European Union", "Pacific Island States"
-]
-macro_df = macro_df[~macro_df["Country"].isin(regions_to_exclude)].copy()
+macro_df["Country"] = strip_prefix(macro_df["Region"])
+macro_df = macro_df[~is_aggregate(macro_df["Country"])].copy()
 
 # Normalize variable names
 variable_rename_map = {
@@ -261,87 +200,31 @@ model = LinearRegression()
 model.fit(X_train, y_train)
 
 # === Rebuild Scenarios ===
-baseline_df = macro_df[macro_df["Scenario"] == "Baseline"].copy()
 scenario_names = macro_df["Scenario"].dropna().unique()
 scenario_names = [s for s in scenario_names if s != "Baseline"]
 years = [str(y) for y in range(2022, 2051)]
 
-scenario_dfs = {}
-for scenario in scenario_names:
-    scenario_df = macro_df[macro_df["Scenario"] == scenario].copy()
-    merged = pd.merge(
-        scenario_df,
-        baseline_df,
-        on=["Country", "Variable", "ISO"],
-        suffixes=("_diff", "_base")
-    )
-    for year in years:
-        merged[year] = merged[f"{year}_base"] + merged[f"{year}_diff"]
-    final_cols = ["Scenario_diff", "Country", "Variable", "ISO"] + years
-    scenario_dfs[scenario] = merged[final_cols].rename(columns={"Scenario_diff": "Scenario"})
-
-# === Forecast Function ===
-def forecast_wacc(model, scenario_df, years, tech_name, tech_dummies):
-    forecasts = []
-    countries = scenario_df['Country'].unique()
-
-    for country in countries:
-        country_data = scenario_df[scenario_df['Country'] == country]
-        for year in years:
-            try:
-                gdp_data = country_data[country_data['Variable'] == 'gdp']
-                inflation_data = country_data[country_data['Variable'] == 'inflation']
-                unemployment_data = country_data[country_data['Variable'] == 'unemployment']
-
-                if gdp_data.empty or inflation_data.empty or unemployment_data.empty:
-                    continue
-
-                gdp = float(gdp_data[year].iloc[0])
-                inflation = float(inflation_data[year].iloc[0])
-                unemployment = float(unemployment_data[year].iloc[0])
-
-                X_pred = pd.DataFrame({
-                    'inflation': [inflation],
-                    'unemployment': [unemployment],
-                    'gdp': [gdp],
-                    'is_solar': [tech_dummies['is_solar']],
-                    'is_wind_onshore': [tech_dummies['is_wind_onshore']],
-                    'is_wind_offshore': [tech_dummies['is_wind_offshore']]
-                })
-
-                wacc_pred = model.predict(X_pred)[0]
-                forecasts.append({
-                    'Country': country,
-                    'ISO': country_data['ISO'].iloc[0],
-                    'Year': year,
-                    'Technology': tech_name,
-                    'WACC': wacc_pred
-                })
-
-            except Exception:
-                continue
-
-    return pd.DataFrame(forecasts)
+scenario_df = reconstruct(macro_df, keys=["Country", "Variable", "ISO"], values=years)
 
 # === Forecast WACC ===
+# one pivot of the scenario table and one predict call for all scenarios and
+# technologies (projection_engine.forecast); cells with a missing input are
+# reported instead of being skipped
 tech_combinations = {
     "Solar PV": {"is_solar": 1, "is_wind_onshore": 0, "is_wind_offshore": 0},
     "Wind Onshore": {"is_solar": 0, "is_wind_onshore": 1, "is_wind_offshore": 0},
     "Wind Offshore": {"is_solar": 0, "is_wind_onshore": 0, "is_wind_offshore": 1}
 }
 
-wacc_forecasts_all = []
-for scenario in scenario_names:
-    scenario_df = scenario_dfs[scenario]
-    for tech_name, tech_dummies in tech_combinations.items():
-        forecast_df = forecast_wacc(model, scenario_df, years, tech_name, tech_dummies)
-        if not forecast_df.empty:
-            forecast_df['Scenario'] = scenario
-            wacc_forecasts_all.append(forecast_df)
+wacc_forecast_full, missing_inputs = forecast(
+    model, scenario_df[scenario_df["Scenario"].isin(scenario_names)], features, years, tech_combinations, value="WACC"
+)
+if not missing_inputs.empty:
+    print(f"⚠️ No forecast for {len(missing_inputs)} scenario-country-year cells, missing inputs:")
+    print(missing_inputs.groupby(["Scenario", "missing"]).size().to_string())
 
 # === Final Combined Forecasts ===
-if wacc_forecasts_all:
-    wacc_forecast_full = pd.concat(wacc_forecasts_all, ignore_index=True)
+if not wacc_forecast_full.empty:
     print("\nWACC Forecast by Scenario:")
     print("-" * 50)
     # Display summary statistics